@@ -0,0 +1,366 @@
+"""
+This module simulates a whole batch of games at once, with NumPy.
+
+Stepping Player / Coin objects one move at a time is far too slow for
+the millions of games needed to evaluate a strategy. Here every game is
+a row of an (N, 2, 4) array of relative positions, die rolls are drawn
+for all games together, and the priorities of Player.get_move:
+
+    finish > open > kill > save > fast
+
+are applied to the whole batch with array operations.
+
+Like player.greedy_turn, every order of a throw's die rolls is played
+out & the one with the best benefit is kept. A throw only has more than
+one order if it has a 6 & another die: (6, x) & (6, 6, x), so the orders
+differ only in where x is played; they are played for all games at once.
+
+Side 0 plays RED & side 1 plays YELLOW, like LudoGame in game mode 0.
+
+Run it as: python batch.py [games]
+It prints the throughput & compares the results with the scalar code.
+"""
+
+import sys
+import time
+import random
+import logging
+
+import numpy as np
+
+from config import log
+from config import PLAYER_COLORS
+from player import Player, greedy_turn
+from state import earns_repeat
+from tables import ABS_POS, REL_POS, IS_SAFE, OPPOSITE, ROW_SIZE, FINISH, JAIL
+from features import hit_chances
+
+
+# Give up on a game after these many turns (none ever get here in practice)
+MAX_TURNS = 2000
+
+# Tables of tables.py as arrays
+ABS = np.array(ABS_POS, dtype=np.int16).reshape(-1, ROW_SIZE)
+SAFE = np.array(IS_SAFE, dtype=bool)
+OPP = np.array(OPPOSITE, dtype=np.int16)
+REL = np.array(REL_POS, dtype=np.int16).reshape(-1, 53)
+
+# Row of each side in ABS
+ROWS = np.array([PLAYER_COLORS.index("RED"), PLAYER_COLORS.index("YELLOW")])
+
+# Coins are numbered 0 to 3; used to break ties like the scalar code does
+COIN_IDX = np.arange(4)
+
+
+def _threat(rel_pos, my_rows, theirs, their_rows):
+    """
+    Vectorized Player.threat: for every (game, coin) in rel_pos,
+    the chance that the opponent can kill it with their next throw.
+    """
+    rel_pos = np.minimum(rel_pos, FINISH)
+    my_abs = ABS[my_rows[:, None], rel_pos]
+
+    # Where my coins are, as seen by the opponent; -1 if they can't be hit
+    target = REL[their_rows[:, None], np.maximum(my_abs, 0)]
+    target = np.where(SAFE[rel_pos], -1, target)
+
+    return hit_chances(theirs, target)
+
+
+def _last_max(scores):
+    """Index of the maximum score per row; the last one on ties; -1 if all are < 0."""
+    flipped = scores[:, ::-1]
+    idx = 3 - flipped.argmax(axis=1)
+    return np.where(scores.max(axis=1) >= 0, idx, -1)
+
+
+def _first_true(mask):
+    """Index of the first True per row; -1 if there is none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+
+def _take(chosen, benefit, pick, value):
+    """Games that haven't chosen yet take pick, worth value; returns the new (chosen, benefit)."""
+    take = (chosen < 0) & (pick >= 0)
+    return np.where(take, pick, chosen), np.where(take, value, benefit)
+
+
+def choose(mine, theirs, die, my_rows, their_rows):
+    """
+    Vectorized player.decide_move: which coin (0-3) each game moves; -1 for none.
+
+    mine, theirs: (n, 4) relative positions; die: (n,) die rolls.
+    Returns (coins, benefits) as arrays of n.
+    """
+    d = die[:, None]
+    target = mine + d
+    in_jail = mine == JAIL
+
+    # Coins that can move & those that don't stack (see state.legal_moves)
+    movable = (~in_jail) & (target <= FINISH)
+    clipped = np.minimum(target, FINISH)
+    stacks = (clipped[:, :, None] == mine[:, None, :]).any(axis=2)
+    non_stacking = movable & (SAFE[clipped] | ~stacks)
+
+    # Finish
+    chosen = _first_true(target == FINISH)
+    benefit = np.where(chosen >= 0, 20, 0)
+
+    # Open
+    can_open = ((die == 1) | (die == 6))[:, None] & in_jail
+    chosen, benefit = _take(chosen, benefit, _first_true(can_open), 15)
+
+    # Kill: the killer of the opponent's farthest coin
+    victim = OPP[clipped]
+    killers = movable & (mine < 52) & ~SAFE[clipped] & (victim > 0)
+    hits = (victim[:, :, None] == theirs[:, None, :]).any(axis=2)
+    chosen, benefit = _take(chosen, benefit, _last_max(np.where(killers & hits, victim, -1)), 14)
+
+    # Save: the farthest coin in danger
+    in_danger = _threat(mine, my_rows, theirs, their_rows) > 0
+    chosen, benefit = _take(chosen, benefit, _last_max(np.where(in_danger & non_stacking, mine, -1)), 10)
+
+    # Modified Fast: the farthest coin, or the second farthest if that is safer
+    key = np.where(non_stacking, mine * 4 + COIN_IDX, -1)
+    order = np.argsort(key, axis=1)
+    first, second = order[:, 3], order[:, 2]
+
+    rows = np.arange(len(mine))
+    has_second = key[rows, second] >= 0
+    first_threat = _threat((mine[rows, first] + die)[:, None], my_rows, theirs, their_rows)[:, 0]
+    second_threat = _threat((mine[rows, second] + die)[:, None], my_rows, theirs, their_rows)[:, 0]
+
+    safer = has_second & (second_threat < first_threat)
+    pick = np.where(key[rows, first] >= 0, np.where(safer, second, first), -1)
+
+    return _take(chosen, benefit, pick, np.where(safer, 9, 8))
+
+
+def play_dice(mine, theirs, dice, my_rows, their_rows):
+    """
+    Vectorized player.greedy_moves: play die rolls one after another.
+
+    mine, theirs: (n, 4) relative positions, updated in place; dice: (n, 3)
+    die rolls, 0 where there is no die. Returns (moves, benefits, repeats):
+    the number of moves made, their total benefit & whether any of them
+    killed or finished a coin.
+    """
+    n = len(mine)
+    rows = np.arange(n)
+
+    made = np.zeros(n, dtype=np.int8)
+    total = np.zeros(n)
+    repeat = np.zeros(n, dtype=bool)
+
+    for die in dice.T:
+        coin, benefit = choose(mine, theirs, die, my_rows, their_rows)
+        moves = (die > 0) & (coin >= 0)
+
+        idx = rows[moves]
+        coin = coin[moves]
+        made[idx] += 1
+        total[idx] += benefit[moves]
+
+        # Even if you open with 6, you still move 1 step
+        old = mine[idx, coin]
+        new = np.where(old == JAIL, 1, old + die[moves])
+        mine[idx, coin] = new
+
+        # Kills send the opponent's coins back to their yard
+        victim = np.where(SAFE[new], -1, OPP[new])
+        killed = theirs[idx] == victim[:, None]
+        theirs[idx] = np.where(killed, JAIL, theirs[idx])
+
+        repeat[idx] |= killed.any(axis=1) | (new == FINISH)
+
+    return made, total, repeat
+
+
+def _percent_complete(coins):
+    """Vectorized player.percent_complete, added up in the same order."""
+    terms = 25 * (coins / 57)
+    return ((terms[:, 0] + terms[:, 1]) + terms[:, 2]) + terms[:, 3]
+
+
+def play_throw(mine, theirs, dice, my_rows, their_rows):
+    """
+    Vectorized player.greedy_turn: play a throw in its best order.
+
+    Like play_dice, but tries every order of the die rolls. Of the orders
+    that make the most moves, the one with the best benefit (plus the lead
+    in percent_complete) wins; on ties the last of state.orderings.
+    Returns (mine, theirs, repeats); mine & theirs are new arrays.
+    """
+    # The die that isn't a 6 is the last one (or the only one)
+    count = (dice > 0).sum(axis=1)
+    other = dice[np.arange(len(dice)), np.maximum(count - 1, 0)]
+
+    best = None
+
+    # Order k plays the other die k-th & 6s in the rest of the slots; in the
+    # order of state.orderings, since the other die is less than 6
+    for k in range(3):
+        games = np.nonzero(count > k)[0] if k else np.arange(len(dice))
+        if not len(games):
+            break
+
+        ordered = np.where(dice[games] > 0, 6, 0).astype(dice.dtype)
+        ordered[:, k] = other[games]
+
+        my_end, their_end = mine[games].copy(), theirs[games].copy()
+        made, benefit, repeat = play_dice(my_end, their_end, ordered, my_rows[games], their_rows[games])
+        score = benefit + _percent_complete(my_end) - _percent_complete(their_end)
+
+        if best is None:
+            best = [my_end, their_end, made, score, repeat]
+            continue
+
+        # More moves, or as many & at least as good a score: later orders win ties
+        best_made, best_score = best[2][games], best[3][games]
+        better = (made > best_made) | ((made == best_made) & (score >= best_score))
+        for values, new in zip(best, (my_end, their_end, made, score, repeat)):
+            values[games[better]] = new[better]
+
+    my_end, their_end, _, _, repeat = best
+    return my_end, their_end, repeat
+
+
+class BatchSimulator(object):
+
+    """N games of greedy self play, stepped together."""
+
+    def __init__(self, games, seed=None):
+        self.games = games
+        self.rng = np.random.default_rng(seed)
+
+        # (game, side, coin) -> relative position
+        self.pos = np.zeros((games, 2, 4), dtype=np.int16)
+
+        # Who is about to roll, who won (-1: not yet), turns played
+        self.side = np.zeros(games, dtype=np.int8)
+        self.winner = np.full(games, -1, dtype=np.int8)
+        self.turns = np.zeros(games, dtype=np.int32)
+
+        # Turns played across all games; one "game step" each
+        self.steps = 0
+
+    def roll(self, n):
+        """Throws for n games: (n, 3) die rolls, 0 where there is no die."""
+        dice = self.rng.integers(1, 7, size=(n, 3)).astype(np.int16)
+
+        first_six = dice[:, 0] == 6
+        second_six = first_six & (dice[:, 1] == 6)
+        duck = second_six & (dice[:, 2] == 6)
+
+        dice[~first_six, 1] = 0
+        dice[~second_six, 2] = 0
+        dice[duck] = 0
+
+        return dice
+
+    def step(self):
+        """Play one turn in every unfinished game."""
+        games = np.nonzero(self.winner < 0)[0]
+        n = len(games)
+        if not n:
+            return 0
+
+        side = self.side[games].astype(np.intp)
+        my_rows, their_rows = ROWS[side], ROWS[1 - side]
+
+        mine, theirs, repeat = play_throw(
+            self.pos[games, side], self.pos[games, 1 - side], self.roll(n), my_rows, their_rows)
+
+        self.pos[games, side] = mine
+        self.pos[games, 1 - side] = theirs
+        self.turns[games] += 1
+        self.steps += n
+
+        won = (mine == FINISH).all(axis=1)
+        self.winner[games[won]] = side[won]
+
+        # Turn passes on, unless it was a repeat
+        self.side[games] = np.where(repeat, side, 1 - side)
+
+        # Call games that never end by how much each side completed
+        stuck = games[(self.turns[games] >= MAX_TURNS) & (self.winner[games] < 0)]
+        if len(stuck):
+            totals = self.pos[stuck].sum(axis=2)
+            self.winner[stuck] = (totals[:, 1] > totals[:, 0]).astype(np.int8)
+
+        return n
+
+    def run(self):
+        """Play all games to the end."""
+        while self.step():
+            pass
+
+        return self.winner, self.turns
+
+
+def scalar_game(rng):
+    """
+    Play one greedy game with Player objects, by the same rules.
+
+    Returns (winner side, turns).
+    """
+    players = [Player("RED"), Player("YELLOW")]
+    side = 0
+
+    for turn in range(1, MAX_TURNS + 1):
+        player, opponent = players[side], players[1 - side]
+
+        rolls = [rng.randint(1, 6)]
+        while rolls[-1] == 6 and len(rolls) < 3:
+            rolls.append(rng.randint(1, 6))
+        if rolls == [6, 6, 6]:
+            rolls = []
+
+        state = player.get_state(opponent)
+
+        moves, _ = greedy_turn(state, tuple(rolls))
+        player.make_moves([player.move_name(move) for move in moves], opponent)
+        new_state = player.get_state(opponent)
+
+        if new_state[:4] == (FINISH,) * 4:
+            return side, turn
+
+        if not earns_repeat(state, new_state):
+            side = 1 - side
+
+    return int(players[1].percent_complete > players[0].percent_complete), MAX_TURNS
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    sim = BatchSimulator(games, seed=1)
+    started = time.perf_counter()
+    winner, turns = sim.run()
+    took = time.perf_counter() - started
+
+    print("Batch:  %d games, %d game steps in %.2fs: %d steps/s" % (
+        games, sim.steps, took, sim.steps / took))
+    print("        side 0 wins: %.3f, mean turns: %.1f" % (
+        (winner == 0).mean(), turns.mean()))
+
+    # Strategies are chatty
+    log.setLevel(logging.ERROR)
+
+    rng = random.Random(1)
+    scalar_games = min(games, 500)
+    started = time.perf_counter()
+    results = [scalar_game(rng) for _ in range(scalar_games)]
+    took = time.perf_counter() - started
+
+    wins = sum(1 for side, _ in results if side == 0) / scalar_games
+    mean_turns = sum(t for _, t in results) / scalar_games
+    steps = sum(t for _, t in results)
+
+    print("Scalar: %d games, %d game steps in %.2fs: %d steps/s" % (
+        scalar_games, steps, took, steps / took))
+    print("        side 0 wins: %.3f, mean turns: %.1f" % (wins, mean_turns))
+
+
+if __name__ == '__main__':
+    main()
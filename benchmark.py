@@ -0,0 +1,117 @@
+"""
+This module times the hot functions of our strategies.
+
+The greedy rules work on the states of state.py; it times them the way
+game.py calls them:
+
+    threat          The chance of getting hit at a square (see hits.py),
+                    against the way it used to be computed, before the
+                    lookup tables in tables.py existed. (The legacy count
+                    of attackers is kept as the baseline for its cost.)
+    decide_move     The greedy rules for a single die, without MOVE_CACHE
+    greedy_turn     A whole throw: every order of its die rolls, through
+                    the cache like a game does
+
+Run it as: python benchmark.py
+"""
+
+import random
+import logging
+import timeit
+
+from config import log
+from config import PLAYER_COLORS
+from move_cache import MOVE_CACHE
+from player import threat, decide_move, greedy_turn
+from state import ROLLS
+
+
+# Calls per measurement
+NUMBER = 20000
+
+# Colors of the two sides of a state, as in game.py
+COLORS = ("RED", "YELLOW")
+
+
+def legacy_rel_to_abs(color, rel_pos):
+    """Coin.rel_to_abs, as it was before tables.py"""
+    for idx, player_color in enumerate(PLAYER_COLORS):
+        if player_color[0] == color[0]:
+            mycolor_index = idx
+
+    if rel_pos == 0:
+        return 0
+    elif rel_pos >= 52:
+        return -1
+    return (rel_pos - 1 + 13 * mycolor_index) % 52 + 1
+
+
+def legacy_is_safe(rel_pos):
+    """Board.is_safe, as it was before tables.py"""
+    safe_squares = [1, 9, 14, 22, 27, 35, 40, 48]
+    home_column = list(range(52, 58))
+    return rel_pos in safe_squares + home_column + [0]
+
+
+def legacy_threat(state, relpos):
+    if relpos > 57:
+        relpos = 57
+
+    if legacy_is_safe(relpos):
+        return 0
+
+    abs_pos = legacy_rel_to_abs(COLORS[0], relpos)
+
+    threat = 0
+    for rel_pos in state[4:]:
+        if (rel_pos >= 1 and
+                rel_pos <= 51 and
+                legacy_rel_to_abs(COLORS[1], rel_pos + 6) >= abs_pos):
+            threat += 1
+
+    return threat
+
+
+def random_states(count, seed=0):
+    """States with coins scattered over the board."""
+    rng = random.Random(seed)
+    return [
+        tuple(rng.choice([0, 57, rng.randint(1, 51), rng.randint(1, 57)]) for _ in range(8))
+        for _ in range(count)
+    ]
+
+
+def measure(func, args):
+    """Average time per call in micro seconds."""
+    def run():
+        for arg in args:
+            func(*arg)
+
+    calls = len(args) * (NUMBER // len(args))
+    seconds = timeit.timeit(run, number=NUMBER // len(args))
+    return seconds / calls * 1e6
+
+
+def main():
+    # Strategies are chatty
+    log.setLevel(logging.ERROR)
+
+    states = random_states(200)
+    squares = [(state, rel * 7) for state in states for rel in range(1, 7)]
+    dice = [(state, die) for state in states for die in range(1, 7)]
+    throws = [(state, die_rolls) for state in states[:50] for _, die_rolls in ROLLS]
+
+    t_before = measure(legacy_threat, squares)
+    t_after = measure(threat, squares)
+    print("%-12s before: %6.2f us  after: %6.2f us  speedup: %.1fx" % (
+        "threat", t_before, t_after, t_before / t_after))
+
+    print("%-12s %6.2f us" % ("decide_move", measure(decide_move, dice)))
+
+    MOVE_CACHE.clear()
+    print("%-12s %6.2f us  (cache hits: %d, misses: %d)" % (
+        "greedy_turn", measure(greedy_turn, throws), MOVE_CACHE.hits, MOVE_CACHE.misses))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+This module keeps track of the time we are allowed to think.
+
+The client tells us the time limit for the entire game (see main.py).
+The Clock splits what is left of it over the turns we still expect to play
+and hands every turn a deadline that decision code can poll.
+"""
+
+import time
+
+
+class Clock(object):
+
+    """Time budget of a game, spread over its turns."""
+
+    # Turns we expect to play in a game, when nothing has been completed yet
+    EXPECTED_TURNS = 120
+
+    # Even at the very end of a game, assume a few more turns are coming
+    MIN_TURNS_LEFT = 10
+
+    # Never plan to use this fraction of the time limit (at least MIN_RESERVE)
+    # It absorbs reading / writing to the client & process scheduling
+    RESERVE = 0.1
+    MIN_RESERVE = 1.0
+
+    # Taken off every turn's budget for sending our moves
+    IO_MARGIN = 0.02
+
+    # Never give a single turn more than this fraction of the remaining time
+    MAX_TURN_FRACTION = 0.2
+
+    def __init__(self, time_limit, timer=time.perf_counter):
+        # Seconds allowed for the entire game
+        self.time_limit = time_limit
+
+        # Can be replaced, eg: by a fake timer
+        self.timer = timer
+
+        self.reserve = max(self.MIN_RESERVE, self.RESERVE * time_limit)
+
+        # Games sharing the CPU with this one (eg: in decision_server.py); they split the budget
+        self.share = 1
+
+        # Seconds used in turns that have ended
+        self.used = 0.0
+        self.turns = 0
+
+        # Set by start_turn
+        self.turn_start = None
+        self.budget = 0.0
+        self.deadline = None
+
+    @classmethod
+    def for_turn(cls, seconds, timer=time.perf_counter):
+        """A clock for a single turn that has to end in seconds."""
+        return cls.until(timer() + seconds, timer)
+
+    @classmethod
+    def until(cls, deadline, timer=time.perf_counter):
+        """
+        A clock for a single turn that has to end at a deadline of the timer;
+        eg: the deadline of a turn in another process (perf_counter is system-wide).
+        """
+        turn_start = timer()
+        clock = cls(deadline - turn_start, timer)
+
+        clock.turn_start = turn_start
+        clock.budget = deadline - turn_start
+        clock.deadline = deadline
+
+        return clock
+
+    @property
+    def remaining(self):
+        """Seconds left for the game, not counting the current turn."""
+        return self.time_limit - self.used
+
+    def turns_left(self, progress):
+        """
+        How many turns do we expect to still play?
+
+        progress is the fraction of the game we have completed: 0 to 1
+        """
+        return max(self.MIN_TURNS_LEFT, self.EXPECTED_TURNS * (1 - progress))
+
+    def start_turn(self, progress=0.0, started=None):
+        """
+        Start the clock for a turn, & decide the budget for it.
+
+        started is when the turn really began (eg: when the roll was read),
+        if we only get to it later; the time in between counts.
+        Returns the budget in seconds.
+        """
+        self.turn_start = self.timer() if started is None else started
+
+        spendable = self.remaining - self.reserve
+        budget = min(
+            spendable / self.turns_left(progress),
+            spendable * self.MAX_TURN_FRACTION,
+        ) / self.share - self.IO_MARGIN
+
+        self.budget = max(0.0, budget)
+        self.deadline = self.turn_start + self.budget
+
+        return self.budget
+
+    def end_turn(self):
+        """Stop the clock; returns the seconds this turn took."""
+        elapsed = self.elapsed()
+
+        self.used += elapsed
+        self.turns += 1
+        self.turn_start = None
+        self.deadline = None
+
+        return elapsed
+
+    def elapsed(self):
+        """Seconds spent in the current turn."""
+        if self.turn_start is None:
+            return 0.0
+        return self.timer() - self.turn_start
+
+    def time_left(self):
+        """Seconds left before the current turn's deadline."""
+        if self.deadline is None:
+            return 0.0
+        return self.deadline - self.timer()
+
+    def out_of_time(self):
+        """Has the current turn's deadline passed? Decision code should poll this."""
+        return self.deadline is not None and self.timer() >= self.deadline
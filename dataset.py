@@ -0,0 +1,198 @@
+"""
+This module streams self play positions & their outcomes to disk.
+
+Games are played by the batch simulator (see batch.py), thousands at a
+time. Before every throw, the position is recorded from the point of view
+of the player about to throw (a state of state.py); once the games are
+over, each position gets the outcome: 1 if that player went on to win.
+
+Positions are written in chunks of numbered .npy files:
+
+    states_00000.npy        (n, 8) int8: the positions
+    outcomes_00000.npy      (n,) int8: 1 if the player to move won, else 0
+
+so a dataset can grow far beyond memory & is read back memory mapped,
+one chunk at a time (see Dataset).
+
+Run it as: python dataset.py data_dir [--games 20000]
+"""
+
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+
+from batch import BatchSimulator
+
+
+# Positions per chunk file
+CHUNK_SIZE = 1 << 18
+
+# Games simulated together
+BATCH_GAMES = 4096
+
+
+class ChunkWriter(object):
+
+    """Buffers positions & outcomes, and writes them out a chunk at a time."""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+        os.makedirs(path, exist_ok=True)
+
+        # Continue after the chunks already there
+        self.chunks = len(glob.glob(os.path.join(path, "states_*.npy")))
+
+        self.states = np.empty((chunk_size, 8), dtype=np.int8)
+        self.outcomes = np.empty(chunk_size, dtype=np.int8)
+        self.size = 0
+
+        # Positions written so far
+        self.written = 0
+
+    def add(self, states, outcomes):
+        """Add a batch of (n, 8) states & their (n,) outcomes."""
+        start = 0
+        while start < len(states):
+            count = min(len(states) - start, self.chunk_size - self.size)
+            self.states[self.size:self.size + count] = states[start:start + count]
+            self.outcomes[self.size:self.size + count] = outcomes[start:start + count]
+
+            self.size += count
+            start += count
+
+            if self.size == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered positions as a new chunk."""
+        if not self.size:
+            return
+
+        name = "%05d.npy" % self.chunks
+        np.save(os.path.join(self.path, "states_" + name), self.states[:self.size])
+        np.save(os.path.join(self.path, "outcomes_" + name), self.outcomes[:self.size])
+
+        self.chunks += 1
+        self.written += self.size
+        self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+class Dataset(object):
+
+    """The chunks of a data directory, memory mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self.names = sorted(
+            os.path.basename(name)[len("states_"):]
+            for name in glob.glob(os.path.join(path, "states_*.npy"))
+        )
+        if not self.names:
+            raise ValueError("No positions in %s" % path)
+
+        self.sizes = [len(self.chunk(idx)[1]) for idx in range(len(self.names))]
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    def chunk(self, idx):
+        """(states, outcomes) of a chunk, memory mapped."""
+        name = self.names[idx]
+        return (
+            np.load(os.path.join(self.path, "states_" + name), mmap_mode="r"),
+            np.load(os.path.join(self.path, "outcomes_" + name), mmap_mode="r"),
+        )
+
+    def batches(self, size, rng, chunks=None):
+        """
+        Shuffled batches of (states, outcomes), as int arrays.
+
+        Chunks are visited in a random order & shuffled one at a time,
+        so only a single chunk is ever read into memory.
+        """
+        order = list(range(len(self.names))) if chunks is None else list(chunks)
+        rng.shuffle(order)
+
+        for idx in order:
+            states, outcomes = self.chunk(idx)
+            states, outcomes = np.asarray(states), np.asarray(outcomes)
+
+            perm = rng.permutation(len(outcomes))
+            for start in range(0, len(perm), size):
+                rows = perm[start:start + size]
+                yield states[rows], outcomes[rows]
+
+
+def simulate(games, seed=None):
+    """
+    Play games of greedy self play (see batch.py) & record every position.
+
+    Returns (states, outcomes): (n, 8) states before each throw, side to
+    move first, and (n,) 1 where that side won the game; game by game.
+    """
+    sim = BatchSimulator(games, seed)
+
+    states, game_ids, sides = [], [], []
+    while True:
+        playing = np.nonzero(sim.winner < 0)[0]
+        if not len(playing):
+            break
+
+        side = sim.side[playing].astype(np.intp)
+        states.append(np.concatenate([sim.pos[playing, side], sim.pos[playing, 1 - side]], axis=1))
+        game_ids.append(playing)
+        sides.append(side)
+
+        sim.step()
+
+    game_ids, sides = np.concatenate(game_ids), np.concatenate(sides)
+    outcomes = sim.winner[game_ids] == sides
+
+    # Game by game, so that a chunk holds whole games (& a held out chunk unseen ones)
+    order = np.argsort(game_ids, kind="stable")
+    return np.concatenate(states)[order].astype(np.int8), outcomes[order].astype(np.int8)
+
+
+def generate(path, games, seed=1, chunk_size=CHUNK_SIZE, batch_games=BATCH_GAMES):
+    """Stream the positions of games of self play into the chunks of path."""
+    writer = ChunkWriter(path, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn((games + batch_games - 1) // batch_games)
+
+    played = 0
+    for batch_seed in seeds:
+        count = min(batch_games, games - played)
+        writer.add(*simulate(count, batch_seed))
+        played += count
+
+    writer.close()
+    return writer.written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record positions & outcomes of self play games.")
+    parser.add_argument("path", help="directory of the chunks; new chunks are added to it")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = generate(args.path, args.games, args.seed, args.chunk_size)
+    took = time.perf_counter() - started
+
+    print("%d games, %d positions in %.1fs: %d positions/s" % (
+        args.games, written, took, written / took))
+    dataset = Dataset(args.path)
+    print("%s: %d positions in %d chunks" % (args.path, len(dataset), len(dataset.names)))
+
+
+if __name__ == '__main__':
+    main()
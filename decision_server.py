@@ -0,0 +1,156 @@
+"""
+This module serves many games from a single long lived process.
+
+Starting a Python interpreter & importing our code for every game
+dominates the time of a tournament of short games. Instead, this server
+keeps running & plays every connection to its socket as a separate game,
+with a LudoGame of its own. A connection speaks exactly the protocol of
+main.py's stdin / stdout (see LudoGame.feed), so the client can keep
+calling main.py, which relays to the server (see relay.py):
+
+    python decision_server.py /tmp/ludo.sock &
+    LUDO_DECISION_SERVER=/tmp/ludo.sock <client> ... main.py
+
+Connections are served by a single asyncio event loop & decisions run on
+a pool of threads, so the loop keeps reading lines while games think.
+Decisions are pure Python & share the CPU (GIL), so:
+
+    the clock of a turn starts when its roll is read, not when a thread
+    gets to it, so the time spent waiting counts
+
+    the budget of a turn is divided by the number of games being played
+
+Memory is tracked with tracemalloc & reported for every game.
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+
+from clock import Clock
+from config import log
+from game import LudoGame
+from main import SEARCH_DEPTH
+
+
+class DecisionServer(object):
+
+    """Plays a LudoGame for every connection to a unix socket."""
+
+    def __init__(self, path, search_depth=SEARCH_DEPTH, trace_memory=True):
+        self.path = path
+        self.search_depth = search_depth
+        self.trace_memory = trace_memory
+
+        # Games being played right now
+        self.games = set()
+        self.played = 0
+
+        # Decisions run here, off the event loop
+        self.executor = ThreadPoolExecutor()
+
+    def memory(self):
+        """Bytes currently allocated by Python; 0 if not tracing."""
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+
+    def new_game(self, init):
+        """Create a game from the client's init line (see main.py)."""
+        player_id, time_limit, game_mode = list(map(int, init.split(" ")))[:3]
+
+        before = self.memory()
+        game = LudoGame(player_id, game_mode, search_depth=self.search_depth,
+                        clock=Clock(time_limit), race=True)
+        game.memory = self.memory() - before
+
+        return game
+
+    async def handle(self, reader, writer):
+        """Play a game over a connection."""
+        init = (await reader.readline()).decode().strip()
+        if not init:
+            writer.close()
+            return
+
+        self.played += 1
+        number = self.played
+        game = None
+
+        loop = asyncio.get_running_loop()
+
+        def send(lines):
+            for line in lines:
+                writer.write((line + "\n").encode())
+
+        try:
+            # A malformed init line is a ValueError, like any other bad line
+            game = self.new_game(init)
+            self.games.add(game)
+
+            send(game.opening_lines())
+            await writer.drain()
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                received = time.perf_counter()
+                game.clock.share = len(self.games)
+                send(await loop.run_in_executor(
+                    self.executor, game.feed, line.decode().strip(), received))
+                await writer.drain()
+
+        except (ConnectionError, ValueError) as e:
+            log.error("Game %d: %r", number, e)
+
+        except Exception as e:
+            # A bug in one game mustn't take the others down; this one is lost anyway
+            log.exception("Game %d: %r", number, e)
+
+        finally:
+            if game is not None:
+                # What this game allocated at the start, & a fair share of everything now
+                log.critical("Game %d over: created with %.1f KiB, %.1f KiB per game with %d playing",
+                             number, game.memory / 1024,
+                             self.memory() / len(self.games) / 1024, len(self.games))
+
+                self.games.discard(game)
+
+            writer.close()
+
+    async def serve(self):
+        if self.trace_memory:
+            tracemalloc.start()
+
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        log.critical("Serving games on %s", self.path)
+
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many games from a single process.")
+    parser.add_argument("path", help="unix socket to listen on")
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH, help="search depth; 0 is greedy")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="don't track memory (tracemalloc slows allocations down)")
+    args = parser.parse_args()
+
+    # Every move of every game would be logged otherwise
+    log.setLevel(logging.ERROR)
+
+    server = DecisionServer(args.path, args.depth, not args.no_trace_memory)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+This module evaluates whole batches of positions at once, with NumPy.
+
+Each state of state.py (side to move first) becomes a row of features:
+
+    PROGRESS        Sum of relative positions / 57 (percent_complete / 25)
+    OPENED          Coins out of the jail
+    FINISHED        Coins on the finishing square
+    HOME_COLUMN     Coins in the home column
+    SAFE            Coins on a safe square of the common track
+    KILLS           Value of the opponent's coins times the chance of
+                    hitting them with my next throw (see hits.py)
+    DANGER          The same for my coins, if the opponent were to throw
+
+The first five come for my coins, then for theirs.
+A batch is scored with a single matrix-vector product: features @ weights.
+
+The default WEIGHTS reproduce search.evaluate, so the search can score all
+the leaves of a chance node in one call; other weights can be plugged in
+as they are, and the learned models of value.py start from these features.
+"""
+
+import numpy as np
+
+from hits import HIT_MASKS, JAIL_HIT_MASKS, POINTS, PROB_LOW, PROB_HIGH, MAX_DISTANCE, ROW
+from tables import IS_SAFE, OPPOSITE, ROW_SIZE, JAIL, FINISH, HOME_COLUMN
+
+
+# Columns of the feature matrix: my coins, their coins & the chances of hits
+PROGRESS, OPENED, FINISHED, HOME, SAFE = range(5)
+THEIR_PROGRESS, THEIR_OPENED, THEIR_FINISHED, THEIR_HOME, THEIR_SAFE = range(5, 10)
+KILLS, DANGER = 10, 11
+
+FEATURES = 12
+
+NAMES = (
+    "progress", "opened", "finished", "home column", "safe",
+    "their progress", "their opened", "their finished", "their home column", "their safe",
+    "kills", "danger",
+)
+
+# Leaf evaluation of search.py: the benefits of Player.get_move on top of percent_complete
+WEIGHTS = np.zeros(FEATURES)
+WEIGHTS[[PROGRESS, THEIR_PROGRESS]] = 25, -25
+WEIGHTS[[OPENED, THEIR_OPENED]] = 15, -15
+WEIGHTS[[FINISHED, THEIR_FINISHED]] = 20, -20
+WEIGHTS[KILLS] = 1
+
+# Features of a single coin, indexed by its relative position
+_POSITIONS = np.arange(ROW_SIZE)
+COIN_FEATURES = np.stack([
+    _POSITIONS / FINISH,
+    _POSITIONS != JAIL,
+    _POSITIONS == FINISH,
+    (_POSITIONS >= HOME_COLUMN) & (_POSITIONS < FINISH),
+    (_POSITIONS != JAIL) & (_POSITIONS < HOME_COLUMN) & np.array(IS_SAFE),
+], axis=1).astype(float)
+
+# Value of a single coin (search.COIN_VALUE)
+COIN_VALUES = COIN_FEATURES[:, :SAFE] @ WEIGHTS[:SAFE]
+
+# Common track squares a coin can be hit on
+HITTABLE = np.array([1 <= rel_pos <= 51 and not IS_SAFE[rel_pos] for rel_pos in range(ROW_SIZE)])
+
+# Where a coin attacks from: coins in the jail open onto square 1 (see hits.py)
+# Attackers off the common track & targets that can't be hit are moved this far back,
+# out of reach of any attacker
+OFF_TRACK = -ROW_SIZE
+ORIGIN = np.array([
+    1 if rel_pos == JAIL else rel_pos if rel_pos <= 51 else OFF_TRACK
+    for rel_pos in range(ROW_SIZE)
+], dtype=np.intp)
+
+# Targets: a relative position (or -1) as given, if it can be hit
+TARGETS = np.where(HITTABLE, np.arange(ROW_SIZE), OFF_TRACK).astype(np.intp)
+
+# Targets: where a coin is, as seen by the other side, if it can be hit there
+OPP_TARGETS = np.array([
+    OPPOSITE[rel_pos] if rel_pos < len(OPPOSITE) and HITTABLE[OPPOSITE[rel_pos]] else OFF_TRACK
+    for rel_pos in range(ROW_SIZE)
+], dtype=np.intp)
+
+# hits.HIT_MASKS for distances -2 * ROW_SIZE to 2 * ROW_SIZE - 1; 0 for those out of reach
+# Followed by the same for hits.JAIL_HIT_MASKS, at an offset of JAIL_MASKS for coins in the jail
+DISTANCE_OFFSET = 2 * ROW_SIZE
+JAIL_MASKS = (4 * ROW_SIZE) * ROW
+MASKS = np.zeros(2 * JAIL_MASKS, dtype=np.intp)
+_DISTANCES = slice(DISTANCE_OFFSET * ROW, (DISTANCE_OFFSET + MAX_DISTANCE + 1) * ROW)
+MASKS[_DISTANCES] = HIT_MASKS
+MASKS[JAIL_MASKS:][_DISTANCES] = JAIL_HIT_MASKS
+TABLES = np.where(np.arange(ROW_SIZE) == JAIL, JAIL_MASKS, 0).astype(np.intp)
+
+# Probability of every mask of outcomes (hits.probability)
+PROBS = (np.array(PROB_LOW)[None, :] + np.array(PROB_HIGH)[:, None]).ravel()
+
+# Bit i of a coin at i, on the common track; coins on a safe square don't block
+BITS = np.array([1 << rel_pos if HITTABLE[rel_pos] else 0 for rel_pos in range(ROW_SIZE)], dtype=np.int64)
+
+# Squares 1 to MAX_DISTANCE - 1 ahead of a coin, as bits (bit i: square i + 1 ahead)
+AHEAD_MASK = (1 << (MAX_DISTANCE - 1)) - 1
+_AHEAD = np.arange(AHEAD_MASK + 1)
+SHIFTS = np.maximum(ORIGIN + 1, 0).astype(np.int64)
+
+# (distance, squares ahead that are occupied) -> blockers
+BLOCKERS = np.zeros((MAX_DISTANCE + 1, AHEAD_MASK + 1), dtype=np.uint8)
+for _distance, _points in enumerate(POINTS):
+    for _idx, _point in enumerate(_points):
+        BLOCKERS[_distance] |= (((_AHEAD >> (_point - 1)) & 1) << _idx).astype(np.uint8)
+BLOCKERS = BLOCKERS.ravel()
+
+
+class Scratch(object):
+
+    """
+    Buffers for the features of up to rows states at a time.
+
+    features & hit_chances fill these instead of allocating new arrays;
+    results are views of them, overwritten by the next call.
+
+    (np.take is called with mode="wrap": with the default mode, it copies
+    into a temporary array first. -1 is the last entry in both modes.)
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        pairs = 2 * rows
+
+        self.states = np.empty((rows, 8), dtype=np.intp)
+        self.coins = np.empty((rows, 8, SAFE + 1))
+
+        # My coins & theirs, then theirs & mine
+        self.attackers = np.empty((pairs, 4), dtype=np.intp)
+        self.victims = np.empty((pairs, 4), dtype=np.intp)
+        self.targets = np.empty((pairs, 4), dtype=np.intp)
+        self.values = np.empty((pairs, 4))
+
+        # Per attacker
+        self.origin = np.empty((pairs, 4), dtype=np.intp)
+        self.bits = np.empty((pairs, 4), dtype=np.int64)
+        self.ahead = np.empty((pairs, 4), dtype=np.int64)
+        self.tables = np.empty((pairs, 4), dtype=np.intp)
+        self.occupied = np.empty(pairs, dtype=np.int64)
+
+        # Per (target, attacker)
+        self.distance = np.empty((pairs, 4, 4), dtype=np.intp)
+        self.index = np.empty((pairs, 4, 4), dtype=np.intp)
+        self.blockers = np.empty((pairs, 4, 4), dtype=np.uint8)
+        self.masks = np.empty((pairs, 4, 4), dtype=np.intp)
+
+        # Per target
+        self.mask = np.empty((pairs, 4), dtype=np.intp)
+        self.chances = np.empty((pairs, 4))
+
+
+def hit_chances(attackers, targets, scratch=None):
+    """
+    Vectorized hits.attack_mask: for every (row, target), the chance that
+    any of the attackers of that row can land on it with a single throw.
+
+    attackers: (n, 4) & targets: (n, up to 4) relative positions of the same
+    player, 0 to 57; targets can also be -1. Only targets that are HITTABLE
+    can be hit.
+    """
+    n, k = targets.shape
+    if scratch is None:
+        scratch = Scratch((n + 1) // 2)
+
+    targets = np.take(TARGETS, targets, out=scratch.targets[:n, :k], mode="wrap")
+    return _hit_chances(attackers, targets, scratch)
+
+
+def _hit_chances(attackers, targets, scratch):
+    """hit_chances, for targets that are in TARGETS already."""
+    n, k = targets.shape
+
+    # (row, target, attacker)
+    origin = np.take(ORIGIN, attackers, out=scratch.origin[:n], mode="wrap")
+    distance = np.subtract(targets[:, :, None], origin[:, None, :], out=scratch.distance[:n, :k])
+
+    # Bit i: square i is occupied by one of the attackers & isn't safe
+    bits = np.take(BITS, attackers, out=scratch.bits[:n], mode="wrap")
+    occupied = np.bitwise_or.reduce(bits, axis=1, out=scratch.occupied[:n])
+
+    # (row, attacker): bit i: the square i + 1 ahead of it is occupied
+    ahead = np.take(SHIFTS, attackers, out=scratch.ahead[:n], mode="wrap")
+    np.right_shift(occupied[:, None], ahead, out=ahead)
+    np.bitwise_and(ahead, AHEAD_MASK, out=ahead)
+
+    # BLOCKERS[distance, ahead]
+    index = np.clip(distance, 0, MAX_DISTANCE, out=scratch.index[:n, :k])
+    np.multiply(index, AHEAD_MASK + 1, out=index)
+    np.add(index, ahead[:, None, :], out=index)
+    blockers = np.take(BLOCKERS, index, out=scratch.blockers[:n, :k], mode="wrap")
+
+    # MASKS[(distance + DISTANCE_OFFSET) * ROW + blockers + TABLES[attackers]]
+    np.add(distance, DISTANCE_OFFSET, out=index)
+    np.multiply(index, ROW, out=index)
+    np.add(index, blockers, out=index)
+    np.add(index, np.take(TABLES, attackers, out=scratch.tables[:n], mode="wrap")[:, None, :], out=index)
+    masks = np.take(MASKS, index, out=scratch.masks[:n, :k], mode="wrap")
+
+    mask = np.bitwise_or.reduce(masks, axis=2, out=scratch.mask[:n, :k])
+    return np.take(PROBS, mask, out=scratch.chances[:n, :k], mode="wrap")
+
+
+def features(states, out=None, scratch=None):
+    """
+    The (n, FEATURES) feature matrix of a batch of states; states: (n, 8) or a list of n tuples.
+
+    Pass a (n, FEATURES) float array as out to fill it instead of a new one,
+    and a Scratch of at least n rows to not allocate anything else either.
+    """
+    n = len(states)
+    if scratch is None:
+        scratch = Scratch(n)
+
+    positions = scratch.states[:n]
+    positions[...] = states
+
+    matrix = out if out is not None else np.empty((n, FEATURES))
+
+    # Features of my coins & of theirs: (n, 2, 4, SAFE + 1) summed over the coins
+    coins = np.take(COIN_FEATURES, positions, axis=0, out=scratch.coins[:n], mode="wrap")
+    np.add.reduce(coins.reshape(n, 2, 4, SAFE + 1), axis=2, out=matrix[:, :KILLS].reshape(n, 2, SAFE + 1))
+
+    # My hits on their coins & theirs on mine, in one go
+    attackers, victims = scratch.attackers[:2 * n], scratch.victims[:2 * n]
+    attackers[:n], attackers[n:] = positions[:, :4], positions[:, 4:]
+    victims[:n], victims[n:] = positions[:, 4:], positions[:, :4]
+
+    targets = np.take(OPP_TARGETS, victims, out=scratch.targets[:2 * n], mode="wrap")
+    chances = _hit_chances(attackers, targets, scratch)
+    values = np.take(COIN_VALUES, victims, out=scratch.values[:2 * n], mode="wrap")
+    np.multiply(values, chances, out=values)
+
+    np.add.reduce(values[:n], axis=1, out=matrix[:, KILLS])
+    np.add.reduce(values[n:], axis=1, out=matrix[:, DANGER])
+
+    return matrix
+
+
+def score(states, weights=WEIGHTS):
+    """Values of a batch of states for the player about to move, in a single product."""
+    return features(states) @ weights
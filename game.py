@@ -1,42 +1,62 @@
 """This module controls the entire Ludo Game and interfaces with the provided client."""
 
-# stdlib
-import sys
-import time
-
-from itertools import permutations
-
 # Our Code
 from player import Player, Coin
+from player import greedy_turn
+from protocol import Driver, Duck, Repeat
+from protocol import parse_event, format_moves
+from parallel import ParallelSearch
+from race import is_race
+from race import load as load_race
+from search import Search, SearchTimeout
+from transposition import TranspositionTable
 from config import log
 
 
-# These are used to interact with the client
-def read_line():
-    return sys.stdin.readline().strip()
+# What the client sends next (see LudoGame.feed)
+ROLL, RESULT, OPPONENT_ROLL, OPPONENT_MOVES = range(4)
+
+
+class LudoGame:
 
+    def __init__(self, player_id, game_mode, search_depth=0, clock=None, workers=0,
+                 value_model=None, race=False, mcts=None):
 
-def read_moves():
-    return read_line().split("<next>")
+        self.my_id = player_id
 
+        # Sends the greedy moves if a decision overruns its deadline (see protocol.py)
+        self.watchdog = None
 
-def write_output(txt):
-    sys.stdout.write(txt + "\n")
-    sys.stdout.flush()
+        # Were my last moves already sent by the watchdog?
+        self.answered = False
 
+        # When the line being handled was read from the client; None: just now
+        self.received = None
 
-def read_die():
-    die = read_line()
-    if "DUCK" in die:
-        return []
-    return list(map(int, die.split(" ")[2:]))
+        # Time budget of the game (see clock.py); None means no time limit
+        self.clock = clock
 
+        # Positions analysed so far; shared by all decisions of this game
+        self.table = TranspositionTable()
 
-class LudoGame:
+        # Look this many turns ahead with search.py
+        # 0 sticks to the greedy rules of Player.get_move
+        self.search = Search(search_depth, clock, self.table) if search_depth else None
 
-    def __init__(self, player_id, game_mode):
+        # A learned value model to use instead of the rules of Player.get_move (see value.py)
+        self.value = value_model
 
-        self.my_id = player_id
+        # Experimental: refine the greedy moves by playouts instead (see mcts.py)
+        self.mcts = mcts
+
+        # Exact decisions once the game is a pure race (see race.py)
+        # Only if asked for; None if it wasn't or the table hasn't been built
+        self.race = load_race() if race else None
+
+        # Or split the search over these many processes (see parallel.py)
+        self.parallel = None
+        if workers and search_depth:
+            self.parallel = ParallelSearch(workers, search_depth, clock)
 
         # Our games will only ever have 2 players
         if game_mode == 0:
@@ -79,123 +99,224 @@ class LudoGame:
 
         self.coins = coin_objects
 
-    def run(self, no_board=False):
+    def greedy_moves(self, die_rolls):
+        """
+        Decide moves using the greedy rules of Player.get_move (see player.greedy_turn).
 
-        # I'm the 2nd player
-        if self.my_id == 2:
+        Returns a list of move strings; empty if no move is possible.
+        """
+        moves, _ = greedy_turn(self.player.get_state(self.opponent), die_rolls)
+        return [self.player.move_name(move) for move in moves]
 
-            dice = read_line()
-            moves = read_moves()
+    def value_moves(self, die_rolls):
+        """
+        Decide moves with the learned value model (see value.py).
 
-            # Update coin positions using these moves
-            self.opponent.make_moves(moves, self.player)
+        Returns a list of move strings; empty if no move is possible.
+        """
+        state = self.player.get_state(self.opponent)
 
-            if not no_board:
-                self.update_board.emit(self.coins)
-                self.update_status.emit(self.opponent, moves)
+        moves, value = self.value.best_moves(state, tuple(die_rolls))
+        log.info("Value Model: log odds %.2f", value)
+
+        return [self.player.move_name(move) for move in moves]
+
+    def search_moves(self, die_rolls, fallback):
+        """
+        Refine the fallback moves by looking deeper & deeper (see search.py).
 
-        # Track whether the 2nd player is repeating
-        opponent_repeating = False
+        Stops at the turn's deadline & returns the best moves found so far;
+        the watchdog is given them too, in case we don't get to answer in time.
+        """
+        state = self.player.get_state(self.opponent)
+
+        moves = fallback
+        try:
+            for depth, best, value in self.search.iterate(state, tuple(die_rolls)):
+                moves = [self.player.move_name(move) for move in best]
+                if self.watchdog:
+                    self.watchdog.update(moves)
 
-        while True:
+                log.info("Search: depth %d, value %.2f after %d nodes",
+                         depth, value, self.search.nodes)
 
-            log.warn(self.dump_state())
+        except SearchTimeout:
+            log.warn("Search: out of time after %d nodes", self.search.nodes)
 
-            # 2nd player is not repeating, so it is my turn!
-            if not opponent_repeating:
+        log.info("Transposition Table: %s", self.table.stats())
 
-                # Roll the die
-                write_output("<THROW>")
+        return moves
 
-                # Read die rolls from client (stdin)
-                die_rolls = read_die()
+    def parallel_moves(self, die_rolls, fallback):
+        """Decide moves by searching in several processes (see parallel.py)."""
+        state = self.player.get_state(self.opponent)
 
-                log.info("Received Roll: %s", die_rolls)
+        moves, value = self.parallel.best_moves(state, tuple(die_rolls))
+        if not moves:
+            log.warn("Parallel Search: no result in time")
+            return fallback
 
-                # Save state
-                saved_positions = {
-                    name: coin.rel_pos
-                    for (name, coin) in self.coins.items()
-                }
+        log.info("Parallel Search: depth %d, value %.2f", self.parallel.depth, value)
+        log.info("Shared Transposition Table: %s", self.parallel.stats())
+        return [self.player.move_name(move) for move in moves]
 
-                # Store: [(possible_moves, benefit)]
-                all_possible_moves = []
+    def mcts_moves(self, die_rolls, fallback):
+        """
+        Refine the fallback moves by Monte Carlo Tree Search (see mcts.py).
 
-                # Consider all possible unique permutations of moves!
-                for possible_rolls in set(permutations(die_rolls)):
+        They are kept unless the playouts clearly prefer others.
+        """
+        state = self.player.get_state(self.opponent)
+        default = [self.player.state_move(move) for move in fallback]
 
-                    # Find all moves possible for this permutation of the rolls
-                    possible_moves, benefit = self.player.get_multiple_moves(possible_rolls, self.opponent)
+        moves, win = self.mcts.best_moves(state, tuple(die_rolls), default=default)
+        log.info("MCTS: win rate %.2f after %d playouts", win, self.mcts.playouts)
 
-                    # Use percent_complete & profits of each move
+        return [self.player.move_name(move) for move in moves]
 
-                    # Add it to list
-                    if possible_moves:
-                        all_possible_moves.append((possible_moves, benefit + self.player.percent_complete - self.opponent.percent_complete))
+    def decide(self, die_rolls):
+        """
+        Decide which moves to play for these die rolls.
 
-                    # log.warn("State After these moves")
-                    # log.warn(self.dump_state())
-                    # Reset state
-                    for name, coin in self.coins.items():
-                        coin.rel_pos = saved_positions[name]
+        The greedy moves (or those of the value model) are always computed
+        first, so there is an answer even if the search doesn't get anywhere
+        before the deadline.
+        """
+        if self.race:
+            state = self.player.get_state(self.opponent)
+            if is_race(state):
+                moves, win = self.race.best_moves(state, tuple(die_rolls))
+                log.info("Race Table: win chance %.3f", win)
+                return [self.player.move_name(move) for move in moves]
 
-                    # log.warn("State Reset")
-                    # log.warn(self.dump_state())
-                # if no move possible
-                if not all_possible_moves:
-                    moves = "NA"
-                else:
-                    # Only keep possible moves of maximal length
-                    maximal = max(all_possible_moves, key=lambda t: len(t[0]))
-                    max_len = len(maximal[0])
-                    all_valid_moves = filter(lambda t: len(t[0]) == max_len, all_possible_moves)
+        moves = self.value_moves(die_rolls) if self.value else self.greedy_moves(die_rolls)
 
-                    # log.critical("Max len: %r", max_len)
-                    # log.critical("Possible: %r", all_possible_moves)
-                    # log.critical("Valid: %r", all_valid_moves)
+        if self.watchdog and self.clock and moves:
+            self.watchdog.arm(moves, self.clock.time_left())
 
-                    # Sort all_valid_moves based on benefit
-                    moves = sorted(all_valid_moves, key=lambda t: t[1])[-1][0]
+        # If there is nothing to play, there is nothing to search for
+        if self.parallel and moves:
+            moves = self.parallel_moves(die_rolls, fallback=moves)
+        elif self.search and moves:
+            moves = self.search_moves(die_rolls, fallback=moves)
+        elif self.mcts and moves:
+            moves = self.mcts_moves(die_rolls, fallback=moves)
 
-                    # Play finally decided moves
-                    self.player.make_moves(moves, self.opponent)
+        return moves
+
+    def play_turn(self, die_rolls):
+        """
+        Decide & play my moves for these die rolls, on the clock.
 
-                    if not no_board:
-                        self.update_board.emit(self.coins)
-                        self.update_status.emit(self.player, moves)
+        Returns the list of move strings played; empty if no move was possible.
+        """
+        if self.clock:
+            budget = self.clock.start_turn(self.player.percent_complete / 100, self.received)
+            log.info("Turn Budget: %.3fs", budget)
 
-                    # Convert to a format that the external client understands
-                    moves = "<next>".join(moves)
+        moves = self.decide(die_rolls)
 
-                # Send the moves to client (stdout)
-                log.info("Sending Moves: %s", moves)
-                write_output(moves)
+        # Too late; the watchdog has sent the greedy moves, so those are played
+        self.answered = False
+        sent = self.watchdog.disarm() if self.watchdog else None
+        if sent is not None:
+            log.warn("Watchdog: sent the fallback moves")
+            moves = sent
+            self.answered = True
+
+        # Play finally decided moves
+        if moves:
+            self.player.make_moves(moves, self.opponent)
+
+        if self.clock:
+            elapsed = self.clock.end_turn()
+            log.info("Turn took: %.3fs, Time left: %.3fs", elapsed, self.clock.remaining)
+
+        return moves
 
-            else:
-                opponent_repeating = False
+    def observe(self, moves):
+        """Play the opponent's moves on my board."""
+        self.opponent.make_moves(moves, self.player)
 
-            # Now read in opponent's dice rolls & moves
-            dice = read_line()
+    def opening_lines(self, no_board=True):
+        """
+        Start speaking the client's protocol.
 
-            # If the moves I played didn't result in a REPEAT
-            # The opponent will now get another chance
-            if dice != "REPEAT":
+        The protocol is driven by feeding in every line read from the client;
+        opening_lines & feed return the lines to send back.
+        """
+        self.no_board = no_board
+
+        # I'm the 2nd player, the 1st one moves before me
+        if self.my_id == 2:
+            self.expecting = OPPONENT_ROLL
+            return []
+
+        return self.my_turn()
+
+    def my_turn(self):
+        log.warn(self.dump_state())
+
+        # Roll the die
+        self.expecting = ROLL
+        return ["<THROW>"]
 
-                moves = read_moves()
+    def feed(self, line, received=None):
+        """
+        Handle a line read from the client; returns the lines to send back.
 
-                # Opponent made a move that resulted in a REPEAT!
-                # So the next turn won't be mine
-                if moves[-1] == 'REPEAT':
-                    opponent_repeating = True
+        received is when the line was read, if it had to wait to be handled;
+        the clock of the turn starts then.
+        """
+        self.received = received
+        return self.handle(parse_event(line))
 
-                    # Remove "REPEAT" from moves list
-                    moves.pop()
+    def handle(self, event):
+        """Handle an event from the client (see protocol.py); returns the lines to send back."""
+        expecting = self.expecting
+
+        if expecting == ROLL:
+            die_rolls = [] if isinstance(event, Duck) else event.die_rolls
+            log.info("Received Roll: %s", die_rolls)
+
+            moves = self.play_turn(die_rolls)
+            self.expecting = RESULT
+
+            if moves and not self.no_board:
+                self.update_board.emit(self.coins)
+                self.update_status.emit(self.player, moves)
 
-                self.opponent.make_moves(moves, self.player)
+            # Send the moves to client
+            moves = format_moves(moves)
+            log.info("Sending Moves: %s", moves)
+            return [] if self.answered else [moves]
 
-                if not no_board:
-                    self.update_board.emit(self.coins)
-                    self.update_status.emit(self.opponent, moves)
+        # If the moves I played resulted in a REPEAT, I go again
+        if expecting == RESULT and isinstance(event, Repeat):
+            return self.my_turn()
+
+        # Otherwise this is the opponent's dice roll; their moves follow
+        if expecting in (RESULT, OPPONENT_ROLL):
+            self.expecting = OPPONENT_MOVES
+            return []
+
+        self.observe(event.moves)
+
+        if not self.no_board:
+            self.update_board.emit(self.coins)
+            self.update_status.emit(self.opponent, event.moves)
+
+        # Opponent made a move that resulted in a REPEAT!
+        # So the next turn won't be mine
+        if event.repeat:
+            self.expecting = OPPONENT_ROLL
+            return []
+
+        return self.my_turn()
+
+    def run(self, no_board=False):
+        """Play a game with the client over stdin & stdout, till it closes stdin."""
+        Driver(self).run(no_board)
 
 
 if __name__ == '__main__':
@@ -18,7 +18,7 @@ from game import LudoGame
 
 class LudoView(QtW.QGraphicsView):
 
-    def __init__(self, player_id, game_mode, qparent):
+    def __init__(self, player_id, game_mode, qparent, clock=None, search_depth=0):
         QtW.QGraphicsView.__init__(self)
 
         # Window's dimensions
@@ -28,7 +28,7 @@ class LudoView(QtW.QGraphicsView):
         self.board = BoardView()
         self.setScene(self.board)
 
-        self.game = ThreadedGame(player_id, game_mode)
+        self.game = ThreadedGame(player_id, game_mode, clock, search_depth)
         self.game.update_board.connect(self.board.paint)
         self.game.update_turn.connect(self.board.showTurn)
         self.game.update_status.connect(qparent.updateStatusBar)
@@ -47,15 +47,15 @@ class ThreadedGame(LudoGame, QtC.QThread):
 
     update_status = QtC.pyqtSignal(object, object)
 
-    def __init__(self, player_id, game_mode):
-        LudoGame.__init__(self, player_id, game_mode)
+    def __init__(self, player_id, game_mode, clock=None, search_depth=0):
+        LudoGame.__init__(self, player_id, game_mode, search_depth=search_depth, clock=clock)
         QtC.QThread.__init__(self)
 
         self.update_board.emit(self.coins)
 
 class LudoWindow(QtW.QMainWindow):
 
-    def __init__(self, player_id, game_mode):
+    def __init__(self, player_id, game_mode, clock=None, search_depth=0):
         QtW.QMainWindow.__init__(self)
 
         self.setGeometry(QtC.QRect(500, 100, 940, 960))
@@ -64,7 +64,7 @@ class LudoWindow(QtW.QMainWindow):
         self.statusBar = QtW.QStatusBar()
         self.setStatusBar(self.statusBar)
 
-        self.view = LudoView(player_id, game_mode, self)
+        self.view = LudoView(player_id, game_mode, self, clock, search_depth)
 
         hbox = QtW.QHBoxLayout()
         hbox.addWidget(self.view)
@@ -82,7 +82,7 @@ class LudoWindow(QtW.QMainWindow):
         msg = "%s played: %s" % (player.color.title(), ", ".join(moves))
         self.statusBar.showMessage(msg)
 
-def run_gui(player_id, game_mode, start=True):
+def run_gui(player_id, game_mode, start=True, clock=None, search_depth=0):
 
     # Close on Ctrl + C from terminal
     # https://stackoverflow.com/a/5160720
@@ -90,7 +90,7 @@ def run_gui(player_id, game_mode, start=True):
 
     app = QtW.QApplication(sys.argv)
 
-    ludo = LudoWindow(player_id, game_mode)
+    ludo = LudoWindow(player_id, game_mode, clock, search_depth)
 
     if start:
         ludo.view.game.start()
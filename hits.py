@@ -0,0 +1,159 @@
+"""
+This module holds the chances of a coin getting hit in a single throw.
+
+A throw is not a single die: a 6 earns another roll, so a coin can land
+6 + x or 6 + 6 + x squares ahead as well, stopping at 6 (or 12, x, 6 + x)
+on the way. It can't stop on a square already taken by a coin of its own
+(unless that square is safe), so such squares block some of the ways.
+
+For a target d squares ahead (1 to MAX_DISTANCE) the only squares a coin
+may have to stop at on the way are POINTS[d]: 6, 12, d - 6 & d - 12.
+Which of them are blocked is a bit mask (bit i: POINTS[d][i] is blocked)
+& the tables are indexed by: d * 16 + blockers
+
+    HIT_MASKS   the outcomes of state.ROLLS (bit i: ROLLS[i]) that hit
+    HIT_PROBS   their total probability
+
+Several attackers hit with the union of their outcomes, so the chance of
+getting hit by any of them is probability(mask | mask | ...).
+
+A coin in the jail attacks from square 1: it opens there with a 1 or a 6
+of the throw & moves on with the rest of it. JAIL_HIT_MASKS are indexed
+like HIT_MASKS, by the distance from square 1.
+"""
+
+from itertools import permutations
+
+from state import ROLLS
+from tables import IS_SAFE, JAIL
+
+
+# 6 + 6 + 5
+MAX_DISTANCE = 17
+
+# Blockers are a 4 bit mask
+ROW = 16
+
+
+def _points(distance):
+    """Squares (distances) a coin may have to stop at on its way to distance."""
+    return tuple(sorted(
+        point for point in {6, 12, distance - 6, distance - 12}
+        if 0 < point < distance
+    ))
+
+
+POINTS = tuple(_points(distance) for distance in range(MAX_DISTANCE + 1))
+
+# (bit, point) pairs of each distance
+BLOCKERS = tuple(
+    tuple((1 << idx, point) for idx, point in enumerate(points))
+    for points in POINTS
+)
+
+
+def _hits(distance, blocked, die_rolls):
+    """Can a coin land exactly distance squares ahead with some of these rolls?"""
+    for count in range(1, len(die_rolls) + 1):
+        for order in set(permutations(die_rolls, count)):
+            total = 0
+            for die in order[:-1]:
+                total += die
+                if total in blocked:
+                    break
+            else:
+                if total + order[-1] == distance:
+                    return True
+    return False
+
+
+def _opens_and_hits(distance, blocked, die_rolls):
+    """Can a coin in the jail open & then land distance squares past square 1?"""
+    for opening in (1, 6):
+        if opening in die_rolls:
+            rest = list(die_rolls)
+            rest.remove(opening)
+            if _hits(distance, blocked, rest):
+                return True
+    return False
+
+
+def _hit_mask(distance, blockers, hits=_hits):
+    points = POINTS[distance]
+    blocked = {point for idx, point in enumerate(points) if blockers & (1 << idx)}
+
+    mask = 0
+    for idx, (_, die_rolls) in enumerate(ROLLS):
+        if die_rolls and hits(distance, blocked, die_rolls):
+            mask |= 1 << idx
+    return mask
+
+
+def _hit_masks(hits):
+    return tuple(
+        _hit_mask(distance, blockers, hits)
+        if 0 < distance and blockers < (1 << len(POINTS[distance])) else 0
+        for distance in range(MAX_DISTANCE + 1)
+        for blockers in range(ROW)
+    )
+
+
+HIT_MASKS = _hit_masks(_hits)
+JAIL_HIT_MASKS = _hit_masks(_opens_and_hits)
+
+# Probability of a mask of outcomes, in two halves: PROB_LOW[mask & 0xFF] + PROB_HIGH[mask >> 8]
+PROB_LOW = tuple(
+    sum(prob for idx, (prob, _) in enumerate(ROLLS[:8]) if mask & (1 << idx))
+    for mask in range(256)
+)
+PROB_HIGH = tuple(
+    sum(prob for idx, (prob, _) in enumerate(ROLLS[8:]) if mask & (1 << idx))
+    for mask in range(256)
+)
+
+
+def probability(mask):
+    """Total probability of a set of outcomes of ROLLS."""
+    return PROB_LOW[mask & 0xFF] + PROB_HIGH[mask >> 8]
+
+
+HIT_PROBS = tuple(probability(mask) for mask in HIT_MASKS)
+
+
+def attack_mask(attackers, target):
+    """
+    Outcomes with which any of the attackers can land on target.
+
+    attackers are the relative positions of a player's coins & target
+    is a relative position of the same player. Coins can only be hit on
+    the common track (1 to 51) & never on a safe square.
+    """
+    if not 1 <= target <= 51 or IS_SAFE[target]:
+        return 0
+
+    mask = 0
+    jailed = False
+    for pos in attackers:
+        if pos == JAIL:
+            jailed = True
+        elif pos <= 51 and 0 < target - pos <= MAX_DISTANCE:
+            mask |= _mask(HIT_MASKS, attackers, pos, target)
+
+    # Coins in the jail all attack from square 1, the same way
+    if jailed and 0 < target - 1 <= MAX_DISTANCE:
+        mask |= _mask(JAIL_HIT_MASKS, attackers, 1, target)
+
+    return mask
+
+
+def _mask(masks, attackers, pos, target):
+    """Outcomes of masks with which a coin at pos lands on target, blocked by the attackers."""
+    distance = target - pos
+
+    blockers = 0
+    for bit, point in BLOCKERS[distance]:
+        square = pos + point
+        if square in attackers and not IS_SAFE[square]:
+            blockers |= bit
+
+    return masks[distance * ROW + blockers]
@@ -7,16 +7,36 @@ It takes in parameters from the provided client program
 and decides whether to show the GUI or not.
 """
 
-from game import LudoGame
-from game import read_line
+import os
+import sys
 
-from config import log
+
+# Turns to look ahead, if the clock allows it
+SEARCH_DEPTH = 3
+
+# Set to the socket of a running decision_server.py to play the game there
+SERVER_ENV = "LUDO_DECISION_SERVER"
+
+# Set to a number of processes to search with (see parallel.py)
+WORKERS_ENV = "LUDO_SEARCH_WORKERS"
 
 
 if __name__ == '__main__':
 
+    # Only relay to the decision server; our code is already loaded there
+    if os.environ.get(SERVER_ENV):
+        from relay import relay
+        sys.exit(relay(os.environ[SERVER_ENV]))
+
+    # Imported here, so the relay doesn't pay for them
+    from game import LudoGame
+
+    from clock import Clock
+
+    from config import log
+
     # Read initial parameters from the client
-    init = list(map(int, read_line().split(' ')))
+    init = list(map(int, sys.stdin.readline().strip().split(' ')))
 
     log.critical(init)
 
@@ -25,14 +45,22 @@ if __name__ == '__main__':
     game_mode = init[2]
     no_board = not bool(init[3])
 
+    # The client doesn't know about our workers; without them the search stays in this process
+    workers = int(os.environ.get(WORKERS_ENV) or 0)
+
     log.debug("My Player ID: %d", player_id)
     log.debug("Time Limit: %d", time_limit)
     log.debug("Game Mode: %d", game_mode)
     log.debug("Drawing Board: %d", no_board)
+    log.debug("Search Workers: %d", workers)
+
+    # Spread the time limit over the turns of the game
+    clock = Clock(time_limit)
 
     if no_board:
 
-        game = LudoGame(player_id, game_mode)
+        game = LudoGame(player_id, game_mode, search_depth=SEARCH_DEPTH, clock=clock, workers=workers,
+                        race=True)
         game.run(no_board=True)
 
     else:
@@ -40,4 +68,4 @@ if __name__ == '__main__':
         # This makes the dependency on PyQt optional!
         # TODO: What if no_board is false; but PyQt was not found?
         import gui
-        gui.run_gui(player_id, game_mode)
+        gui.run_gui(player_id, game_mode, clock=clock, search_depth=SEARCH_DEPTH)
@@ -0,0 +1,408 @@
+"""
+This module decides moves with Monte Carlo Tree Search.
+
+Instead of scoring positions with hand tuned rules, it plays thousands of
+quick random games (playouts) from the current position and prefers the
+moves after which we win most of them.
+
+The tree alternates between two kinds of nodes:
+
+    * Decision nodes: the die has been rolled, a player picks moves (UCT)
+    * Chance nodes: a player is about to roll (sampled from state.ROLLS)
+
+Playouts are the hot loop, so they don't work on state tuples but on a
+single list of 8 positions that is modified in place.
+
+This is experimental: main.py doesn't play it, but LudoGame takes an
+MCTS to refine its greedy moves, so that selfplay.py can benchmark it,
+eg: python selfplay.py --a mcts:2000 --b greedy. On its own, picking the most visited moves lost to the greedy rules of
+Player.get_move (win rate 0.30). Only keeping the greedy moves as the
+default, and overriding them when the playouts clearly prefer others
+(see MCTS.clearly_better), beat greedy: 0.64 over 100 games (95% CI
+0.54 - 0.73) with 2000 playouts a decision & no clock. That is about
+20s of CPU a game (~4000 playouts/s), against well under a second for
+greedy; under the client's time limit there are fewer playouts per turn.
+It needs better playouts before it can be played under the clock.
+"""
+
+import math
+import time
+import random
+
+from state import ROLLS, JAIL, FINISH
+from state import swap, is_finished, earns_repeat, apply_move, end_states
+
+from tables import IS_SAFE, OPPOSITE
+
+
+# Give up on a playout after these many turns & call it by percent_complete
+MAX_PLAYOUT_TURNS = 500
+
+# Cumulative probabilities of state.ROLLS, for sampling an outcome
+# The last one is exactly 1, whatever the floating point errors
+CUMULATIVE = tuple(
+    sum(prob for prob, _ in ROLLS[:idx + 1]) for idx in range(len(ROLLS) - 1)
+) + (1.0,)
+
+
+def _play_die(pos, base, opp_base, die, greedy, rand):
+    """
+    Move one coin of the player whose coins start at pos[base].
+
+    Picks a random legal coin, or if greedy, a coin by the priorities of
+    Player.get_move: finish > open > kill > farthest.
+
+    Returns 0 if no coin could move, 1 for a plain move
+    and 2 if the move earned a repeat (kill or finish).
+    """
+    chosen = -1
+    chosen_score = -1
+    count = 0
+
+    for idx in range(base, base + 4):
+        rel_pos = pos[idx]
+
+        if rel_pos == JAIL:
+            if die != 1 and die != 6:
+                continue
+            target = 1
+        else:
+            target = rel_pos + die
+            if target > FINISH:
+                continue
+
+            # No stacking on unsafe squares
+            if not IS_SAFE[target] and (
+                    pos[base] == target or pos[base + 1] == target or
+                    pos[base + 2] == target or pos[base + 3] == target):
+                continue
+
+        count += 1
+
+        if greedy:
+            if target == FINISH:
+                score = 300
+            elif rel_pos == JAIL:
+                score = 200
+            elif not IS_SAFE[target] and OPPOSITE[target] in pos[opp_base:opp_base + 4]:
+                score = 100 + rel_pos
+            else:
+                score = rel_pos
+
+            if score > chosen_score:
+                chosen, chosen_score = idx, score
+
+        # Reservoir sampling: a uniformly random legal coin, in a single pass
+        elif rand() * count < 1:
+            chosen = idx
+
+    if chosen < 0:
+        return 0
+
+    rel_pos = pos[chosen]
+    target = 1 if rel_pos == JAIL else rel_pos + die
+    pos[chosen] = target
+
+    if target == FINISH:
+        return 2
+
+    repeat = 1
+    if not IS_SAFE[target]:
+        victim = OPPOSITE[target]
+        for idx in range(opp_base, opp_base + 4):
+            if pos[idx] == victim:
+                pos[idx] = JAIL
+                repeat = 2
+
+    return repeat
+
+
+def playout(pos, side, greedy=False, rand=random.random):
+    """
+    Play a game till the end, starting with side about to roll.
+
+    pos is a list of 8 positions where coins of side 0 come first,
+    it is modified in place. Returns the side (0 or 1) that won.
+    """
+    for _ in range(MAX_PLAYOUT_TURNS):
+        base = 4 * side
+        opp_base = 4 - base
+
+        # Throw: 6s earn another roll, but three 6s are a DUCK
+        die = int(rand() * 6) + 1
+        if die == 6:
+            second = int(rand() * 6) + 1
+            if second == 6:
+                third = int(rand() * 6) + 1
+                if third == 6:
+                    side = 1 - side
+                    continue
+                rolls = (6, 6, third)
+            else:
+                rolls = (6, second)
+        else:
+            rolls = None
+
+        repeat = False
+        if rolls is None:
+            repeat = _play_die(pos, base, opp_base, die, greedy, rand) == 2
+        else:
+            for die in rolls:
+                if _play_die(pos, base, opp_base, die, greedy, rand) == 2:
+                    repeat = True
+
+        if pos[base] == pos[base + 1] == pos[base + 2] == pos[base + 3] == FINISH:
+            return side
+
+        if not repeat:
+            side = 1 - side
+
+    # Too long; whoever has completed more wins
+    return 0 if sum(pos[:4]) >= sum(pos[4:]) else 1
+
+
+def _lead(sequence):
+    """How far ahead of the opponent I am after a sequence: (end state, moves)"""
+    end = sequence[0]
+    return sum(end[:4]) - sum(end[4:])
+
+
+class _Chance(object):
+
+    """A player (side) is about to roll in state (seen from their side)."""
+
+    __slots__ = ["state", "side", "mover", "visits", "wins", "children"]
+
+    def __init__(self, state, side, mover):
+        self.state = state
+        self.side = side
+        # The player who moved into this node; wins are counted for them
+        self.mover = mover
+        self.visits = 0
+        self.wins = 0
+        # Index in ROLLS -> _Decision
+        self.children = {}
+
+
+class _Decision(object):
+
+    """A player (side) has rolled die_rolls in state (seen from their side)."""
+
+    __slots__ = ["state", "side", "visits", "children", "untried"]
+
+    def __init__(self, state, side, die_rolls):
+        self.state = state
+        self.side = side
+        self.visits = 0
+        # [(moves, _Chance), ...]
+        self.children = []
+        # [(end state, moves), ...] not expanded yet; the most promising last:
+        # the boards where I'm furthest ahead of the opponent
+        self.untried = sorted(reversed(list(end_states(state, die_rolls).items())), key=_lead)
+
+
+class MCTS(object):
+
+    """UCT search with chance nodes for die rolls."""
+
+    # Playouts per decision when there is no clock
+    PLAYOUTS = 2000
+
+    # Poll the clock once every these many playouts
+    POLL_INTERVAL = 16
+
+    # Only play other moves than the default ones (see best_moves) if they win
+    # more often by these many standard errors
+    OVERRIDE_Z = 2.0
+
+    def __init__(self, clock=None, greedy_rollouts=True, exploration=1.4, seed=None,
+                 playouts=None):
+        # Playouts run till the turn's deadline (see clock.py)
+        self.clock = clock
+
+        # Or, without a clock, these many a decision
+        self.max_playouts = playouts if playouts is not None else self.PLAYOUTS
+
+        # Rollout policy: Player.get_move like priorities, or random moves
+        self.greedy = greedy_rollouts
+
+        # UCT exploration constant
+        self.exploration = exploration
+
+        self.random = random.Random(seed).random
+
+        # Statistics of the last decision
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    @property
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def best_moves(self, state, die_rolls, playouts=None, default=None):
+        """
+        Find the best sequence of moves for the player about to move.
+
+        Runs till the clock's deadline, or for a number of playouts.
+        default are the moves to play unless the playouts clearly prefer
+        others (eg: the greedy ones); the most visited moves if None.
+
+        Returns a tuple: (moves, win rate) where moves is a list of
+        state moves: [(coin index, die), ...]; an empty list means "NA".
+        """
+        if playouts is None and self.clock is None:
+            playouts = self.max_playouts
+
+        self.playouts = 0
+        self.elapsed = 0.0
+
+        root = _Decision(state, 0, die_rolls)
+        if not root.untried:
+            return [], 0.0
+
+        # Only one way to play; nothing to think about
+        if len(root.untried) == 1:
+            return list(root.untried[0][1]), 0.0
+
+        # Expand the default moves first, so they are root.children[0]
+        # (They needn't be among the longest sequences, eg: greedy ones)
+        if default is not None:
+            end = state
+            for move in default:
+                end = apply_move(end, move)
+            root.untried = [untried for untried in root.untried if untried[0] != end]
+            root.untried.append((end, tuple(default)))
+
+        started = time.perf_counter()
+
+        while playouts is None or self.playouts < playouts:
+            if (self.clock and self.playouts % self.POLL_INTERVAL == 0 and
+                    self.clock.out_of_time()):
+                break
+
+            self.iterate(root)
+            self.playouts += 1
+
+        self.elapsed = time.perf_counter() - started
+
+        # The deadline might pass before anything was expanded
+        if not root.children:
+            return list(root.untried[-1][1]), 0.0
+
+        moves, child = max(root.children, key=lambda c: c[1].visits)
+        if default is not None and not self.clearly_better(child, root.children[0][1]):
+            moves, child = root.children[0]
+
+        return list(moves), child.wins / child.visits
+
+    def clearly_better(self, child, default):
+        """Does child win more often than default, by OVERRIDE_Z standard errors?"""
+        if child is default:
+            return True
+
+        # With a win & a loss added to each, so that a few lucky playouts aren't a certainty
+        p = (child.wins + 1) / (child.visits + 2)
+        q = (default.wins + 1) / (default.visits + 2)
+        error = math.sqrt(p * (1 - p) / (child.visits + 2) + q * (1 - q) / (default.visits + 2))
+        return p - q > self.OVERRIDE_Z * error
+
+    def iterate(self, root):
+        """Selection, expansion, a playout & back propagation."""
+        path = []
+        node = root
+
+        while True:
+            node.visits += 1
+
+            if isinstance(node, _Chance):
+                path.append(node)
+
+                winner = self.winner(node)
+                if winner is not None:
+                    break
+
+                node = self.sample(node)
+                continue
+
+            if node.untried:
+                # Expand one new sequence of moves & play it out
+                end, moves = node.untried.pop()
+                child = self.make_chance(node, end)
+                node.children.append((moves, child))
+
+                child.visits += 1
+                path.append(child)
+                winner = self.simulate(child)
+                break
+
+            if not node.children:
+                # Can't move; the opponent rolls next
+                node.children.append(([], self.make_chance(node, None)))
+                node = node.children[0][1]
+                continue
+
+            node = self.select(node)
+
+        for chance in path:
+            if chance.mover == winner:
+                chance.wins += 1
+
+    def make_chance(self, decision, end):
+        """Chance node after decision's player moved to end (None: passed)."""
+        side = decision.side
+
+        if end is None:
+            return _Chance(swap(decision.state), 1 - side, side)
+        elif earns_repeat(decision.state, end):
+            return _Chance(end, side, side)
+
+        return _Chance(swap(end), 1 - side, side)
+
+    def select(self, decision):
+        """UCT: Pick the chance node with the best upper confidence bound."""
+        log_visits = math.log(decision.visits)
+        exploration = self.exploration
+
+        best, best_score = None, -1
+        for _, child in decision.children:
+            score = (child.wins / child.visits +
+                     exploration * math.sqrt(log_visits / child.visits))
+            if score > best_score:
+                best, best_score = child, score
+
+        return best
+
+    def sample(self, chance):
+        """Roll the die: The decision node of a random outcome of ROLLS."""
+        r = self.random()
+
+        idx = 0
+        while CUMULATIVE[idx] < r:
+            idx += 1
+
+        if idx not in chance.children:
+            chance.children[idx] = _Decision(chance.state, chance.side, ROLLS[idx][1])
+
+        return chance.children[idx]
+
+    @staticmethod
+    def winner(chance):
+        """Side that has won at a chance node; None if the game goes on."""
+        if is_finished(swap(chance.state)):
+            return 1 - chance.side
+        if is_finished(chance.state):
+            return chance.side
+        return None
+
+    def simulate(self, chance):
+        """Play out a game from a chance node; returns the side that won."""
+        winner = self.winner(chance)
+        if winner is not None:
+            return winner
+
+        # Playouts see the player about to roll as side 0
+        pos = list(chance.state)
+        if playout(pos, 0, self.greedy, self.random) == 0:
+            return chance.side
+
+        return 1 - chance.side
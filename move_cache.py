@@ -0,0 +1,76 @@
+"""
+This module remembers the decisions of the greedy rules (see player.greedy_move).
+
+A decision only depends on the positions of the 8 coins & the die roll,
+and the same boards come up again & again over a game (and even more
+so over thousands of self play games). So every decision is stored in
+a bounded cache, keyed by the state packed into a single int (see
+player.move_key), and the least recently used ones are evicted.
+
+Decisions are stored as state moves: (coin index, die), not Coin objects,
+so that they can be used by any Player & after any number of moves on the board.
+
+Games of decision_server.py decide on a pool of threads and share the
+cache, so every access holds a lock.
+"""
+
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+
+    """A dict with at most size entries; the least recently used one goes first."""
+
+    def __init__(self, size=1 << 15):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """The value stored for key; default if it isn't there."""
+        with self.lock:
+            entries = self.entries
+            if key in entries:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entries[key]
+
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            entries = self.entries
+            entries[key] = value
+            entries.move_to_end(key)
+
+            if len(entries) > self.size:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return "hits: %d, misses: %d (%.1f%%), evictions: %d, size: %d/%d" % (
+            self.hits, self.misses, 100 * self.hit_rate, self.evictions, len(self), self.size)
+
+
+# Decisions of player.greedy_move: player.move_key -> (move or None, benefit)
+MOVE_CACHE = LRUCache()
@@ -0,0 +1,166 @@
+"""
+This module spreads a search over several processes.
+
+Threads would not help, Python runs only one of them at a time (GIL),
+so every worker is a separate process with its own Search & table.
+
+The sequences of moves possible at the root are split between the
+workers; each one searches its share as deep as the deadline allows and
+the results are merged. Workers are started once per game and only ever
+receive compact states (tuples of ints) from the game.
+
+All workers share a single transposition table (see shared_table.py),
+so a position analysed by one of them is not analysed again by another.
+"""
+
+import atexit
+import multiprocessing
+
+from clock import Clock
+from search import Search, SearchTimeout, evaluate
+from shared_table import SharedTranspositionTable
+from state import swap, end_states
+
+
+# The Search of this worker process; created once by _init_worker
+_search = None
+
+
+def _init_worker(max_depth, table_size, table_name):
+    global _search
+    _search = Search(max_depth, table=SharedTranspositionTable(table_size, table_name))
+
+
+def _search_share(state, die_rolls, share, deadline):
+    """
+    Runs in a worker: search a share of the sequences possible at the root.
+
+    deadline is the game's, on the system-wide time.perf_counter (see clock.py);
+    so the time the task waited to start counts.
+
+    Returns a list with an entry for every completed depth:
+    [(depth, moves, value), ...] & the table hits & misses of this search.
+    """
+    _search.clock = Clock.until(deadline) if deadline is not None else None
+
+    table = _search.table
+    hits, misses = table.hits, table.misses
+
+    results = []
+    try:
+        for depth, moves, value in _search.iterate(state, die_rolls, only=share):
+            results.append((depth, moves, value))
+    except SearchTimeout:
+        pass
+
+    return results, table.hits - hits, table.misses - misses
+
+
+class ParallelSearch(object):
+
+    """Root parallel search across a pool of worker processes."""
+
+    # Seconds kept aside for merging results & talking to the workers
+    MARGIN = 0.05
+
+    def __init__(self, workers, max_depth=2, clock=None, table_size=1 << 18):
+        self.workers = workers
+        self.max_depth = max_depth
+
+        # Budget of every turn comes from here (see clock.py)
+        self.clock = clock
+
+        # Depth that all workers completed in the last search
+        self.depth = 0
+
+        # Shared table lookups of all workers, over the whole game
+        self.hits = 0
+        self.misses = 0
+
+        self.table = SharedTranspositionTable(table_size)
+
+        self.pool = multiprocessing.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(max_depth, table_size, self.table.name),
+        )
+
+        # Games end when the client closes our stdin, not by calling close()
+        atexit.register(self.close)
+
+    def close(self):
+        if self.pool is None:
+            return
+
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+
+        self.table.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return "hits: %d, misses: %d (%.1f%%)" % (
+            self.hits, self.misses, 100 * self.hits / lookups if lookups else 0)
+
+    def shares(self, state, die_rolls):
+        """
+        Split the sequences possible at the root between the workers.
+
+        Sequences are dealt out like cards, in the order of their evaluation,
+        so that every worker gets some promising & some poor ones.
+        """
+        sequences = end_states(state, die_rolls)
+        ordered = sorted(sequences, key=lambda end: evaluate(swap(end)))
+
+        shares = [set(ordered[idx::self.workers]) for idx in range(self.workers)]
+        return [share for share in shares if share]
+
+    def best_moves(self, state, die_rolls):
+        """
+        Find the best sequence of moves for the player about to move.
+
+        Only the shares of workers that completed a depth in time are
+        merged. Returns a tuple: (moves, value); moves is empty if no worker
+        could complete even a single depth before the deadline.
+        """
+        self.depth = 0
+
+        deadline = None
+        if self.clock:
+            if self.clock.time_left() <= self.MARGIN:
+                return [], 0
+            deadline = self.clock.deadline - self.MARGIN
+
+        self.table.new_turn()
+
+        pending = [
+            self.pool.apply_async(_search_share, (state, die_rolls, share, deadline))
+            for share in self.shares(state, die_rolls)
+        ]
+
+        results = []
+        for result in pending:
+            try:
+                timeout = max(0, self.clock.time_left()) if self.clock else None
+                completed, hits, misses = result.get(timeout=timeout)
+            except multiprocessing.TimeoutError:
+                # Its share is lost, the other workers may have finished theirs
+                continue
+
+            self.hits += hits
+            self.misses += misses
+
+            if completed:
+                results.append(completed)
+
+        if not results:
+            return [], 0
+
+        # Values are only comparable if they were searched to the same depth
+        self.depth = min(len(result) for result in results)
+
+        best = max((result[self.depth - 1] for result in results), key=lambda r: r[2])
+        _, moves, value = best
+
+        return moves, value
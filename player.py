@@ -1,29 +1,200 @@
 """
-This module deals with the logical representation of a Board, Player and Coins.
+This module deals with the logical representation of a Player and Coins.
+
+The greedy rules (greedy_move & the functions it uses) work on the
+compact states of state.py; a Player keeps the board of a game up to date
+& only packs it into a state to ask them for a decision.
 """
 
 from config import PLAYER_COLORS
 from config import log
 
+from hits import attack_mask, probability
+from move_cache import MOVE_CACHE
+from state import apply_move, orderings
+from tables import ROW_SIZE, ABS_POS, IS_SAFE, OPPOSITE, COLOR_INDEX, JAIL, FINISH
+
+
+# The greedy rules work on the states of state.py: my 4 coins first, then the opponent's.
+# Player's methods with the same names are thin wrappers around them.
+
+def percent_complete(coins):
+    """How much game have these coins completed?"""
+    return sum([25 * (rel_pos / 57) for rel_pos in coins])
+
+
+def threat(state, rel_pos):
+    """
+    Threat at a relative position of mine: the chance that the opponent
+    can kill a coin there with their next throw (see hits.py)
+    """
+    # Off the common track or safe: OPPOSITE is -1, which is never hit
+    if rel_pos > FINISH or IS_SAFE[rel_pos]:
+        return 0
+
+    return probability(attack_mask(state[4:], OPPOSITE[rel_pos]))
+
+
+def in_danger(state):
+    """Indices of my coins which can get killed in the next die roll; nearest first."""
+    return sorted(
+        (idx for idx in range(4) if threat(state, state[idx]) > 0),
+        key=lambda idx: state[idx],
+    )
+
+
+def move_key(state, die):
+    """Pack everything greedy_move depends on into a single int: the die & 6 bits per coin."""
+    key = die
+    for rel_pos in state:
+        key = (key << 6) | rel_pos
+    return key
+
+
+def greedy_move(state, die):
+    """
+    Like decide_move, but remembers decisions (see move_cache.py).
+
+    Returns a tuple: (move, benefit) where move is a state move:
+    (coin index, die); or None if no move is possible.
+    """
+    key = move_key(state, die)
+
+    cached = MOVE_CACHE.get(key)
+    if cached is None:
+        cached = decide_move(state, die)
+        MOVE_CACHE.put(key, cached)
+
+    return cached
+
+
+def decide_move(state, die):
+    """
+    Use positions of the opponent's coins to make a move.
+
+    This only works for a single die roll and is extended by greedy_moves.
+
+    Returns a tuple: (move, benefit); move is None if no move is possible.
+    """
+    mine = state[:4]
+    theirs = state[4:]
+
+    # Coins which can move: out of the jail & not overshooting the finishing square
+    movable = [idx for idx in range(4) if 0 < mine[idx] <= FINISH - die]
+
+    # Those that don't cause stacking: either the coin moves to a safe square
+    # (where stacking is allowed) or there is no coin of mine there
+    non_stacking = [
+        idx for idx in movable
+        if IS_SAFE[mine[idx] + die] or mine[idx] + die not in mine
+    ]
+
+    # Move coin that can finish; any one will do
+    for idx in movable:
+        if mine[idx] + die == FINISH:
+            log.info("Finishing Move: %d", idx)
+            return (idx, die), 20
+
+    # Open the lowest coin from the jail
+    if die in (1, 6) and JAIL in mine:
+        idx = mine.index(JAIL)
+        log.info("Opening Move: %d", idx)
+        return (idx, die), 15
+
+    # Kill the opponent's farthest possible coin
+    killer, farthest = None, -1
+    for idx in movable:
+        target = mine[idx] + die
+        if target < 52 and not IS_SAFE[target] and OPPOSITE[target] in theirs:
+            if OPPOSITE[target] >= farthest:
+                killer, farthest = idx, OPPOSITE[target]
+
+    if killer is not None:
+        log.info("Killing Move: %d -> %d", killer, farthest)
+        return (killer, die), 14
+
+    # If in danger, save the farthest coin in danger
+    can_get_killed = [idx for idx in in_danger(state) if idx in non_stacking]
+    if can_get_killed:
+        log.info("Defensive move, Saving %d", can_get_killed[-1])
+        return (can_get_killed[-1], die), 10
+
+    # Modified Fast: choose the coin that has moved farthest
+    if non_stacking:
+        non_stacking.sort(key=lambda idx: mine[idx])
+
+        # if at least two coins movable, & the threat at the future position of
+        # the second farthest coin is less than that of the farthest coin
+        if (len(non_stacking) > 1 and
+                threat(state, mine[non_stacking[-2]] + die) <
+                threat(state, mine[non_stacking[-1]] + die)):
+
+            log.info("Fast Move : %d" % non_stacking[-2])
+            return (non_stacking[-2], die), 9  # move second farthest coin
+
+        log.info("Fast Move : %d" % non_stacking[-1])
+        return (non_stacking[-1], die), 8
+
+    # No move possible
+    log.info("No Move Possible")
+    return None, 0
+
+
+def greedy_moves(state, die_rolls):
+    """
+    Extends greedy_move to a list of die rolls, played one after another.
+
+    Every decision is based on the state left by the moves before it.
+    Returns a tuple: (moves, total benefit, state after the moves).
+    """
+    moves = []
+    total_benefit = 0
 
-class Board(object):
+    for die in die_rolls:
+        move, benefit = greedy_move(state, die)
 
-    """Logical representation of a board."""
+        if move:
+            state = apply_move(state, move)
+            moves.append(move)
+            total_benefit += benefit
 
-    # There is no __init__ because we'll never create a board
-    # but only use methods & variables defined on it.
+    return moves, total_benefit, state
 
-    # Starting squares & Star squares
-    safe_squares = [1, 9, 14, 22, 27, 35, 40, 48]
-    home_column = list(range(52, 58))
 
-    @staticmethod
-    def is_safe(rel_pos):
-        """Checks whether a given relative position is safe or not?"""
-        if rel_pos in Board.safe_squares + Board.home_column + [0]:
-            return True
+def greedy_turn(state, die_rolls):
+    """
+    Decide moves for a whole throw by the greedy rules.
 
-        return False
+    Every order of the rolls is played with greedy_moves; of the orders
+    that play the most rolls, the one with the best benefit (plus the lead
+    in percent_complete it leaves) wins.
+
+    Returns a tuple: (moves, state after the moves); moves is empty if no move is possible.
+    """
+    # Store: [(possible_moves, benefit, end state)]
+    all_possible_moves = []
+
+    # Consider all possible unique permutations of moves!
+    for possible_rolls in orderings(die_rolls):
+
+        # Find all moves possible for this permutation of the rolls
+        possible_moves, benefit, end = greedy_moves(state, possible_rolls)
+
+        # Use percent_complete & profits of each move
+        if possible_moves:
+            all_possible_moves.append((
+                possible_moves, benefit + percent_complete(end[:4]) - percent_complete(end[4:]), end))
+
+    if not all_possible_moves:
+        return [], state
+
+    # Only keep possible moves of maximal length
+    max_len = max(len(moves) for moves, _, _ in all_possible_moves)
+    all_valid_moves = [t for t in all_possible_moves if len(t[0]) == max_len]
+
+    # Sort all_valid_moves based on benefit
+    moves, _, end = sorted(all_valid_moves, key=lambda t: t[1])[-1]
+    return moves, end
 
 
 class Player(object):
@@ -36,119 +207,65 @@ class Player(object):
         self.color = color
         self.number = PLAYER_COLORS.index(color)
 
+        # Row of this player in the absolute position table
+        self.abs_row = self.number * ROW_SIZE
+
         # Each Player has 4 Coins
         self.coins = {}
         for idx in range(0, 4):
-            coin = Coin(color, idx)
+            coin = Coin(color, idx, owner=self)
             self.coins[str(coin)] = coin
 
+        # Coins by their number
+        self.coin_list = list(self.coins.values())
+
+        # Occupancy index of my coins, Coin.rel_pos keeps it up to date
+        # make_moves finds the coins it kills here
+
+        # Absolute square (on the common track) -> My coins on it, sorted by number
+        self.squares = {}
+
+    def _relocate(self, coin, old_pos, new_pos):
+        """Update the occupancy index when one of my coins moves."""
+        if 0 < old_pos < 52:
+            abs_pos = ABS_POS[self.abs_row + old_pos]
+            old = self.squares[abs_pos]
+            old.remove(coin)
+
+            # Don't let empty squares pile up
+            if not old:
+                del self.squares[abs_pos]
+
+        if 0 < new_pos < 52:
+            new = self.squares.setdefault(ABS_POS[self.abs_row + new_pos], [])
+            new.append(coin)
+            if len(new) > 1:
+                new.sort(key=lambda c: c.num)
+
     @property
     def percent_complete(self):
         """How much game have I completed?"""
-        return sum([25 * (c.rel_pos / 57) for c in self.coins.values()])
+        return percent_complete(c.rel_pos for c in self.coin_list)
 
-    @property
-    def in_jail(self):
-        """Which coins are still in the Jail?"""
-        return [c for c in self.coins.values() if c.rel_pos == 0]
+    def get_state(self, opponent):
+        """Pack positions of my & opponent's coins into a state tuple (see state.py)."""
+        return (
+            tuple(c.rel_pos for c in self.coins.values()) +
+            tuple(c.rel_pos for c in opponent.coins.values())
+        )
 
-    @property
-    def finished_coins(self):
-        """Which coins have reached finishing square?"""
-        return [c for c in self.coins.values() if c.rel_pos == 57]
+    def move_name(self, move):
+        """Convert a state move: (coin index, die) to a move string: "R0_6"."""
+        return "%s%d_%d" % (self.color[0], move[0], move[1])
 
-    @property
-    def on_home_col(self):
-        """Which coins are on home column?"""
-        return [c for c in self.coins.values() if 52 <= c.rel_pos <= 56]
-
-    def movable_coins(self, die):
-        """Coins which can move on a die roll."""
-
-        return [
-            coin for coin in self.coins.values()
-            if (
-                coin not in self.finished_coins and  # not finished
-                coin not in self.in_jail and         # not in jail
-                coin.rel_pos <= 57 - die             # move is allowed
-            )
-        ]
-
-    def non_stacking_moves(self, die):
-        """Returns a list of movable coins that wont cause stacking"""
-        # Remove coins which if moved will cause stacking
-        rel_pos_of_my_coins = [
-            coin.rel_pos
-            for coin in self.coins.values()
-        ]
-
-        # log.info("Movable: %s", self.movable_coins(die))
-
-        movable_coins = [
-            coin
-            for coin in self.movable_coins(die)
-            # either this coin moves to a safe square
-            # (where stacking is allowed)
-            if Board.is_safe(coin.rel_pos + die) or
-            # or it does not cause stacking
-            (coin.rel_pos + die) not in rel_pos_of_my_coins
-        ]
-        return movable_coins
-
-    def can_finish(self, die):
-        """Coins which can finish on a die roll."""
-        return [coin for name, coin in self.coins.items() if coin.rel_pos + die == 57]
+    def state_move(self, name):
+        """Convert a move string: "R0_6" back to a state move: (coin index, die)."""
+        coin, die = name[1:].split("_")
+        return int(coin), int(die)
 
     def in_danger(self, opponent):
-        """Coins which can get_killed in the next die roll"""
-        in_danger = [coin for coin in self.coins.values() if self.threat(coin.rel_pos, opponent) > 0]
-        # sorted in increasing order of relative position
-        return sorted(in_danger, key = lambda coin: coin.rel_pos)
-
-    def threat(self, relpos, opponent):
-        """Returns threat at a relpos"""
-        if relpos > 57:
-            relpos = 57
-
-        # if this position is safe then no threat
-        if Board.is_safe(relpos):
-            return 0
-
-        abs_pos = list(self.coins.values())[0].rel_to_abs(relpos)
-
-        threat = 0
-        for coin in opponent.coins.values():
-            if (coin.rel_pos >= 1 and  # not in yard
-                    coin.rel_pos <= 51 and  # not in home column or finished
-                    coin.rel_to_abs(coin.rel_pos + 6) >= abs_pos):  # and can reach abs_pos in one die roll
-                threat += 1
-
-        return threat
-
-    def can_kill(self, die, opponent):
-        """Who can i kill with this die roll
-           Returns a list of tuple : (killer_coin, target_coin)
-        """
-
-        # My coins that can kill
-        killers = [
-            # Coin and the Position it will move to
-            (coin, coin.rel_to_abs(coin.rel_pos + die))
-            for coin in self.movable_coins(die)
-            if (
-                coin not in self.on_home_col and       # not on home column
-                not Board.is_safe(coin.rel_pos + die)  # does not land on a safe square
-            )
-        ]
-
-        possible_kills = []
-        for killer, kill_spot in killers:
-            for target in opponent.coins.values():
-                if kill_spot == target.abs_pos:
-                    possible_kills.append((killer, target))
-
-        # Sort the possible kills in ascending order of rel_pos of targets
-        return sorted(possible_kills, key=lambda target: target[1].rel_pos)
+        """Coins which can get_killed in the next die roll; sorted by relative position"""
+        return [self.coin_list[idx] for idx in in_danger(self.get_state(opponent))]
 
     def make_moves(self, moves, opponent):
         """
@@ -178,120 +295,48 @@ class Player(object):
             coin_to_move += int(die)
 
             # If my coin killed someone then place them back in their yards
-            for coin in opponent.coins.values():
-                if (coin.abs_pos == coin_to_move.abs_pos and
-                        not Board.is_safe(coin.rel_pos)):
+            # (Copy the list, since killing a coin updates it)
+            for coin in list(opponent.squares.get(coin_to_move.abs_pos, ())):
+                if not IS_SAFE[coin.rel_pos]:
                     coin.rel_pos = 0
 
-    def get_multiple_moves(self, die_rolls, opponent):
-        """
-        Extends get_move to a list of die rolls.
+    def get_move(self, die, opponent):
         """
-        all_moves = []
-
-        # Play each roll consecutively
-        total_benefit = 0
-        for die in die_rolls:
-
-            # Apply strategies to find what next move should be
-            move, benefit = self.get_move(die, opponent)
-
-            # If moves are possible
-            if move:
-                # Convert them to a representation that others understand
-                move = "%s_%d" % (move[0], move[1])
-
-                # Perform them on the board
-                # So that next decision is based on updated board state
-                self.make_moves([move], opponent)
-
-                all_moves.append(move)
-                total_benefit += benefit
+        Decide a move for a single die roll, by the greedy rules (see greedy_move).
 
-        return all_moves, total_benefit
+        Returns a tuple: (move, benefit); move is a state move: (coin index, die)
+        or None if no move is possible.
+        """
+        return greedy_move(self.get_state(opponent), die)
 
-    def get_move(self, die, opponent):
+    def get_multiple_moves(self, die_rolls, opponent):
         """
-        Use positions of other players to make a move.
+        Extends get_move to a list of die rolls (see greedy_moves).
 
-        This only works for a single die roll and is extended by get_multiple_moves.
+        Every decision is based on the board left by the moves before it;
+        but the moves are played on a state, the board itself isn't touched.
 
-        Returns a list of tuples: [(coin, die_roll), ...]
+        Returns a tuple: (move strings, total benefit, state after the moves).
         """
-        # Find all possible kills I can make using this die
-        possible_kills = self.can_kill(die, opponent)
-
-        # Find all possible coins that can finish using this die
-        coin_to_finish = self.can_finish(die)
-
-        # Find all non stacking movable_coins
-        movable_coins = self.non_stacking_moves(die)
-
-        # Find all my coins that can get killed
-        can_get_killed = self.in_danger(opponent)
-        can_get_killed = [coin for coin in can_get_killed
-                          if coin in movable_coins]
-
-        # Move coin that can finish
-        if coin_to_finish:
-            log.info("Finishing Move: %s", coin_to_finish[0])
-            # move any coin that can finish
-            return (coin_to_finish[0], die), 20
-
-        # Open
-        elif (die in [1, 6]) and self.in_jail:
-            log.info("Opening Move: %s", self.in_jail[0])
-            # Open the lowest coin from jail
-            return (self.in_jail[0], die), 15
-
-        # Kill
-        elif possible_kills:
-            # Kill opponent's farthest possible coin
-            log.info("Killing Move: %s -> %s", possible_kills[-1][0], possible_kills[-1][1])
-            return (possible_kills[-1][0], die), 14
-
-        # if in danger save that coin
-        elif can_get_killed:
-            # save the farthest coin in danger
-            log.info("Defensive move, Saving %s", can_get_killed[-1])
-            return (can_get_killed[-1], die), 10
-
-        # Modified Fast
-        else:
-
-            # log.info("Movable: %s", movable_coins)
-
-            # Choose the coin that has moved farthest
-            if movable_coins:
-                movable_coins.sort(key=lambda c: c.rel_pos)
-
-                # if at least two coins movable
-                if (len(movable_coins) > 1 and
-                    # threat at future pos of second farthest coin is less than
-                    # the threat at future pos of the farthest coin
-                    self.threat(movable_coins[-2].rel_pos + die, opponent) <
-                        self.threat(movable_coins[-1].rel_pos + die, opponent)):
-                    
-                    log.info("Fast Move : %s" % movable_coins[-2])
-                    return (movable_coins[-2], die), 9  # move second farthest coin
-
-                log.info("Fast Move : %s" % movable_coins[-1])
-                return (movable_coins[-1], die), 8
-
-            # No move possible
-            log.info("No Move Possible")
-            return None, 0
+        moves, benefit, state = greedy_moves(self.get_state(opponent), die_rolls)
+        return [self.move_name(move) for move in moves], benefit, state
 
 
 class Coin(object):
 
     """Represent a player's coin piece."""
 
-    def __init__(self, color, idx):
+    def __init__(self, color, idx, owner=None):
         # The (color, num) pair can uniquely identify a coin
         self.color = color
         self.num = idx
 
+        # Player whose occupancy index needs to know when this coin moves
+        self.owner = owner
+
+        # Row of this coin's color in the absolute position table
+        self._abs_row = COLOR_INDEX[color[0]] * ROW_SIZE
+
         # Position of the coin on the board
         self._rel_pos = 0
         self.abs_pos = 0
@@ -314,21 +359,12 @@ class Coin(object):
 
         This is used in functions that need to check where two coins
         (of different colors) are with respect to one another.
+
+        Inside the yard it is 0 & inside the home column it is -1;
+        which can be used directly to check whether a coin is
+        inside home column or not. (see tables.py)
         """
-        for idx, color in enumerate(PLAYER_COLORS):
-            if color[0] == self.color[0]:
-                mycolor_index = idx
-
-        if rel_pos == 0:     # Inside yard
-            abs_pos = 0
-        elif rel_pos >= 52:  # Inside home column
-            abs_pos = -1
-            # -1 can be used directly to check whether a coin is
-            # inside home column or not
-        else:
-            abs_pos = (rel_pos - 1 + 13 * mycolor_index) % 52 + 1
-            # Subtract 1 to make it 0 based; add it back to make 1 based again
-        return abs_pos
+        return ABS_POS[self._abs_row + rel_pos]
 
     @property
     def rel_pos(self):
@@ -345,12 +381,17 @@ class Coin(object):
     @rel_pos.setter
     def rel_pos(self, square):
 
+        old_pos = self._rel_pos
+
         # if in finishing square, then stay in finishing square
         self._rel_pos = square
 
         # Update absolute position
         self.abs_pos = self.rel_to_abs(self._rel_pos)
 
+        if self.owner is not None and old_pos != square:
+            self.owner._relocate(self, old_pos, square)
+
 
 def main():
     p1 = Player("RED")
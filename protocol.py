@@ -0,0 +1,186 @@
+"""
+This module talks to the client, so that the engine doesn't have to.
+
+Lines from the client are read by a separate thread & parsed into events:
+
+    Roll(die_rolls)         "You rolled 6 3": a roll, ours or the opponent's
+    Duck()                  Three 6s: nothing to play
+    Repeat()                "REPEAT": the moves we played earned another turn
+    Moves(moves, repeat)    The opponent's moves; repeat if they go again
+
+The engine gets the events from a queue (see Driver.next_event).
+
+A move has to be sent before the turn's deadline, even if the engine is
+stuck somewhere it doesn't poll the clock. So once the greedy moves are
+known, a Watchdog is armed with them (& updated with the result of every
+depth the search completes); if the engine hasn't answered by the deadline,
+the watchdog sends them instead.
+"""
+
+import re
+import sys
+import queue
+import threading
+
+from collections import namedtuple
+
+
+Roll = namedtuple("Roll", ["die_rolls"])
+Duck = namedtuple("Duck", [])
+Repeat = namedtuple("Repeat", [])
+Moves = namedtuple("Moves", ["moves", "repeat"])
+
+# "NA" or moves like "R0_6<next>R0_1", maybe followed by "<next>REPEAT"
+MOVES = re.compile(r"^(NA|[RGBY]\d_\d(<next>[RGBY]\d_\d)*)(<next>REPEAT)?$")
+
+
+def parse_event(line):
+    """Parse a line from the client into an event."""
+    if line == "REPEAT":
+        return Repeat()
+
+    if "DUCK" in line:
+        return Duck()
+
+    if MOVES.match(line):
+        moves = line.split("<next>")
+        repeat = moves[-1] == "REPEAT"
+        if repeat:
+            # Remove "REPEAT" from moves list
+            moves.pop()
+        return Moves(moves, repeat)
+
+    return Roll(list(map(int, line.split(" ")[2:])))
+
+
+def format_moves(moves):
+    """Convert moves to a format that the external client understands."""
+    return "<next>".join(moves) if moves else "NA"
+
+
+class Writer(object):
+
+    """Writes lines to the client; safe to use from several threads."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, lines):
+        """Send lines to the client, with a single flush."""
+        if not lines:
+            return
+
+        with self.lock:
+            self.stream.write("".join(line + "\n" for line in lines))
+            self.stream.flush()
+
+
+class Reader(threading.Thread):
+
+    """Reads lines from the client & queues their events; None at the end of input."""
+
+    def __init__(self, stream=sys.stdin):
+        threading.Thread.__init__(self, daemon=True)
+        self.stream = stream
+        self.events = queue.Queue()
+
+    def run(self):
+        for line in self.stream:
+            line = line.strip()
+            if line:
+                self.events.put(parse_event(line))
+
+        self.events.put(None)
+
+
+class Watchdog(object):
+
+    """Sends fallback moves for a turn, unless disarmed before a deadline."""
+
+    # Seconds after the turn's deadline; the search itself stops at the deadline
+    # & should get a chance to answer. Less than Clock.IO_MARGIN
+    GRACE = 0.01
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.lock = threading.Lock()
+
+        self.timer = None
+        self.fallback = None
+        self.fired = False
+
+        # Turns answered by the watchdog
+        self.fires = 0
+
+    def arm(self, fallback, seconds):
+        """Send the fallback moves in seconds (+ GRACE), unless disarmed."""
+        with self.lock:
+            self.fallback = fallback
+            self.fired = False
+
+            self.timer = threading.Timer(max(0.0, seconds + self.GRACE), self._fire)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def update(self, fallback):
+        """Send these moves instead, if the watchdog still fires; eg: the result of a deeper search."""
+        with self.lock:
+            if self.timer is not None:
+                self.fallback = fallback
+
+    def _fire(self):
+        with self.lock:
+            # Disarmed just before we got the lock
+            if self.timer is None:
+                return
+
+            self.timer = None
+            self.fired = True
+            self.fires += 1
+
+            self.writer.write([format_moves(self.fallback)])
+
+    def disarm(self):
+        """
+        Stop the watchdog; returns the fallback moves if it already sent them, else None.
+
+        Called at the end of every turn, armed or not; the next turn starts afresh.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            sent = self.fallback if self.fired else None
+            self.fallback = None
+            self.fired = False
+
+            return sent
+
+
+class Driver(object):
+
+    """Plays a game with the client: events in, lines out."""
+
+    def __init__(self, game, stdin=sys.stdin, stdout=sys.stdout):
+        self.game = game
+        self.reader = Reader(stdin)
+        self.writer = Writer(stdout)
+
+        game.watchdog = Watchdog(self.writer) if game.clock else None
+
+    def next_event(self):
+        """The next event from the client; waits for it."""
+        return self.reader.events.get()
+
+    def run(self, no_board=True):
+        self.reader.start()
+        self.writer.write(self.game.opening_lines(no_board))
+
+        while True:
+            event = self.next_event()
+            if event is None:
+                break
+
+            self.writer.write(self.game.handle(event))
@@ -0,0 +1,295 @@
+"""
+This module plays the end of a game, when it has become a pure race.
+
+A coin at relative position 26 or more can never again meet a coin of
+the opponent that is also at 26 or more: the opponent only walks over
+the other half of the track (see tables.OPPOSITE). So once all 8 coins
+are there, nobody can kill anybody & the game is decided by the dice and
+by how well each player uses them.
+
+Then each player's coins can be looked at on their own. For every set of
+4 positions (as a multiset: 52360 of them) a table stores the
+distribution of the number of turns left till all 4 coins are finished,
+built by dynamic programming from the finished state backwards:
+
+    * Finishing a coin earns a REPEAT, the turn goes on with another throw
+    * A roll that can't be played is lost; a DUCK loses the whole throw
+    * Moves follow state.end_states (no overshooting, no stacking on unsafe squares)
+
+The table's policy picks the moves with the least expected number of
+turns. With the distributions of both players, the chance that the
+player about to move wins is:
+
+    sum over t of P(I finish in my turn t) * P(they need t turns or more)
+
+Decisions then pick the moves with the best chance of winning, which is
+a table lookup per candidate.
+
+This is not the exact, two sided solution of the race: each side's policy
+only minimizes its own expected number of turns & ignores the opponent.
+That would need a table over pairs of positions (52360 squared, about
+2.7 billion entries). So win_probability is the chance of winning if both
+players follow the table's policy from here, and best_moves is only
+optimal for this turn, assuming that policy for the rest of the race.
+
+The table is stored as cumulative distributions in uint16, 64 turns per
+row (about 6.7 MB) and is memory mapped, so loading it costs nothing.
+
+Build it once with: python race.py
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+
+from itertools import combinations_with_replacement
+from math import comb
+
+from state import ROLLS, FINISH
+from state import end_states
+
+
+# All coins at or after this relative position: a race
+# is_race misses some positions without contact, eg: all the opponent's coins
+# in their home column (52 - 56) while mine are still before this square.
+# The table only holds positions of LOW or more, so those are left to the search
+LOW = 26
+
+# Positions a coin can be at in a race: LOW to FINISH
+VALUES = FINISH - LOW + 1
+
+# Distributions are cut off after these many turns; the rest is added to the last one
+TURNS = 64
+
+# Multisets of 4 positions
+STATES = comb(VALUES + 3, 4)
+
+# P(T <= t) is stored as an integer in [0, SCALE]
+SCALE = (1 << 16) - 1
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "race_table.bin")
+
+# Magic, version, states, turns
+HEADER = struct.Struct("<8sIII")
+MAGIC = b"LUDORACE"
+VERSION = 1
+
+# Opponent's coins while moving mine on their own: finished, they can't be killed
+_ALONE = (FINISH,) * 4
+
+# Binomial coefficients used by rank: _BINOM[k][n] = n choose k
+_BINOM = [[comb(n, k) for n in range(VALUES + 4)] for k in range(5)]
+
+
+def is_race(state):
+    """Can no coin of either player meet a coin of the other any more?"""
+    return min(state) >= LOW
+
+
+def rank(coins):
+    """
+    Index of a multiset of 4 positions in the table: 0 to STATES - 1.
+
+    Sorted positions v0 <= v1 <= v2 <= v3 become distinct numbers v_i + i,
+    which are ranked with the combinatorial number system.
+    """
+    v0, v1, v2, v3 = sorted(coins)
+    return (
+        _BINOM[1][v0 - LOW] +
+        _BINOM[2][v1 - LOW + 1] +
+        _BINOM[3][v2 - LOW + 2] +
+        _BINOM[4][v3 - LOW + 3]
+    )
+
+
+def _shift(dist):
+    """Distribution of T + 1; mass pushed past the last turn stays in it."""
+    shifted = [0.0] + dist[:-1]
+    shifted[-1] += dist[-1]
+    return shifted
+
+
+def build(path=PATH, out=sys.stdout, low=LOW):
+    """
+    Compute the table by dynamic programming & write it to path.
+
+    Only positions with every coin at low or more are computed, the rows
+    of all the others are left at 0; eg: to build a small table for tests.
+    """
+    # Positions with more progress are needed first
+    positions = sorted(combinations_with_replacement(range(low, FINISH + 1), 4),
+                       key=sum, reverse=True)
+
+    # rank -> expected number of turns left, distribution of turns left (index 0: turn 1)
+    expected = [0.0] * STATES
+    dists = [None] * STATES
+
+    finished = rank(_ALONE)
+    expected[finished] = 1.0
+    dists[finished] = [1.0] + [0.0] * (TURNS - 1)
+
+    started = time.perf_counter()
+    for count, coins in enumerate(positions):
+        if coins == _ALONE:
+            continue
+
+        done = coins.count(FINISH)
+
+        stay = 0.0
+        total = 0.0
+        dist = [0.0] * TURNS
+
+        for prob, die_rolls in ROLLS:
+            ends = end_states(coins + _ALONE, die_rolls) if die_rolls else {}
+            if not ends:
+                stay += prob
+                continue
+
+            # Fewest turns expected; a coin that finished earns another throw in this turn
+            best, best_cost, best_repeat = None, None, False
+            for end in ends:
+                idx = rank(end[:4])
+                repeat = end[:4].count(FINISH) > done
+                cost = expected[idx] if repeat else 1 + expected[idx]
+                if best_cost is None or cost < best_cost:
+                    best, best_cost, best_repeat = idx, cost, repeat
+
+            total += prob * best_cost
+            following = dists[best] if best_repeat else _shift(dists[best])
+            for t in range(TURNS):
+                dist[t] += prob * following[t]
+
+        # Throws that can't be played lose the turn, & we're back here:
+        # E = total + stay * (1 + E) & P(T = t) = dist[t] + stay * P(T = t - 1)
+        expected[rank(coins)] = (total + stay) / (1 - stay)
+        for t in range(1, TURNS):
+            dist[t] += stay * dist[t - 1]
+        dist[-1] += 1 - sum(dist)
+
+        dists[rank(coins)] = dist
+
+        if out and count % 5000 == 0:
+            out.write("%d / %d positions, %.1fs\n" % (count, STATES, time.perf_counter() - started))
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, STATES, TURNS))
+
+        row = struct.Struct("<%dH" % TURNS)
+        for dist in dists:
+            if dist is None:
+                f.write(bytes(row.size))
+                continue
+
+            cdf, cumulative = [], 0.0
+            for p in dist:
+                cumulative += p
+                cdf.append(min(SCALE, int(round(cumulative * SCALE))))
+            cdf[-1] = SCALE
+            f.write(row.pack(*cdf))
+
+    return expected
+
+
+class RaceTable(object):
+
+    """The table on disk, memory mapped."""
+
+    def __init__(self, path=PATH):
+        with open(path, "rb") as f:
+            self.memory = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, states, turns = HEADER.unpack_from(self.memory, 0)
+        if (magic, version, states, turns) != (MAGIC, VERSION, STATES, TURNS):
+            raise ValueError("Not a race table of this version: %s" % path)
+
+        self.cdf = memoryview(self.memory)[HEADER.size:].cast("H")
+
+        # Statistics
+        self.lookups = 0
+
+    def win_probability(self, mine, theirs):
+        """
+        Chance that the player about to move (with coins mine) wins the race,
+        if both players follow the table's policy.
+        """
+        cdf = self.cdf
+        my_row = rank(mine) * TURNS
+        their_row = rank(theirs) * TURNS
+
+        self.lookups += 1
+
+        # P(I finish in turn t) * P(they haven't finished in t - 1 turns)
+        win = 0
+        mine_before = 0
+        theirs_before = 0
+        for t in range(TURNS):
+            mine_now = cdf[my_row + t]
+            win += (mine_now - mine_before) * (SCALE - theirs_before)
+            mine_before = mine_now
+            theirs_before = cdf[their_row + t]
+
+        return win / (SCALE * SCALE)
+
+    def best_moves(self, state, die_rolls):
+        """
+        The moves with the best chance of winning a race, if both players
+        follow the table's policy after them (see win_probability).
+
+        Returns a tuple: (moves, chance of winning); moves is a list of
+        state moves: [(coin index, die), ...]; empty for "NA".
+        """
+        mine, theirs = state[:4], state[4:]
+        done = mine.count(FINISH)
+
+        best, best_win = [], None
+        for end, moves in end_states(state, die_rolls).items():
+            end_mine = end[:4]
+
+            if end_mine.count(FINISH) == 4:
+                win = 1.0
+            elif end_mine.count(FINISH) > done:
+                # Finished a coin: my turn again
+                win = self.win_probability(end_mine, theirs)
+            else:
+                win = 1 - self.win_probability(theirs, end_mine)
+
+            if best_win is None or win > best_win:
+                best, best_win = list(moves), win
+
+        if best_win is None:
+            best_win = 1 - self.win_probability(theirs, mine)
+
+        return best, best_win
+
+
+# Loaded once per process, by load
+_table = None
+
+
+def load(path=PATH):
+    """The race table; None if it hasn't been built yet."""
+    global _table
+    if _table is None and os.path.exists(path):
+        _table = RaceTable(path)
+    return _table
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else PATH
+
+    started = time.perf_counter()
+    expected = build(path)
+    print("Built %s: %d positions in %.1fs, %d bytes" % (
+        path, STATES, time.perf_counter() - started, os.path.getsize(path)))
+
+    table = RaceTable(path)
+    start = (LOW,) * 4
+    print("Expected turns from %r: %.2f" % (start, expected[rank(start)]))
+    print("Win chance of the player to move, all coins at %d: %.3f" % (
+        LOW, table.win_probability(start, start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+This module relays main.py's stdin & stdout to a decision server.
+
+It is deliberately tiny & only uses the stdlib, so that a game played
+through decision_server.py doesn't pay for importing the rest of our code.
+"""
+
+import sys
+import socket
+import threading
+
+
+def _forward_input(sock):
+    """Copy lines from stdin to the server, till stdin is closed."""
+    for line in sys.stdin:
+        sock.sendall(line.encode())
+
+    sock.shutdown(socket.SHUT_WR)
+
+
+def relay(path):
+    """
+    Play a game on the decision server listening on path.
+
+    Returns an exit status: 0 once the server ends the game.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+
+    reader = threading.Thread(target=_forward_input, args=(sock,), daemon=True)
+    reader.start()
+
+    for line in sock.makefile("r"):
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    return 0
@@ -1,45 +1,64 @@
 """
 This module runs matches between two of our bots.
 
+Every match is a server & two clients of the course's binaries.
+Several matches run at once, each on a port of its own, so a whole
+night of matches takes minutes instead of hours.
+
 If an error occurred, it dumps the information to disk
 so we can debug it.
+
+Run it as: python run_matches.py <path of data zip> [--matches 20] [--workers 4]
 """
 
 import os
+import re
+import ast
 import sys
 import time
+import socket
+import argparse
+import threading
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, STDOUT, TimeoutExpired
 
 
-TOTAL_MATCHES = 2
-
-DATA_ZIP_PATH = sys.argv[1]
-
 LOG_PATH = "match_results"
 
-if not os.path.exists(LOG_PATH):
-    os.makedirs(LOG_PATH)
+# Seconds between checks of whether a server / client is up
+POLL_INTERVAL = 0.05
 
-cmd_server = [os.path.join(DATA_ZIP_PATH, "server/server"),
-              "10000"]
+# States of a socket in /proc/net/tcp
+TCP_ESTABLISHED = "01"
+TCP_LISTEN = "0A"
 
-cmd_client = [os.path.join(DATA_ZIP_PATH, "client/client"),
-              "0.0.0.0", "10000", "--noBoard", "main.py"]
+# Entries the server logs for every action: {'action': 'THROW', ...}
+ACTION = re.compile(r"\{[^{}]*'action'[^{}]*\}")
+
+# Keys of the FINISH action that might name the winner: 1 or 2
+# A guess: no log of the course's server has been checked for them yet
+WINNER_KEYS = ["winner", "player", "player_id", "id"]
+PLAYERS = ["1", "2"]
 
 
 def wait_for(*args, timeout=15):
+    """Wait for processes to exit; returns True if all of them did in time."""
+    deadline = time.monotonic() + timeout
     for proc in args:
         try:
-            proc.wait(timeout=timeout)
+            proc.wait(timeout=max(0, deadline - time.monotonic()))
         except TimeoutExpired:
-            # print("Process timed out: %r" % proc.args[0])
-            pass
+            return False
+    return True
 
 
-def killall(*args, timeout=15):
+def killall(*args):
     for proc in args:
-        proc.kill()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
 
 
 def log_files(match_count):
@@ -54,38 +73,229 @@ def rm_files(*args):
         os.remove(file.name)
 
 
-match_count = 0
-while match_count < TOTAL_MATCHES:
+# Ports handed out to matches that are still running
+_ports = set()
+_ports_lock = threading.Lock()
+
+
+def allocate_port():
+    """A free port that no other running match has been given."""
+    with _ports_lock:
+        while True:
+            # The OS picks a free port when binding to 0
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.bind(("0.0.0.0", 0))
+                port = sock.getsockname()[1]
+
+            if port not in _ports:
+                _ports.add(port)
+                return port
+
+
+def release_port(port):
+    with _ports_lock:
+        _ports.discard(port)
+
+
+def _socket_states(port):
+    """
+    States of all TCP sockets bound locally to port, from /proc/net/tcp.
+
+    Unlike connecting to the port, this doesn't take up a player's seat.
+    Returns None where /proc isn't available (not Linux).
+    """
+    states = []
+    for table in ["/proc/net/tcp", "/proc/net/tcp6"]:
+        try:
+            with open(table) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+
+        for line in lines:
+            fields = line.split()
+            if int(fields[1].rsplit(":", 1)[1], 16) == port:
+                states.append(fields[3])
+
+    return states if os.path.exists("/proc/net/tcp") else None
+
+
+def _accepts_connections(port):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=POLL_INTERVAL):
+            return True
+    except OSError:
+        return False
+
+
+def wait_until(condition, proc, timeout):
+    """Poll condition till it holds; False if proc died or timeout passed first."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        if proc.poll() is not None:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return False
 
-    match_count += 1
 
-    print("Running Match %d" % match_count)
+def server_ready(port):
+    """Is the server listening on port?"""
+    states = _socket_states(port)
+    if states is None:
+        return _accepts_connections(port)
+    return TCP_LISTEN in states
+
+
+def clients_connected(port, count):
+    """Have these many clients connected to the server on port?"""
+    states = _socket_states(port)
+    if states is None:
+        # Can't tell without /proc; give the client a moment
+        time.sleep(1)
+        return True
+    # Both ends of a local connection are listed; the server's is bound to port
+    return states.count(TCP_ESTABLISHED) >= count
+
+
+def parse_result(contents):
+    """
+    Extract the result of a match from the server's log.
+
+    Returns (finished, winner, turns): whether there is a FINISH action,
+    the player (1 or 2) it names & the number of THROW actions in the log.
+    Only a match that didn't finish is an error. winner is None (unknown)
+    if there isn't exactly one FINISH action, or if it doesn't name a
+    single player by one of WINNER_KEYS.
+    """
+    actions = []
+    for match in ACTION.finditer(contents):
+        try:
+            actions.append(ast.literal_eval(match.group()))
+        except (ValueError, SyntaxError):
+            continue
+
+    turns = sum(1 for action in actions if action.get("action") == "THROW")
+
+    # Any FINISH action at all, like this script always checked
+    finished = "'action': 'FINISH'" in contents
+
+    finishes = [action for action in actions if action.get("action") == "FINISH"]
+    if len(finishes) != 1:
+        return finished, None, turns
+
+    named = {str(finishes[0][key]) for key in WINNER_KEYS if key in finishes[0]}
+    if len(named) != 1 or not named <= set(PLAYERS):
+        return finished, None, turns
+
+    return finished, int(named.pop()), turns
+
+
+def run_match(data_zip_path, match_count, timeout, ready_timeout):
+    """
+    Run a single match; returns (ok, winner, turns); winner is None if unknown.
+
+    Logs of matches that went wrong are kept in LOG_PATH.
+    """
+    port = allocate_port()
+
+    cmd_server = [os.path.join(data_zip_path, "server/server"),
+                  str(port)]
+
+    cmd_client = [os.path.join(data_zip_path, "client/client"),
+                  "0.0.0.0", str(port), "--noBoard", "main.py"]
 
     # Run 3 processes
     s_log, p1_log, p2_log = log_files(match_count)
+    procs = []
+
+    try:
+        s = Popen(cmd_server,  stdout=s_log,  stderr=STDOUT)
+        procs.append(s)
+
+        ready = wait_until(lambda: server_ready(port), s, ready_timeout)
+
+        # Player 1 has to connect before player 2
+        if ready:
+            p1 = Popen(cmd_client, stdout=p1_log, stderr=STDOUT)
+            procs.append(p1)
+            ready = wait_until(lambda: clients_connected(port, 1), p1, ready_timeout)
 
-    s = Popen(cmd_server,  stdout=s_log,  stderr=STDOUT)
-    time.sleep(1)
-    p1 = Popen(cmd_client, stdout=p1_log, stderr=STDOUT)
-    time.sleep(1)
-    p2 = Popen(cmd_client, stdout=p2_log, stderr=STDOUT)
+        if ready:
+            p2 = Popen(cmd_client, stdout=p2_log, stderr=STDOUT)
+            procs.append(p2)
 
-    # Wait for them to finish
-    wait_for(s, p1, p2, timeout=15)
-    killall(s, p1, p2)
+            # Wait for them to finish
+            wait_for(*procs, timeout=timeout)
+
+    finally:
+        killall(*procs)
+        release_port(port)
+
+        for file in (s_log, p1_log, p2_log):
+            file.close()
 
     # Open the file again
-    with open(s_log.name, "r") as s_log:
-        contents = s_log.read()
+    with open(s_log.name, "r") as f:
+        contents = f.read()
+
+    finished, winner, turns = parse_result(contents)
 
     # If everythin was ok, then delete these logs!
-    if "'action': 'FINISH'" in contents:
+    ok = ready and finished
+    if ok:
         rm_files(s_log, p1_log, p2_log)
 
-        print("    Ok")
+    return ok, winner, turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run matches between two of our bots.")
+    parser.add_argument("data_zip_path", help="folder with the course's server & client")
+    parser.add_argument("--matches", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="matches to run at once")
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="seconds a match may take")
+    parser.add_argument("--ready-timeout", type=float, default=10,
+                        help="seconds to wait for the server / a client to come up")
+    args = parser.parse_args()
+
+    if not os.path.exists(LOG_PATH):
+        os.makedirs(LOG_PATH)
+
+    winners = Counter()
+    turns = []
+    errors = 0
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(run_match, args.data_zip_path, match_count,
+                        args.timeout, args.ready_timeout): match_count
+            for match_count in range(1, args.matches + 1)
+        }
+
+        for future, match_count in sorted(futures.items(), key=lambda f: f[1]):
+            ok, winner, match_turns = future.result()
+
+            if ok:
+                winners[winner] += 1
+                turns.append(match_turns)
+                print("Match %d: Ok, winner: %s, turns: %d" % (
+                    match_count, "unknown" if winner is None else winner, match_turns))
+            else:
+                errors += 1
+                print("Match %d: Error! Logs are in %s" % (match_count, LOG_PATH))
+
+    print("Wins: %s" % ", ".join(
+        "%s: %d" % ("unknown" if w is None else w, n) for w, n in sorted(winners.items(), key=str)))
+    if turns:
+        print("Mean turns: %.1f" % (sum(turns) / len(turns)))
+    print("Errors: %d" % errors)
+
+    return 1 if errors else 0
 
-        # TODO: Extract which player won?
-    else:
-        print("    Error!")
 
-    # time.sleep(15)
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,445 @@
+"""
+This module looks further ahead than the greedy rules in Player.get_move.
+
+It is an Expectiminimax search over the compact states of state.py:
+
+    * I pick a sequence of moves for my die rolls
+    * then the opponent rolls (a chance node over state.ROLLS)
+    * then they pick their moves; and so on, till the depth runs out.
+
+Values are always from the point of view of the player about to move
+(negamax style), and chance nodes are pruned with Star1 & Star2.
+
+Chance nodes right above the leaves aren't pruned: all their leaves are
+evaluated together, in a single batch (see features.py). NumPy is only
+imported by the first such batch; without it, leaves are evaluated one by one.
+"""
+
+import time
+
+from state import ROLLS, JAIL, FINISH
+from state import swap, is_finished, earns_repeat
+from state import end_states
+
+from tables import OPPOSITE
+
+from hits import attack_mask, probability
+
+from transposition import TranspositionTable, zobrist, roll_key
+from transposition import EXACT, LOWER, UPPER
+
+
+# Leaf evaluation borrows the benefits of Player.get_move
+# and adds them on top of percent_complete
+FINISH_BENEFIT = 20
+OPEN_BENEFIT = 15
+
+# Value of a single coin, indexed by its relative position
+COIN_VALUE = tuple(
+    25 * (rel_pos / 57) +
+    (OPEN_BENEFIT if rel_pos != JAIL else 0) +
+    (FINISH_BENEFIT if rel_pos == FINISH else 0)
+    for rel_pos in range(0, 58)
+)
+
+# Probability of all outcomes after the i-th one in ROLLS
+REST = tuple(1 - sum(prob for prob, _ in ROLLS[:idx + 1]) for idx in range(len(ROLLS)))
+
+# No position evaluates outside [-MAX_EVAL, MAX_EVAL] ...
+MAX_EVAL = 4 * COIN_VALUE[FINISH] + 4 * COIN_VALUE[51]
+
+# ... except positions that have been won or lost
+WIN = MAX_EVAL + 1
+
+
+def evaluate(state):
+    """
+    Static evaluation of a state, for the player about to move.
+
+    How much of the game each player has completed, the benefits of having
+    opened / finished coins, and the value of the opponent's coins that I
+    can kill, times the chance of hitting them with my next throw (I'm the
+    one to roll next; see hits.py).
+    """
+    mine, theirs = state[:4], state[4:]
+
+    score = 0
+    for rel_pos in mine:
+        score += COIN_VALUE[rel_pos]
+    for rel_pos in theirs:
+        score -= COIN_VALUE[rel_pos]
+
+    for rel_pos in theirs:
+        # Where this coin is, as seen from my side of the board
+        target = OPPOSITE[rel_pos]
+        if target < 0:
+            continue
+
+        mask = attack_mask(mine, target)
+        if mask:
+            score += probability(mask) * COIN_VALUE[rel_pos]
+
+    return score
+
+
+# features.score once imported; None if NumPy isn't installed
+_batch_score = False
+
+
+def batch_score():
+    """
+    features.score, to evaluate many states in one call; None without NumPy.
+
+    Imported on first use, so that the greedy bot never loads NumPy.
+    """
+    global _batch_score
+    if _batch_score is False:
+        try:
+            from features import score
+        except ImportError:
+            score = None
+        _batch_score = score
+    return _batch_score
+
+
+def bound_flag(value, alpha, beta):
+    """What does a (fail soft) value found with the window (alpha, beta) mean?"""
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+
+class SearchTimeout(Exception):
+
+    """Raised from inside a search when the turn's deadline has passed."""
+
+
+class Search(object):
+
+    """Expectiminimax search with Star1/Star2 pruning at chance nodes."""
+
+    # Poll the clock once every these many nodes
+    # (& at every chance node above the leaves, each of those takes milliseconds)
+    POLL_INTERVAL = 16
+
+    # Searching one turn deeper takes roughly this many times longer
+    # Used to avoid starting an iteration that can't finish in time
+    DEPTH_GROWTH = 15
+
+    def __init__(self, max_depth=2, clock=None, table=None):
+        # Number of turns to look ahead; 1 is a greedy search over the eval
+        self.max_depth = max_depth
+
+        # Searches are abandoned once the clock runs out (see clock.py)
+        self.clock = clock
+
+        # Results of chance nodes & best moves of turns (see transposition.py)
+        # Pass in a table to share it with other searches of the same game
+        self.table = table if table is not None else TranspositionTable()
+
+        # Nodes visited by the last search
+        self.nodes = 0
+
+        # Ordered children of (state, die_rolls) seen in the last search
+        # Probes & the full search of a chance node need the same ones
+        self.children = {}
+
+    def iterate(self, state, die_rolls, only=None):
+        """
+        Iterative deepening: search 1, 2, ... max_depth turns ahead.
+
+        only is passed on to best_moves.
+
+        Yields a tuple: (depth, moves, value) after every completed depth,
+        so that the caller always has the best answer found so far.
+        Stops early when the next depth can't finish before the deadline,
+        and raises SearchTimeout if the deadline passes during a search.
+        """
+        for depth in range(1, self.max_depth + 1):
+            started = time.perf_counter()
+
+            moves, value = self.best_moves(state, die_rolls, depth, only)
+            yield depth, moves, value
+
+            took = time.perf_counter() - started
+            if self.clock and took * self.DEPTH_GROWTH > self.clock.time_left():
+                return
+
+    def best_moves(self, state, die_rolls, depth=None, only=None):
+        """
+        Find the best sequence of moves for the player about to move.
+
+        If only is a set of states, then only the sequences that end
+        in one of them are considered. (see parallel.py)
+
+        Returns a tuple: (moves, value) where moves is a list of
+        state moves: [(coin index, die), ...]; an empty list means "NA".
+        """
+        if depth is None:
+            depth = self.max_depth
+
+        self.nodes = 0
+        self.children = {}
+        self.table.new_search()
+
+        children = self.ordered_children(state, die_rolls)
+        if only is not None:
+            children = [(end, moves) for end, moves in children if end in only]
+
+        if not children:
+            return [], self.pass_value(state, depth, -WIN, WIN)
+
+        alpha, beta = -WIN, WIN
+        best_end, best_value = children[0][0], -WIN - 1
+
+        for end, moves in children:
+            value = self.child_value(state, end, depth, alpha, beta)
+            if value > best_value:
+                best_end, best_value = end, value
+            alpha = max(alpha, value)
+
+        # The best of only a few sequences isn't the best move of this turn
+        if only is None:
+            self.table.store(zobrist(state) ^ roll_key(die_rolls), depth, best_value, EXACT, best_end)
+
+        sequences = dict(children)
+        return list(sequences[best_end]), best_value
+
+    def visit(self, poll=False):
+        """Count a node, and check the clock every once in a while; or right now if poll."""
+        self.nodes += 1
+
+        if (self.clock and (poll or self.nodes % self.POLL_INTERVAL == 0) and
+                self.clock.out_of_time()):
+            raise SearchTimeout()
+
+    def ordered_children(self, state, die_rolls):
+        """
+        Sequences for the rolls; most promising first.
+
+        The best sequence of an earlier search (from the transposition table)
+        is tried first, the others in the order of their evaluation.
+        """
+        key = (state, die_rolls)
+        if key not in self.children:
+            sequences = end_states(state, die_rolls)
+
+            children = sorted(
+                sequences.items(),
+                key=lambda item: evaluate(swap(item[0])),
+            )
+
+            entry = self.table.lookup(zobrist(state) ^ roll_key(die_rolls))
+            if entry is not None and entry[4] in sequences:
+                best = entry[4]
+                children.remove((best, sequences[best]))
+                children.insert(0, (best, sequences[best]))
+
+            self.children[key] = children
+
+        return self.children[key]
+
+    def child_value(self, state, end, depth, alpha, beta):
+        """Value (for the mover) of reaching end from state with depth turns left."""
+        if earns_repeat(state, end):
+            # The same player rolls again
+            return self.chance(end, depth - 1, alpha, beta)
+
+        return -self.chance(swap(end), depth - 1, -beta, -alpha)
+
+    def pass_value(self, state, depth, alpha, beta):
+        """Value of a turn in which the mover can't move (NA or DUCK)."""
+        return -self.chance(swap(state), depth - 1, -beta, -alpha)
+
+    def turn(self, state, die_rolls, depth, alpha, beta, skip_first=False):
+        """
+        Max node: the player about to move has rolled die_rolls.
+
+        If skip_first is True the first child has already been searched
+        by the Star2 probe (see chance) and alpha is its value.
+        """
+        self.visit()
+
+        children = self.ordered_children(state, die_rolls)
+        if not children:
+            return self.pass_value(state, depth, alpha, beta)
+
+        # Window this turn was searched with
+        window = (alpha, beta)
+
+        best_end = children[0][0]
+        if skip_first:
+            best = alpha
+            children = children[1:]
+        else:
+            best = -WIN
+
+        for end, moves in children:
+            value = self.child_value(state, end, depth, alpha, beta)
+            if value > best:
+                best, best_end = value, end
+                if best >= beta:
+                    break
+                alpha = max(alpha, best)
+
+        self.table.store(zobrist(state) ^ roll_key(die_rolls), depth,
+                         best, bound_flag(best, *window), best_end)
+
+        return best
+
+    def probe(self, state, die_rolls, depth, alpha, beta):
+        """Star2 probe: value of only the first child; a lower bound of turn."""
+        self.visit()
+
+        children = self.ordered_children(state, die_rolls)
+        if not children:
+            return self.pass_value(state, depth, alpha, beta), True
+
+        end, _ = children[0]
+        return self.child_value(state, end, depth, alpha, beta), len(children) == 1
+
+    def chance(self, state, depth, alpha, beta):
+        """
+        Chance node: the player about to move rolls the die.
+
+        Returns the expected value for that player; or a bound on it
+        which lies outside (alpha, beta).
+        """
+        if is_finished(swap(state)):
+            return -WIN
+        if is_finished(state):
+            return WIN
+        if depth == 0:
+            return evaluate(state)
+
+        key = zobrist(state)
+
+        entry = self.table.lookup(key)
+        if entry is not None and entry[1] >= depth:
+            value, flag = entry[2], entry[3]
+            if (flag == EXACT or
+                    (flag == LOWER and value >= beta) or
+                    (flag == UPPER and value <= alpha)):
+                return value
+
+        if depth == 1:
+            value = self.expect_leaves(state)
+            self.table.store(key, depth, value, EXACT)
+            return value
+
+        value = self.expect(state, depth, alpha, beta)
+        self.table.store(key, depth, value, bound_flag(value, alpha, beta))
+
+        return value
+
+    def expect_leaves(self, state):
+        """
+        Exact expected value of a chance node one turn above the leaves.
+
+        The leaves of all the outcomes are evaluated with a single call
+        to features.score, instead of one evaluate per leaf (see leaf_values).
+        """
+        self.visit(poll=True)
+
+        # Leaves below each outcome: (prob, die_rolls, [(end, sign), ...])
+        outcomes = []
+        leaves = []
+        for prob, die_rolls in ROLLS:
+            children = []
+            for end in end_states(state, die_rolls):
+                if earns_repeat(state, end):
+                    children.append((end, 1))
+                    leaves.append(end)
+                else:
+                    children.append((end, -1))
+                    leaves.append(swap(end))
+
+            if not children:
+                # The mover can't move
+                children.append((None, -1))
+                leaves.append(swap(state))
+
+            outcomes.append((prob, die_rolls, children))
+
+        values = iter(self.leaf_values(leaves))
+
+        total = 0
+        for prob, die_rolls, children in outcomes:
+            best, best_end = -WIN - 1, None
+            for end, sign in children:
+                value = sign * next(values)
+                if value > best:
+                    best, best_end = value, end
+
+            # Remember the best moves of this turn, like turn does
+            if best_end is not None:
+                self.table.store(zobrist(state) ^ roll_key(die_rolls), 1, best, EXACT, best_end)
+
+            total += prob * best
+
+        return total
+
+    @staticmethod
+    def leaf_values(leaves):
+        """chance(leaf, 0) for a list of states."""
+        score = batch_score()
+        values = score(leaves).tolist() if score else [evaluate(leaf) for leaf in leaves]
+        for idx, leaf in enumerate(leaves):
+            if is_finished(swap(leaf)):
+                values[idx] = -WIN
+            elif is_finished(leaf):
+                values[idx] = WIN
+        return values
+
+    def expect(self, state, depth, alpha, beta):
+        """Expected value of a chance node, using Star1 & Star2 pruning."""
+        self.visit()
+
+        lower, upper = -WIN, WIN
+
+        # Star2: Probe every outcome with its first child for lower bounds
+        bounds = []
+        exact = []
+        lower_sum = 0
+        for prob, die_rolls in ROLLS:
+            value, is_exact = self.probe(state, die_rolls, depth, lower, upper)
+            bounds.append(value)
+            exact.append(is_exact)
+            lower_sum += prob * value
+
+        if lower_sum >= beta:
+            return lower_sum
+
+        # Star1: Search outcomes one by one, while keeping track of how
+        # good or bad the outcomes not searched yet could still be
+        total = 0
+        for idx, (prob, die_rolls) in enumerate(ROLLS):
+            lower_sum -= prob * bounds[idx]
+            rest = REST[idx]
+
+            if exact[idx]:
+                value = bounds[idx]
+            else:
+                child_alpha = (alpha - total - upper * rest) / prob
+                child_beta = (beta - total - lower_sum) / prob
+
+                # The probe already gives a lower bound
+                child_alpha = max(child_alpha, bounds[idx])
+                child_beta = min(child_beta, upper)
+
+                if child_alpha >= child_beta:
+                    value = bounds[idx]
+                else:
+                    value = self.turn(state, die_rolls, depth,
+                                      child_alpha, child_beta, skip_first=True)
+
+            total += prob * value
+
+            if total + upper * rest <= alpha:
+                return total + upper * rest
+            if total + lower_sum >= beta:
+                return total + lower_sum
+
+        return total
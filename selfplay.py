@@ -0,0 +1,273 @@
+"""
+This module plays our bots against each other, in a single process.
+
+run_matches.py needs the course's server & client binaries and takes
+several seconds per game. Here a Referee talks to two LudoGame objects
+directly, by calling play_turn & observe instead of going through
+stdin / stdout, and checks every move by the rules of state.py:
+
+    * A 6 earns another roll, three 6s in a row is a DUCK (no move)
+    * Killing an opponent's coin or finishing a coin earns a REPEAT
+    * "NA" (no moves) is only accepted if no move was possible
+    * All rolls that can be played have to be played
+
+Dice come from a seeded random.Random, so a game can be replayed from
+its seed (as long as the bots themselves are deterministic).
+
+Run it as: python selfplay.py --games 1000 --a search:2 --b greedy
+It prints the win rate of bot A with a 95% confidence interval.
+"""
+
+import math
+import time
+import random
+import logging
+import argparse
+
+from collections import Counter
+
+from clock import Clock
+from config import log
+from game import LudoGame
+from mcts import MCTS
+from move_cache import MOVE_CACHE
+from state import initial_state, swap, is_finished, earns_repeat
+from state import legal_moves, apply_move, end_states
+
+
+# Call a game a draw after these many turns (none ever get here in practice)
+MAX_TURNS = 2000
+
+# z for a 95% confidence interval
+Z_95 = 1.96
+
+
+class IllegalMove(ValueError):
+
+    """A bot played moves that the rules don't allow."""
+
+
+def throw(rng):
+    """Roll the die: a 6 earns another roll, but three 6s in a row is a DUCK: []"""
+    rolls = [rng.randint(1, 6)]
+    while rolls[-1] == 6 and len(rolls) < 3:
+        rolls.append(rng.randint(1, 6))
+
+    if rolls == [6, 6, 6]:
+        return []
+
+    return rolls
+
+
+def parse_moves(color, moves, die_rolls):
+    """Convert move strings: "R0_6" of a player to state moves: (coin index, die)."""
+    dice = Counter(die_rolls)
+
+    parsed = []
+    for move in moves:
+        try:
+            coin, die = move[1:].split("_")
+            coin, die = int(coin), int(die)
+        except ValueError:
+            raise IllegalMove("Can't parse move: %r" % move)
+
+        if move[0] != color[0] or not 0 <= coin < 4:
+            raise IllegalMove("Not a coin of %s: %r" % (color, move))
+
+        if not dice[die]:
+            raise IllegalMove("Die %d was not rolled: %r" % (die, die_rolls))
+        dice[die] -= 1
+
+        parsed.append((coin, die))
+
+    return parsed
+
+
+def check_moves(state, moves, die_rolls):
+    """Play moves from state (seen from the mover's side); returns the new state."""
+    # Every roll that can be played has to be played
+    possible = end_states(state, die_rolls)
+    required = len(next(iter(possible.values()))) if possible else 0
+    if len(moves) != required:
+        raise IllegalMove("Played %d of %d possible moves" % (len(moves), required))
+
+    for move in moves:
+        if move not in legal_moves(state, move[1]):
+            raise IllegalMove("Illegal move: %r in %r" % (move, state))
+        state = apply_move(state, move)
+
+    return state
+
+
+def make_bot(spec, player_id, game_mode, time_limit=None):
+    """
+    Create a LudoGame from a spec:
+
+        greedy      The rules of Player.get_move
+        search:N    Search N turns ahead (see search.py)
+        value:PATH  A learned value model (see value.py & train.py)
+        mcts:N      Experimental: greedy moves, overridden by N playouts
+                    a decision or by as many as the clock allows (see mcts.py)
+
+    Any of them followed by +race plays pure races by the race table
+    (see race.py), eg: greedy+race
+    """
+    spec, _, extra = spec.partition("+")
+    if extra not in ("", "race"):
+        raise ValueError("Unknown bot: %r" % (spec + "+" + extra))
+
+    name, _, arg = spec.partition(":")
+    clock = Clock(time_limit) if time_limit else None
+    race = extra == "race"
+
+    if name == "greedy":
+        return LudoGame(player_id, game_mode, clock=clock, race=race)
+    elif name == "search":
+        return LudoGame(player_id, game_mode, search_depth=int(arg or 2), clock=clock, race=race)
+    elif name == "value":
+        # Imported here, so that the other bots (& server.py) don't need NumPy
+        import value
+        return LudoGame(player_id, game_mode, clock=clock, value_model=value.load(arg or value.PATH),
+                        race=race)
+    elif name == "mcts":
+        search = MCTS(clock, playouts=int(arg) if arg else None)
+        return LudoGame(player_id, game_mode, clock=clock, race=race, mcts=search)
+
+    raise ValueError("Unknown bot: %r" % spec)
+
+
+class Referee(object):
+
+    """Plays a single game between two bots & enforces the rules."""
+
+    def __init__(self, bots, seed=None):
+        # bots[0] moves first
+        self.bots = bots
+        self.rng = random.Random(seed)
+
+        # Positions of bots[0]'s coins first (see state.py)
+        self.state = initial_state()
+
+        self.turns = 0
+        self.winner = None
+
+    def mover_state(self):
+        """The state seen from the side about to move."""
+        return self.state if self.side == 0 else swap(self.state)
+
+    def play_turn(self):
+        """A single throw of the side about to move; returns True if they get a repeat."""
+        bot, other = self.bots[self.side], self.bots[1 - self.side]
+
+        die_rolls = throw(self.rng)
+        moves = bot.play_turn(die_rolls)
+
+        before = self.mover_state()
+        after = check_moves(before, parse_moves(bot.player.color, moves, die_rolls), die_rolls)
+
+        self.state = after if self.side == 0 else swap(after)
+        other.observe(moves if moves else ["NA"])
+
+        if is_finished(after):
+            self.winner = self.side
+            return False
+
+        return earns_repeat(before, after)
+
+    def play(self):
+        """Play the game till the end; returns the winner: 0, 1 or None (draw)."""
+        self.side = 0
+
+        while self.winner is None and self.turns < MAX_TURNS:
+            self.turns += 1
+            if not self.play_turn():
+                self.side = 1 - self.side
+
+        return self.winner
+
+
+def play_game(spec_a, spec_b, seed, a_first=True, game_mode=0, time_limit=None):
+    """
+    Play a game of bot A against bot B.
+
+    Returns (winner, turns, forfeit); winner is "A", "B" or None for a draw.
+    A bot that plays an illegal move loses the game by forfeit.
+    """
+    if a_first:
+        bots = [make_bot(spec_a, 1, game_mode, time_limit), make_bot(spec_b, 2, game_mode, time_limit)]
+        names = ["A", "B"]
+    else:
+        bots = [make_bot(spec_b, 1, game_mode, time_limit), make_bot(spec_a, 2, game_mode, time_limit)]
+        names = ["B", "A"]
+
+    referee = Referee(bots, seed)
+    try:
+        winner = referee.play()
+    except IllegalMove as e:
+        log.error("Game %d: %s forfeits: %s", seed, names[referee.side], e)
+        return names[1 - referee.side], referee.turns, True
+
+    return (names[winner] if winner is not None else None), referee.turns, False
+
+
+def wilson_interval(wins, games, z=Z_95):
+    """Confidence interval of a win rate (Wilson score interval)."""
+    if not games:
+        return 0.0, 1.0
+
+    p = wins / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play our bots against each other.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--a", default="greedy",
+                        help="greedy, search:N, value:PATH or mcts:N; +race for the race table")
+    parser.add_argument("--b", default="greedy",
+                        help="greedy, search:N, value:PATH or mcts:N; +race for the race table")
+    parser.add_argument("--mode", type=int, default=0, help="game mode, as sent by the client")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="seconds per game & bot; default: no clock")
+    args = parser.parse_args()
+
+    # Strategies are chatty
+    log.setLevel(logging.ERROR)
+
+    # A seed for every game, so a single game can be replayed
+    seeds = random.Random(args.seed)
+
+    results = Counter()
+    forfeits = 0
+    turns = 0
+
+    started = time.perf_counter()
+    for game in range(args.games):
+        # Take turns at moving first
+        winner, game_turns, forfeit = play_game(
+            args.a, args.b, seeds.getrandbits(32), a_first=game % 2 == 0,
+            game_mode=args.mode, time_limit=args.time_limit)
+
+        results[winner] += 1
+        forfeits += forfeit
+        turns += game_turns
+    took = time.perf_counter() - started
+
+    wins, games = results["A"], args.games
+    low, high = wilson_interval(wins, games)
+
+    print("%s (A) vs %s (B): %d games in %.2fs: %.1f games/s" % (
+        args.a, args.b, games, took, games / took))
+    print("A wins: %d, B wins: %d, draws: %d, forfeits: %d, mean turns: %.1f" % (
+        wins, results["B"], results[None], forfeits, turns / games))
+    print("A win rate: %.3f (95%% CI: %.3f - %.3f)" % (wins / games, low, high))
+    print("Move cache: %s" % MOVE_CACHE.stats())
+
+
+if __name__ == '__main__':
+    main()
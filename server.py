@@ -0,0 +1,268 @@
+"""
+This module is a local stand-in for the course's server & client.
+
+It starts two bots (main.py by default) as child processes and talks to
+them over their stdin / stdout, exactly like the client does:
+
+    -> "1 120 0 0"                  init: player id, time limit, mode, board
+    <- "<THROW>"                    the bot asks for a roll
+    -> "You rolled 6 3"             its die rolls; or "DUCK" on three 6s
+    <- "R0_6<next>R0_3"             its moves; or "NA"
+    -> "REPEAT"                     after a kill or finish, it goes again
+
+The other bot gets a line with the die rolls & a line with the moves,
+ending with "<next>REPEAT" if the mover is going again.
+
+No TCP hop & no binaries: games run hermetically, with seeded dice,
+and every line sent or received is kept in a transcript.
+
+Run it as: python server.py --games 10 --seed 1 [--transcript game.txt]
+"""
+
+import sys
+import time
+import random
+import argparse
+import subprocess
+
+from collections import Counter
+
+from selfplay import IllegalMove, throw, parse_moves, check_moves
+from selfplay import MAX_TURNS
+from state import initial_state, swap, is_finished, earns_repeat
+
+
+# Our games will only ever have 2 players; the colors of player 1 & 2
+COLORS = {
+    0: ["RED", "YELLOW"],
+    1: ["BLUE", "GREEN"],
+}
+
+DEFAULT_COMMAND = [sys.executable, "main.py"]
+
+
+class BotProcess(object):
+
+    """A bot running as a child process, spoken to line by line."""
+
+    # Seconds a bot gets to exit once its stdin is closed
+    EXIT_TIMEOUT = 1.0
+
+    def __init__(self, player_id, command, transcript, stderr=subprocess.DEVNULL):
+        self.player_id = player_id
+        self.transcript = transcript
+
+        self.proc = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+            universal_newlines=True, bufsize=1,
+        )
+
+        # Seconds the bot spent answering us
+        self.thinking = 0.0
+        self.latencies = []
+
+    def send(self, line):
+        self.transcript.append((time.perf_counter(), "->", self.player_id, line))
+        self.proc.stdin.write(line + "\n")
+        self.proc.stdin.flush()
+
+    def receive(self):
+        line = self.proc.stdout.readline()
+        if not line:
+            raise IllegalMove("Player %d exited" % self.player_id)
+
+        line = line.strip()
+        self.transcript.append((time.perf_counter(), "<-", self.player_id, line))
+        return line
+
+    def ask(self, line):
+        """Send a line & time how long the bot takes to answer."""
+        self.send(line)
+
+        started = time.perf_counter()
+        answer = self.receive()
+        took = time.perf_counter() - started
+
+        self.thinking += took
+        self.latencies.append(took)
+        return answer
+
+    def close(self):
+        # Closing stdin ends the game for the bot; it can report & exit
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        try:
+            self.proc.wait(timeout=self.EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+        self.proc.stdout.close()
+
+
+class LocalServer(object):
+
+    """Plays a single game between two bot processes & enforces the rules."""
+
+    def __init__(self, commands=(DEFAULT_COMMAND, DEFAULT_COMMAND), seed=None,
+                 time_limit=120, game_mode=0, stderr=subprocess.DEVNULL):
+        self.commands = commands
+        self.rng = random.Random(seed)
+        self.time_limit = time_limit
+        self.game_mode = game_mode
+        self.stderr = stderr
+
+        # Positions of player 1's coins first (see state.py)
+        self.state = initial_state()
+
+        # [(time, direction, player id, line), ...]
+        self.transcript = []
+
+        self.bots = []
+        self.side = 0
+        self.turns = 0
+        self.winner = None
+        self.forfeit = None
+
+    def start(self):
+        for idx, command in enumerate(self.commands):
+            bot = BotProcess(idx + 1, command, self.transcript, self.stderr)
+            self.bots.append(bot)
+            bot.send("%d %d %d 0" % (idx + 1, self.time_limit, self.game_mode))
+
+    def close(self):
+        for bot in self.bots:
+            bot.close()
+
+    def play_turn(self):
+        """A single throw of the side about to move; returns True if they get a repeat."""
+        bot, other = self.bots[self.side], self.bots[1 - self.side]
+
+        line = bot.receive()
+        if line != "<THROW>":
+            raise IllegalMove("Player %d sent %r instead of <THROW>" % (bot.player_id, line))
+
+        die_rolls = throw(self.rng)
+        dice = "You rolled " + " ".join(map(str, die_rolls)) if die_rolls else "DUCK"
+
+        line = bot.ask(dice)
+        if bot.thinking > self.time_limit:
+            raise IllegalMove("Player %d ran out of time" % bot.player_id)
+
+        moves = [] if line == "NA" else line.split("<next>")
+
+        before = self.state if self.side == 0 else swap(self.state)
+        color = COLORS[self.game_mode][self.side]
+        after = check_moves(before, parse_moves(color, moves, die_rolls), die_rolls)
+
+        self.state = after if self.side == 0 else swap(after)
+
+        if is_finished(after):
+            self.winner = self.side + 1
+            return False
+
+        repeat = earns_repeat(before, after)
+
+        if repeat:
+            bot.send("REPEAT")
+            line += "<next>REPEAT"
+
+        other.send(dice)
+        other.send(line)
+
+        return repeat
+
+    def play(self):
+        """Play the game till the end; returns the winner: 1, 2 or None (draw / error)."""
+        self.start()
+        try:
+            while self.winner is None and self.turns < MAX_TURNS:
+                self.turns += 1
+                if not self.play_turn():
+                    self.side = 1 - self.side
+
+        except IllegalMove as e:
+            self.forfeit = str(e)
+            self.winner = 2 - self.side
+
+        finally:
+            self.close()
+
+        return self.winner
+
+    def dump_transcript(self, file):
+        """Write the transcript; times are relative to the first line."""
+        if not self.transcript:
+            return
+
+        started = self.transcript[0][0]
+        for when, direction, player_id, line in self.transcript:
+            file.write("%9.4f %s P%d %s\n" % (when - started, direction, player_id, line))
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play bots against each other over pipes.")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--time-limit", type=int, default=120,
+                        help="seconds per game & bot, sent in the init line")
+    parser.add_argument("--mode", type=int, default=0, help="game mode, as sent by the client")
+    parser.add_argument("--p1", default=" ".join(DEFAULT_COMMAND), help="command of player 1")
+    parser.add_argument("--p2", default=" ".join(DEFAULT_COMMAND), help="command of player 2")
+    parser.add_argument("--transcript", help="write the transcripts of all games to this file")
+    parser.add_argument("--stderr", help="append the bots' logs to this file")
+    args = parser.parse_args()
+
+    seeds = random.Random(args.seed)
+
+    transcript = open(args.transcript, "w") if args.transcript else None
+    stderr = open(args.stderr, "a") if args.stderr else subprocess.DEVNULL
+
+    winners = Counter()
+    latencies = []
+    turns = 0
+
+    started = time.perf_counter()
+    for game in range(args.games):
+        seed = seeds.getrandbits(32)
+        server = LocalServer([args.p1.split(), args.p2.split()], seed,
+                             args.time_limit, args.mode, stderr)
+        winner = server.play()
+
+        winners[winner] += 1
+        turns += server.turns
+        for bot in server.bots:
+            latencies.extend(bot.latencies)
+
+        print("Game %d (seed %d): winner: %s, turns: %d%s" % (
+            game + 1, seed, winner, server.turns,
+            ", forfeit: %s" % server.forfeit if server.forfeit else ""))
+
+        if transcript:
+            transcript.write("# Game %d, seed %d\n" % (game + 1, seed))
+            server.dump_transcript(transcript)
+
+    took = time.perf_counter() - started
+
+    print("%d games in %.2fs: %.2f games/s, mean turns: %.1f" % (
+        args.games, took, args.games / took, turns / args.games))
+    print("Wins: player 1: %d, player 2: %d, draws: %d" % (winners[1], winners[2], winners[None]))
+    if latencies:
+        print("Move latency: mean %.1fms, p50 %.1fms, p95 %.1fms, max %.1fms" % (
+            1000 * sum(latencies) / len(latencies), 1000 * _percentile(latencies, 0.5),
+            1000 * _percentile(latencies, 0.95), 1000 * max(latencies)))
+
+    if transcript:
+        transcript.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+This module is a transposition table that several processes can share.
+
+The workers of parallel.py analyse the same turn; with a table each,
+they would all evaluate the same positions again. This table lives in
+multiprocessing.shared_memory so every worker reads & writes the same
+entries. It can be used by Search just like a TranspositionTable.
+
+Layout of the shared memory block:
+
+    Header (8 bytes):   generation (uint64)
+    Entries (32 bytes each), four little endian uint64 words:
+
+        0: check       key XOR the other three words
+        8: score       bits of a float64
+       16: best        8 bytes, one per coin; all 0xFF if there is no move
+       24: info        depth (bits 0-7), flag (bits 8-15),
+                       generation + 1 (bits 16-63); so it is never 0 once used
+
+Races: There are no locks. A write is 4 separate words, so a reader can
+see an entry that is half written (torn). Since the check word is the key
+XOR all the other words, a torn entry fails the check & is treated as a
+miss. When two processes write to the same slot, the last write wins.
+"""
+
+import struct
+
+from multiprocessing import shared_memory
+
+from transposition import EXACT
+
+
+HEADER = struct.Struct("<Q")
+ENTRY = struct.Struct("<4Q")
+SCORE = struct.Struct("<d")
+
+NO_MOVE = (1 << 64) - 1
+
+
+def _pack_score(score):
+    return int.from_bytes(SCORE.pack(score), "little")
+
+
+def _unpack_score(bits):
+    return SCORE.unpack(bits.to_bytes(8, "little"))[0]
+
+
+class SharedTranspositionTable(object):
+
+    """A lock free, fixed size hash table of search results in shared memory."""
+
+    def __init__(self, size=1 << 16, name=None):
+        """Creates a new table; or attaches to an existing one, by name."""
+        assert size & (size - 1) == 0, "Size should be a power of 2"
+
+        self.mask = size - 1
+        self.owner = name is None
+
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=HEADER.size + size * ENTRY.size)
+            self.memory.buf[:] = bytes(len(self.memory.buf))
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+
+        self.name = self.memory.name
+        self.buf = self.memory.buf
+
+        self.generation = 0
+
+        # Statistics (of this process)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def close(self):
+        """Detach from the table; the process that created it also frees it."""
+        self.buf = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def new_turn(self):
+        """Called by the owner: entries stored till now are from an older turn."""
+        generation = HEADER.unpack_from(self.buf, 0)[0] + 1
+        HEADER.pack_into(self.buf, 0, generation)
+
+    def new_search(self):
+        """Pick up the generation that the owner has set."""
+        self.generation = HEADER.unpack_from(self.buf, 0)[0]
+
+    def _read(self, idx):
+        """Words of the entry in a slot; None if it is empty or torn."""
+        check, score, best, info = ENTRY.unpack_from(self.buf, HEADER.size + idx * ENTRY.size)
+        if not info:
+            return None
+
+        return check ^ score ^ best ^ info, score, best, info
+
+    def lookup(self, key):
+        """Returns the entry stored for a key: (key, depth, value, flag, best, generation); or None."""
+        words = self._read(key & self.mask)
+
+        # Either someone else's key, or an entry torn by a racing write
+        if words is None or words[0] != key:
+            self.misses += 1
+            return None
+
+        _, score, best, info = words
+        self.hits += 1
+
+        return (
+            key,
+            info & 0xFF,
+            _unpack_score(score),
+            (info >> 8) & 0xFF,
+            None if best == NO_MOVE else tuple(best.to_bytes(8, "little")),
+            (info >> 16) - 1,
+        )
+
+    def store(self, key, depth, value, flag=EXACT, best=None):
+        """Store a search result, unless a more valuable entry is in its slot."""
+        idx = key & self.mask
+
+        words = self._read(idx)
+        if words is not None:
+            stored_depth, stored_generation = words[3] & 0xFF, words[3] >> 16
+            # Keep deeper results of the current turn
+            if stored_generation == self.generation + 1 and stored_depth > depth:
+                return
+            if words[0] != key:
+                self.replaced += 1
+
+        score = _pack_score(value)
+        best = NO_MOVE if best is None else int.from_bytes(bytes(best), "little")
+
+        info = depth | (flag << 8) | ((self.generation + 1) << 16)
+
+        check = key ^ score ^ best ^ info
+        ENTRY.pack_into(self.buf, HEADER.size + idx * ENTRY.size, check, score, best, info)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return "hits: %d, misses: %d (%.1f%%), stores: %d, replaced: %d" % (
+            self.hits, self.misses, 100 * self.hit_rate, self.stores, self.replaced)
@@ -0,0 +1,185 @@
+"""
+This module provides a compact representation of the game state.
+
+The state of a game is nothing but the positions of all 8 coins,
+so it is stored as a plain tuple of relative positions:
+
+    (my coin 0, ..., my coin 3, opponent's coin 0, ..., opponent's coin 3)
+
+The first four positions always belong to the player who is about to move,
+use swap() to look at the board from the other side.
+
+Tuples can be hashed, copied & compared in O(1) without creating any
+Player / Coin objects, so search code should work on these states and
+only use Player objects to talk to the client.
+
+A move is a tuple: (coin index, die roll).
+"""
+
+from itertools import permutations
+
+from tables import JAIL, FINISH
+from tables import SAFE_SQUARES, OPPOSITE
+
+
+# Everything a single throw can result in: [(probability, die rolls), ...]
+# A 6 earns another roll, but three 6s in a row is a DUCK (no move)
+ROLLS = (
+    [(1 / 6, (die,)) for die in range(1, 6)] +
+    [(1 / 36, (6, die)) for die in range(1, 6)] +
+    [(1 / 216, (6, 6, die)) for die in range(1, 6)] +
+    [(1 / 216, ())]
+)
+
+
+# Unique orders of a multiset of die rolls (sorted tuple) -> [(die, ...), ...]
+# Filled in for all of ROLLS below; other multisets are added when first seen
+_ORDERINGS = {}
+
+
+def orderings(die_rolls):
+    """All unique orders in which die rolls can be played; cached per multiset."""
+    key = tuple(sorted(die_rolls))
+    if key not in _ORDERINGS:
+        _ORDERINGS[key] = sorted(set(permutations(key)))
+    return _ORDERINGS[key]
+
+
+for _, _rolls in ROLLS:
+    orderings(_rolls)
+
+
+def initial_state():
+    """All coins in their jails."""
+    return (JAIL,) * 8
+
+
+def swap(state):
+    """Look at the same board from the opponent's side."""
+    return state[4:] + state[:4]
+
+
+def is_finished(state):
+    """Has the player who is about to move won?"""
+    return state[0] == state[1] == state[2] == state[3] == FINISH
+
+
+def earns_repeat(state, new_state):
+    """
+    Does the player who moved from state to new_state get another turn?
+
+    Killing an opponent's coin or finishing a coin earns a REPEAT.
+    """
+    return (
+        new_state[4:].count(JAIL) > state[4:].count(JAIL) or
+        new_state[:4].count(FINISH) > state[:4].count(FINISH)
+    )
+
+
+def legal_moves(state, die):
+    """
+    List all moves the player about to move can make with a die roll.
+
+    Follows the same rules as Player.make_moves & Player.get_move:
+    coins open on a 1 or a 6, can't overshoot the finishing square
+    and may only stack on safe squares.
+    """
+    moves = []
+    for idx in range(4):
+        rel_pos = state[idx]
+
+        if rel_pos == JAIL:
+            if die == 1 or die == 6:
+                moves.append((idx, die))
+
+        elif rel_pos + die <= FINISH:
+            target = rel_pos + die
+            if target in SAFE_SQUARES or target not in state[:4]:
+                moves.append((idx, die))
+
+    return moves
+
+
+def apply_move(state, move):
+    """
+    Return the state after the player about to move has made a move.
+
+    The move is assumed to be legal.
+    Opponent coins that get killed are sent back to their jail.
+    """
+    idx, die = move
+    rel_pos = state[idx]
+
+    # Even if you open with 6, you still move 1 step
+    if rel_pos == JAIL:
+        target = 1
+    else:
+        target = rel_pos + die
+
+    mine = list(state[:4])
+    mine[idx] = target
+
+    theirs = state[4:]
+    if target not in SAFE_SQUARES:
+        victim_pos = OPPOSITE[target]
+        if victim_pos in theirs:
+            theirs = tuple(JAIL if pos == victim_pos else pos for pos in theirs)
+
+    return tuple(mine) + theirs
+
+
+def end_states(state, die_rolls):
+    """
+    Every legal way to play a list of die rolls, one per board it leads to.
+
+    Like LudoGame.run, the rolls may be played in any order, a roll that
+    can't be played is skipped, and only sequences of maximal length are kept.
+    Orders that reach the same board after the same rolls are only followed once.
+
+    Returns a dict: {state after the moves: moves}
+    """
+    # A single roll, the most common case: nothing to order or merge
+    if len(die_rolls) == 1:
+        return {apply_move(state, move): (move,) for move in legal_moves(state, die_rolls[0])}
+
+    found = {}
+    _expand(state, tuple(sorted(die_rolls)), (), found, set())
+
+    if not found:
+        return found
+
+    max_len = max(len(moves) for moves in found.values())
+    return {
+        end: moves
+        for end, moves in found.items()
+        if len(moves) == max_len
+    }
+
+
+def _expand(state, rolls, moves, found, seen):
+    """Recursive helper of end_states; rolls is a sorted tuple of the rolls left."""
+    key = (state, rolls, len(moves))
+    if key in seen:
+        return
+    seen.add(key)
+
+    if not rolls:
+        if moves and state not in found:
+            found[state] = moves
+        return
+
+    previous = None
+    for idx, die in enumerate(rolls):
+        # Playing either of two equal rolls first is the same thing
+        if die == previous:
+            continue
+        previous = die
+
+        rest = rolls[:idx] + rolls[idx + 1:]
+
+        possible = legal_moves(state, die)
+        if not possible:
+            _expand(state, rest, moves, found, seen)
+
+        for move in possible:
+            _expand(apply_move(state, move), rest, moves + (move,), found, seen)
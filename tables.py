@@ -0,0 +1,85 @@
+"""
+This module holds lookup tables for the geometry of the board.
+
+They are built once, when this module is imported, so that the
+innermost loops of the strategies never have to recompute anything.
+"""
+
+from config import PLAYER_COLORS
+
+# Jail, Finishing square & the first square of the home column
+JAIL = 0
+FINISH = 57
+HOME_COLUMN = 52
+
+# Relative positions can overshoot the finishing square by a few squares
+# when we look ahead (rel_pos + die), so every row is a bit wider than 58
+ROW_SIZE = 64
+
+# Starting squares & Star squares, plus the jail & the home column
+SAFE_SQUARES = frozenset([0, 1, 9, 14, 22, 27, 35, 40, 48] + list(range(52, 58)))
+
+# Indexed by relative position
+IS_SAFE = tuple(rel_pos in SAFE_SQUARES for rel_pos in range(ROW_SIZE))
+
+# "R" -> 0, "G" -> 1, ...
+# Coins are identified by the first letter of their color at a few places
+COLOR_INDEX = {color[0]: idx for idx, color in enumerate(PLAYER_COLORS)}
+
+
+def _rel_to_abs(color_index, rel_pos):
+    if rel_pos == JAIL:            # Inside yard
+        return 0
+    elif rel_pos >= HOME_COLUMN:   # Inside home column
+        return -1
+    # Subtract 1 to make it 0 based; add it back to make 1 based again
+    return (rel_pos - 1 + 13 * color_index) % 52 + 1
+
+
+# Flat table of absolute positions,
+# indexed by: color_index * ROW_SIZE + rel_pos
+ABS_POS = tuple(
+    _rel_to_abs(color_index, rel_pos)
+    for color_index in range(len(PLAYER_COLORS))
+    for rel_pos in range(ROW_SIZE)
+)
+
+
+def _opposite(rel_pos):
+    """
+    Convert a relative position of mine to the opponent's relative position.
+
+    Our games only ever have 2 players who sit in opposite corners
+    (see LudoGame.__init__), so their squares are 26 ahead of ours.
+
+    Returns -1 if the square is off the common track for the opponent.
+    """
+    if rel_pos == JAIL or rel_pos >= HOME_COLUMN:
+        return -1
+
+    opp_pos = (rel_pos - 1 + 26) % 52 + 1
+
+    # This square is inside the opponent's home column
+    if opp_pos >= HOME_COLUMN:
+        return -1
+
+    return opp_pos
+
+
+# Indexed by relative position
+OPPOSITE = tuple(_opposite(rel_pos) for rel_pos in range(ROW_SIZE))
+
+
+def _abs_to_rel(color_index, abs_pos):
+    if abs_pos == 0:               # Inside yard
+        return JAIL
+    return (abs_pos - 1 - 13 * color_index) % 52 + 1
+
+
+# Flat table of relative positions on the common track (1 to 52),
+# indexed by: color_index * 53 + abs_pos
+REL_POS = tuple(
+    _abs_to_rel(color_index, abs_pos)
+    for color_index in range(len(PLAYER_COLORS))
+    for abs_pos in range(53)
+)
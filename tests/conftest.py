@@ -0,0 +1,71 @@
+"""
+Shared helpers of the tests.
+
+The modules live at the top of the repository, so it is put on the path.
+"""
+
+import os
+import sys
+import random
+import logging
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import log
+from player import Player
+from tables import IS_SAFE
+
+# Moves are logged at DEBUG, keep the output readable
+log.setLevel(logging.ERROR)
+
+
+class FakeTimer(object):
+
+    """Time only passes when a test says so."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def random_state(rng):
+    """A random state, with plenty of coins in the jails, on the common track & finished."""
+    def position():
+        return rng.choice([0, 0, 57, rng.randint(1, 51), rng.randint(1, 56)])
+
+    # Coins of a player only stack on safe squares
+    while True:
+        state = tuple(position() for _ in range(8))
+        if all(_no_stacks(coins) for coins in (state[:4], state[4:])):
+            return state
+
+
+def _no_stacks(coins):
+    """Are all coins that are on unsafe squares on different ones?"""
+    unsafe = [pos for pos in coins if not IS_SAFE[pos]]
+    return len(unsafe) == len(set(unsafe))
+
+
+@pytest.fixture
+def states():
+    """A few hundred random states, the same ones on every run."""
+    rng = random.Random(5)
+    return [random_state(rng) for _ in range(300)]
+
+
+@pytest.fixture
+def players():
+    """Returns a function that sets up Player objects for a state: (me, opponent)."""
+    def setup(state, colors=("RED", "YELLOW")):
+        me, opponent = Player(colors[0]), Player(colors[1])
+        for coin, rel_pos in zip(me.coin_list, state[:4]):
+            coin.rel_pos = rel_pos
+        for coin, rel_pos in zip(opponent.coin_list, state[4:]):
+            coin.rel_pos = rel_pos
+        return me, opponent
+
+    return setup
@@ -0,0 +1,60 @@
+"""The batch simulator has to play by the greedy rules of player.py."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch import BatchSimulator, choose, ROWS
+from player import greedy_move, greedy_turn
+from state import FINISH, ROLLS, earns_repeat
+
+
+def test_choose_matches_greedy_move(states):
+    n = len(states)
+    positions = np.array(states, dtype=np.int16)
+    sides = np.zeros(n, dtype=np.intp)
+
+    for die in range(1, 7):
+        coins, benefits = choose(positions[:, :4], positions[:, 4:], np.full(n, die, dtype=np.int16),
+                                 ROWS[sides], ROWS[1 - sides])
+
+        for state, coin, benefit in zip(states, coins, benefits):
+            move, expected = greedy_move(state, die)
+            assert coin == (-1 if move is None else move[0]), (state, die)
+            assert benefit == expected, (state, die)
+
+
+def test_throws_match_greedy_turn(states):
+    # Every state with every kind of throw, played as one batch step by side 0
+    throws = [die_rolls for _, die_rolls in ROLLS]
+    games = [(state, die_rolls) for state in states for die_rolls in throws]
+
+    sim = BatchSimulator(len(games))
+    sim.pos[:] = np.array([state for state, _ in games], dtype=np.int16).reshape(-1, 2, 4)
+    sim.roll = lambda n: np.array([die_rolls + (0,) * (3 - len(die_rolls)) for _, die_rolls in games],
+                                  dtype=np.int16)
+    sim.step()
+
+    for game, (state, die_rolls) in enumerate(games):
+        _, end = greedy_turn(state, die_rolls)
+        assert tuple(sim.pos[game].ravel()) == end, (state, die_rolls)
+
+        if sim.winner[game] < 0:
+            assert sim.side[game] == (0 if earns_repeat(state, end) else 1), (state, die_rolls)
+
+
+def test_games_end_with_a_winner():
+    winner, turns = BatchSimulator(200, seed=2).run()
+
+    assert ((winner == 0) | (winner == 1)).all()
+    assert (turns > 0).all()
+
+
+def test_only_the_winner_has_finished_all_coins():
+    sim = BatchSimulator(200, seed=3)
+    sim.run()
+
+    done = (sim.pos == FINISH).all(axis=2)
+    games = np.arange(sim.games)
+    assert done[games, sim.winner].all()
+    assert not done[games, 1 - sim.winner].any()
@@ -0,0 +1,79 @@
+"""The clock's budgets, run on a fake timer."""
+
+import pytest
+
+from clock import Clock
+from conftest import FakeTimer
+
+
+def test_budgets_add_up_to_the_time_limit():
+    timer = FakeTimer()
+    clock = Clock(60, timer)
+
+    # Every turn uses up its whole budget, the game goes on for far longer than expected
+    for turn in range(1000):
+        budget = clock.start_turn(progress=min(1.0, turn / 100))
+        assert clock.time_left() == pytest.approx(budget)
+
+        timer.now += budget
+        assert clock.out_of_time()
+        assert clock.end_turn() == pytest.approx(budget)
+
+    assert clock.turns == 1000
+    assert clock.used <= clock.time_limit - clock.reserve
+
+
+def test_budget_near_the_end_and_when_shared():
+    clock = Clock(60, FakeTimer())
+    spendable = clock.time_limit - clock.reserve
+
+    # Almost done: still plan for MIN_TURNS_LEFT more turns, not all the rest in one
+    budget = clock.start_turn(progress=0.99)
+    assert budget == pytest.approx(spendable / Clock.MIN_TURNS_LEFT - Clock.IO_MARGIN)
+
+    # Games playing side by side split it
+    clock.end_turn()
+    clock.share = 4
+    budget = clock.start_turn(progress=0.99)
+    assert budget == pytest.approx(spendable / Clock.MIN_TURNS_LEFT / 4 - Clock.IO_MARGIN)
+
+
+def test_time_spent_before_the_turn_counts():
+    timer = FakeTimer()
+    clock = Clock(60, timer)
+
+    # The roll was read 0.1s ago, but only handled now
+    budget = clock.start_turn(started=timer.now - 0.1)
+    assert clock.time_left() == pytest.approx(budget - 0.1)
+    assert clock.end_turn() == pytest.approx(0.1)
+
+
+def test_no_budget_left():
+    timer = FakeTimer()
+    clock = Clock(5, timer)
+
+    clock.start_turn()
+    timer.now += 10
+    clock.end_turn()
+
+    assert clock.start_turn() == 0.0
+    assert clock.out_of_time()
+
+
+def test_for_turn():
+    timer = FakeTimer()
+    clock = Clock.for_turn(0.5, timer)
+
+    assert not clock.out_of_time()
+    timer.now += 0.5
+    assert clock.out_of_time()
+
+
+def test_until_a_deadline():
+    # A turn that started in another process, with its deadline on the same timer
+    timer = FakeTimer()
+    clock = Clock.until(timer.now + 0.5, timer)
+
+    assert clock.time_left() == pytest.approx(0.5)
+    timer.now += 0.5
+    assert clock.out_of_time()
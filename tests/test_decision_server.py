@@ -0,0 +1,93 @@
+"""Games served over a unix socket by a single decision server."""
+
+import os
+import asyncio
+import tempfile
+
+from decision_server import DecisionServer
+from selfplay import parse_moves, check_moves
+from state import initial_state
+
+
+def serve(lines_of_clients, server_class=DecisionServer):
+    """
+    Start a server, connect a client for every list of lines & send them one by one.
+
+    Every line is answered before the next one is sent, like the course's client does.
+    No exception may escape the server's handlers.
+    Returns what each client received: [[line, ...], ...]
+    """
+    async def client(path, lines):
+        reader, writer = await asyncio.open_unix_connection(path)
+
+        received = []
+        for line in lines:
+            writer.write((line + "\n").encode())
+            await writer.drain()
+
+            answer = await asyncio.wait_for(reader.readline(), 5)
+            if not answer:
+                break
+            received.append(answer.decode().strip())
+
+        writer.close()
+        return received
+
+    async def run(path):
+        # Exceptions that escape a connection's handler end up here, not in the test
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+
+        server = server_class(path, search_depth=1, trace_memory=False)
+        listening = await asyncio.start_unix_server(server.handle, path=path)
+
+        async with listening:
+            results = await asyncio.gather(*[client(path, lines) for lines in lines_of_clients])
+
+        assert not errors
+        return results
+
+    with tempfile.TemporaryDirectory() as directory:
+        return asyncio.run(run(os.path.join(directory, "ludo.sock")))
+
+
+def test_games_are_served_side_by_side():
+    # Player 1 throws first; a 3 can't move a coin out of the jail
+    results = serve([["1 120 0 0", "You rolled 3"], ["1 120 1 0", "You rolled 6 1"]])
+
+    assert results[0] == ["<THROW>", "NA"]
+
+    # Blue opens a coin & plays the other roll too
+    assert results[1][0] == "<THROW>"
+    moves = parse_moves("BLUE", results[1][1].split("<next>"), [6, 1])
+    check_moves(initial_state(), moves, [6, 1])
+
+
+def test_malformed_init_closes_the_connection():
+    # The connection is closed without an answer & the server keeps serving
+    results = serve([["not an init line"], ["1 120 0 0"]])
+
+    assert results == [[], ["<THROW>"]]
+
+
+class BuggyServer(DecisionServer):
+
+    """Its games crash on a roll of 5."""
+
+    def new_game(self, init):
+        game = DecisionServer.new_game(self, init)
+        feed = game.feed
+
+        def buggy_feed(line, received=None):
+            if line == "You rolled 5":
+                raise RuntimeError("bug")
+            return feed(line, received)
+
+        game.feed = buggy_feed
+        return game
+
+
+def test_a_crashing_game_closes_only_its_connection():
+    results = serve([["1 120 0 0", "You rolled 5", "You rolled 3"], ["1 120 0 0", "You rolled 3"]], BuggyServer)
+
+    assert results == [["<THROW>"], ["<THROW>", "NA"]]
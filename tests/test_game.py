@@ -0,0 +1,85 @@
+"""LudoGame's decisions: refined by the search for as long as the clock allows."""
+
+import io
+
+from clock import Clock
+from conftest import FakeTimer
+from game import LudoGame
+from protocol import Watchdog, Writer
+from state import end_states, ROLLS
+
+
+def game_in(state, players, search_depth, clock):
+    """A game of RED (about to move) against YELLOW, in a state."""
+    game = LudoGame(1, 0, search_depth=search_depth, clock=clock)
+    game.player, game.opponent = players(state)
+    return game
+
+
+def decided(game, state, die_rolls, depth):
+    """The moves a search to depth decides on, as move strings; empty if there are none."""
+    if not end_states(state, die_rolls):
+        return []
+
+    best, _ = game.search.best_moves(state, die_rolls, depth)
+    return [game.player.move_name(move) for move in best]
+
+
+def test_out_of_time_keeps_the_best_answer_so_far(states, players):
+    timer = FakeTimer()
+    clock = Clock(60, timer)
+
+    for state in states[:50]:
+        game = game_in(state, players, 3, clock)
+
+        # Check the clock on every node: the deadline passes as soon as the search starts
+        # Looking 1 turn ahead only evaluates the ends of the moves, so that answer is kept
+        game.search.POLL_INTERVAL = 1
+        clock.start_turn()
+        timer.now = clock.deadline + 1
+
+        for _, die_rolls in ROLLS:
+            moves = game.decide(list(die_rolls))
+            assert moves == decided(game, state, die_rolls, 1), (state, die_rolls)
+
+        clock.end_turn()
+
+
+def test_in_time_the_search_goes_deeper(states, players):
+    clock = Clock(60, FakeTimer())
+
+    for state in states[:10]:
+        game = game_in(state, players, 2, clock)
+        clock.start_turn()
+
+        for _, die_rolls in ROLLS:
+            moves = game.decide(list(die_rolls))
+            assert moves == decided(game, state, die_rolls, 2), (state, die_rolls)
+
+        clock.end_turn()
+
+
+def test_the_watchdog_gets_every_depth(states, players):
+    clock = Clock(60, FakeTimer())
+
+    for state in states[:10]:
+        game = game_in(state, players, 2, clock)
+        game.watchdog = Watchdog(Writer(io.StringIO()))
+        clock.start_turn()
+
+        for _, die_rolls in ROLLS:
+            # Armed with the greedy moves, then given those of every depth searched
+            moves = game.decide(list(die_rolls))
+            if moves:
+                assert game.watchdog.fallback == moves
+            game.watchdog.disarm()
+
+        clock.end_turn()
+
+
+def test_without_a_search_the_greedy_moves_are_played(states, players):
+    for state in states[:50]:
+        game = game_in(state, players, 0, None)
+
+        for _, die_rolls in ROLLS:
+            assert game.decide(list(die_rolls)) == game.greedy_moves(die_rolls)
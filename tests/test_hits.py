@@ -0,0 +1,76 @@
+"""The hit tables of hits.py against playing out every throw, coin by coin."""
+
+from itertools import permutations
+
+import pytest
+
+from hits import attack_mask, probability
+from player import threat
+from state import ROLLS
+from tables import IS_SAFE, OPPOSITE
+
+
+def lands_on(attackers, pos, target, die_rolls):
+    """Can a coin at pos land on target with some of the die_rolls, in some order?"""
+    for count in range(1, len(die_rolls) + 1):
+        for order in permutations(die_rolls, count):
+            square, rest = pos, order
+
+            # A coin in the jail has to open onto square 1 first
+            if pos == 0:
+                if order[0] not in (1, 6) or count == 1:
+                    continue
+                square, rest = 1, order[1:]
+
+            # It can't pass through unsafe squares occupied by the other attackers
+            for die in rest[:-1]:
+                square += die
+                if square > 51 or (not IS_SAFE[square] and square in attackers):
+                    break
+            else:
+                if square + rest[-1] == target:
+                    return True
+
+    return False
+
+
+def brute_force(attackers, target):
+    """Chance that any of the attackers lands on target with a single throw."""
+    if not 1 <= target <= 51 or IS_SAFE[target]:
+        return 0.0
+
+    return sum(
+        prob for prob, die_rolls in ROLLS
+        if any(lands_on(attackers, pos, target, die_rolls) for pos in attackers if pos <= 51)
+    )
+
+
+def test_attack_mask_matches_brute_force(states):
+    for state in states:
+        attackers = state[4:]
+        for target in range(1, 52):
+            expected = brute_force(attackers, target)
+            assert probability(attack_mask(attackers, target)) == pytest.approx(expected, abs=1e-12), (attackers, target)
+
+
+def test_threat_matches_attack_mask(states):
+    for state in states:
+        for rel_pos in state[:4]:
+            target = OPPOSITE[rel_pos] if 0 < rel_pos < 52 else -1
+            expected = probability(attack_mask(state[4:], target)) if target > 0 else 0.0
+            assert threat(state, rel_pos) == pytest.approx(expected, abs=1e-12), (state, rel_pos)
+
+
+def test_hit_chances_match_attack_mask(states):
+    np = pytest.importorskip("numpy")
+    from features import hit_chances
+
+    # Any squares will do as targets, they are only compared with attack_mask
+    attackers = np.array([state[4:] for state in states])
+    targets = np.array([state[:4] for state in states])
+    chances = hit_chances(attackers, targets)
+
+    for row, state in enumerate(states):
+        for col, target in enumerate(state[:4]):
+            expected = probability(attack_mask(state[4:], target))
+            assert chances[row, col] == pytest.approx(expected, abs=1e-12), (state, target)
@@ -0,0 +1,59 @@
+"""Monte Carlo Tree Search: its playouts follow the rules & it answers with legal moves."""
+
+import random
+
+from mcts import MCTS, _play_die, playout
+from player import greedy_turn
+from state import legal_moves, apply_move, end_states, ROLLS, FINISH
+
+
+def test_play_die_makes_a_legal_move(states):
+    rng = random.Random(1)
+    for state in states:
+        for die in range(1, 7):
+            for greedy in (False, True):
+                pos = list(state)
+                moved = _play_die(pos, 0, 4, die, greedy, rng.random)
+
+                moves = legal_moves(state, die)
+                if not moves:
+                    assert moved == 0 and tuple(pos) == state
+                else:
+                    assert tuple(pos) in [apply_move(state, move) for move in moves], (state, die)
+
+
+def test_playouts_end_with_a_winner(states):
+    rng = random.Random(2)
+    for state in states[:50]:
+        for greedy in (False, True):
+            pos = list(state)
+            winner = playout(pos, 0, greedy, rng.random)
+            coins = pos[4 * winner:4 * winner + 4]
+            assert coins == [FINISH] * 4, (state, pos)
+
+
+def test_best_moves_are_legal(states):
+    mcts = MCTS(seed=3)
+    for state in states[:10]:
+        for _, die_rolls in ROLLS:
+            moves, win = mcts.best_moves(state, die_rolls, playouts=50)
+            ends = end_states(state, die_rolls)
+
+            assert 0 <= win <= 1
+            if ends:
+                assert tuple(moves) in ends.values(), (state, die_rolls)
+            else:
+                assert moves == []
+
+
+def test_default_moves_stay_without_clear_evidence(states):
+    # Hardly any playouts: nothing can be clearly better than the default
+    mcts = MCTS(seed=4)
+    for state in states[:20]:
+        for _, die_rolls in ROLLS:
+            default, _ = greedy_turn(state, die_rolls)
+            if len(end_states(state, die_rolls)) < 2:
+                continue
+
+            moves, _ = mcts.best_moves(state, die_rolls, playouts=4, default=default)
+            assert moves == default, (state, die_rolls)
@@ -0,0 +1,87 @@
+"""The LRU cache of greedy decisions."""
+
+import time
+import threading
+
+from move_cache import LRUCache, MOVE_CACHE
+from player import greedy_move, decide_move, move_key
+
+
+def test_least_recently_used_goes_first():
+    cache = LRUCache(size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (len(cache), cache.evictions) == (2, 1)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_updates_dont_evict():
+    cache = LRUCache(size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 3)
+
+    assert (len(cache), cache.evictions) == (2, 0)
+    assert cache.get("a") == 3
+
+
+class SlowKey(object):
+
+    """A key that lets other threads run whenever it is hashed, ie: inside get & put."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        time.sleep(0.0001)
+        return hash(self.value)
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def test_threads_share_a_cache():
+    # Games of decision_server.py decide on several threads at once
+    cache = LRUCache(size=2)
+    errors = []
+
+    def work(seed):
+        try:
+            for idx in range(300):
+                key = SlowKey((idx * seed) % 5)
+                if cache.get(key) is None:
+                    cache.put(key, key.value)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(seed,)) for seed in (1, 2, 3, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(cache) == 2
+    assert cache.hits + cache.misses == 4 * 300
+
+
+def test_move_keys_are_unique(states):
+    keys = {(state, die): move_key(state, die) for state in states for die in range(1, 7)}
+    assert len(set(keys.values())) == len(keys)
+
+
+def test_cached_decisions_match_fresh_ones(states):
+    MOVE_CACHE.clear()
+    for _ in range(2):
+        for state in states:
+            for die in range(1, 7):
+                assert greedy_move(state, die) == decide_move(state, die), (state, die)
+
+    assert MOVE_CACHE.hits >= len(states) * 6
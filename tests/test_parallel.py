@@ -0,0 +1,93 @@
+"""The root parallel search has to find what a single search finds."""
+
+import time
+import multiprocessing
+
+import pytest
+
+import parallel as parallel_module
+from parallel import ParallelSearch
+from search import Search
+from state import end_states, ROLLS
+
+
+@pytest.fixture(scope="module")
+def parallel():
+    search = ParallelSearch(2, max_depth=1, table_size=1 << 12)
+    yield search
+    search.close()
+
+
+def test_shares_split_the_sequences(parallel, states):
+    for state in states[:50]:
+        for _, die_rolls in ROLLS:
+            shares = parallel.shares(state, die_rolls)
+            assert sum(len(share) for share in shares) == len(end_states(state, die_rolls))
+            assert set().union(*shares) == set(end_states(state, die_rolls))
+
+
+def test_same_value_as_a_single_search(parallel, states):
+    search = Search(1)
+    for state in states[:10]:
+        for _, die_rolls in ROLLS:
+            ends = end_states(state, die_rolls)
+            if not ends:
+                continue
+
+            moves, value = parallel.best_moves(state, die_rolls)
+            assert tuple(moves) in ends.values()
+            assert parallel.depth == 1
+
+            _, expected = search.best_moves(state, die_rolls)
+            assert value == pytest.approx(expected), (state, die_rolls)
+
+
+class Finished(object):
+
+    """A task of the pool that is already done: its result or the error getting it raises."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def get(self, timeout=None):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class Pool(object):
+
+    """Hands out the given results to the tasks, in order."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    def apply_async(self, func, args):
+        return Finished(self.results.pop(0))
+
+
+def test_shares_of_failed_workers_are_left_out(parallel, states, monkeypatch):
+    state, die_rolls = states[0], (6, 2)
+    assert len(parallel.shares(state, die_rolls)) == 2
+
+    # One worker ran out of time before depth 1, the other didn't answer at all
+    for lost in ([], 0, 0), multiprocessing.TimeoutError():
+        monkeypatch.setattr(parallel, "pool", Pool(lost, ([(1, ["R0_6"], 0.5)], 3, 1)))
+        assert parallel.best_moves(state, die_rolls) == (["R0_6"], 0.5)
+        assert parallel.depth == 1
+
+    monkeypatch.setattr(parallel, "pool", Pool(([], 0, 0), multiprocessing.TimeoutError()))
+    assert parallel.best_moves(state, die_rolls) == ([], 0)
+
+
+def test_workers_stop_at_the_deadline_of_the_turn(states, monkeypatch):
+    monkeypatch.setattr(parallel_module, "_search", Search(2))
+    state, die_rolls = states[0], (6, 2)
+    share = set(end_states(state, die_rolls))
+
+    # A task that starts after the deadline only completes depth 1, which never polls the clock
+    results, _, _ = parallel_module._search_share(state, die_rolls, share, time.perf_counter())
+    assert [depth for depth, _, _ in results] == [1]
+
+    results, _, _ = parallel_module._search_share(state, die_rolls, share, time.perf_counter() + 60)
+    assert [depth for depth, _, _ in results] == [1, 2]
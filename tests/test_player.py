@@ -0,0 +1,89 @@
+"""Player objects have to stay consistent as coins are moved."""
+
+from player import greedy_move, greedy_turn, threat, in_danger
+from state import legal_moves, apply_move, end_states, ROLLS
+from tables import IS_SAFE, OPPOSITE
+
+
+def snapshot(player):
+    """Everything the occupancy index of a player holds."""
+    return (
+        tuple(coin.rel_pos for coin in player.coin_list),
+        {abs_pos: [coin.num for coin in coins] for abs_pos, coins in player.squares.items()},
+    )
+
+
+def possible(state):
+    """False if coins of both players share an unsafe square: one would have killed the other."""
+    return not any(0 < pos < 52 and not IS_SAFE[pos] and OPPOSITE[pos] in state[4:] for pos in state[:4])
+
+
+def test_indexes_match_a_fresh_player(states, players):
+    # Setting up players moves the coins one by one from the jail
+    for state in states:
+        me, opponent = players(state)
+        for player, coins in ((me, state[:4]), (opponent, state[4:])):
+            expected = {}
+            for idx in range(4):
+                if 0 < coins[idx] < 52:
+                    expected.setdefault(player.coin_list[idx].abs_pos, []).append(idx)
+
+            assert snapshot(player) == (coins, expected)
+
+
+def test_indexes_follow_moves_and_kills(states, players):
+    for state in states:
+        for die in range(1, 7):
+            for move in legal_moves(state, die):
+                me, opponent = players(state)
+                me.make_moves([me.move_name(move)], opponent)
+
+                fresh_me, fresh_opponent = players(me.get_state(opponent))
+                assert (snapshot(me), snapshot(opponent)) == (snapshot(fresh_me), snapshot(fresh_opponent)), (state, move)
+
+
+def test_get_multiple_moves_leaves_the_board_alone(states, players):
+    for state in filter(possible, states[:100]):
+        for _, die_rolls in ROLLS:
+            me, opponent = players(state)
+            before = snapshot(me), snapshot(opponent)
+
+            moves, _, end = me.get_multiple_moves(die_rolls, opponent)
+            assert (snapshot(me), snapshot(opponent)) == before, (state, die_rolls)
+
+            # Playing the moves on the board gets to the same state
+            me.make_moves(moves, opponent)
+            assert me.get_state(opponent) == end, (state, die_rolls)
+
+
+def test_greedy_move_is_legal(states):
+    for state in filter(possible, states):
+
+        for die in range(1, 7):
+            move, benefit = greedy_move(state, die)
+            if legal_moves(state, die):
+                assert move in legal_moves(state, die), (state, die)
+            else:
+                assert (move, benefit) == (None, 0), (state, die)
+
+
+def test_in_danger_is_any_threat(states):
+    for state in states:
+        assert in_danger(state) == sorted(
+            (idx for idx in range(4) if threat(state, state[idx]) > 0),
+            key=lambda idx: state[idx])
+
+
+def test_greedy_turn_plays_as_many_rolls_as_possible(states):
+    for state in filter(possible, states[:100]):
+        for _, die_rolls in ROLLS:
+            moves, end = greedy_turn(state, die_rolls)
+
+            reached = state
+            for move in moves:
+                reached = apply_move(reached, move)
+            assert reached == end
+
+            # end_states only keeps the ways of playing the most rolls
+            ends = end_states(state, die_rolls)
+            assert end in ends if ends else moves == [], (state, die_rolls)
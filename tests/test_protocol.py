@@ -0,0 +1,95 @@
+"""The client's lines as events, the watchdog & a game driven over streams."""
+
+import io
+import time
+
+from game import LudoGame
+from protocol import Roll, Duck, Repeat, Moves
+from protocol import Driver, Watchdog, Writer, parse_event, format_moves
+
+
+def test_parse_event():
+    assert parse_event("You rolled 6 6 3") == Roll([6, 6, 3])
+    assert parse_event("You rolled 4") == Roll([4])
+    assert parse_event("DUCK") == Duck()
+    assert parse_event("REPEAT") == Repeat()
+
+    assert parse_event("NA") == Moves(["NA"], False)
+    assert parse_event("Y0_6<next>Y0_1") == Moves(["Y0_6", "Y0_1"], False)
+    assert parse_event("G3_2<next>REPEAT") == Moves(["G3_2"], True)
+
+
+def test_format_moves():
+    assert format_moves(["R0_6", "R0_1"]) == "R0_6<next>R0_1"
+    assert format_moves([]) == "NA"
+
+
+def fired(watchdog, timeout=5):
+    """Wait for the watchdog to send its moves."""
+    deadline = time.monotonic() + timeout
+    while not watchdog.fired and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return watchdog.fired
+
+
+def test_watchdog_sends_the_fallback_after_the_deadline():
+    out = io.StringIO()
+    watchdog = Watchdog(Writer(out))
+
+    watchdog.arm(["R0_6", "R0_1"], 0)
+    assert fired(watchdog)
+    assert out.getvalue() == "R0_6<next>R0_1\n"
+
+    # The turn learns that its moves were sent
+    assert watchdog.disarm() == ["R0_6", "R0_1"]
+    assert watchdog.fires == 1
+
+
+def test_watchdog_disarmed_in_time():
+    out = io.StringIO()
+    watchdog = Watchdog(Writer(out))
+
+    watchdog.arm(["R0_6"], 60)
+    assert watchdog.disarm() is None
+
+    time.sleep(2 * Watchdog.GRACE)
+    assert out.getvalue() == ""
+
+
+def test_watchdog_sends_the_latest_moves():
+    out = io.StringIO()
+    watchdog = Watchdog(Writer(out))
+
+    watchdog.arm(["R0_6"], 0.2)
+    watchdog.update(["R1_6"])
+    assert fired(watchdog)
+    assert out.getvalue() == "R1_6\n"
+
+    # Too late to change what was sent
+    watchdog.update(["R2_6"])
+    assert watchdog.disarm() == ["R1_6"]
+
+
+def test_no_stale_fallback_after_a_duck():
+    watchdog = Watchdog(Writer(io.StringIO()))
+
+    watchdog.arm(["R0_6"], 0)
+    assert fired(watchdog)
+    assert watchdog.disarm() == ["R0_6"]
+
+    # A DUCK: nothing to play, so nothing was armed; the last turn's moves weren't sent again
+    assert watchdog.disarm() is None
+
+
+def test_a_game_over_streams():
+    stdin = io.StringIO("\n".join([
+        "You rolled 3",             # We can't open a coin
+        "You rolled 6 1",           # The opponent's roll & moves
+        "Y0_6<next>Y0_1",
+        "DUCK",                     # Our next roll
+    ]) + "\n")
+    stdout = io.StringIO()
+
+    Driver(LudoGame(1, 0), stdin, stdout).run()
+
+    assert stdout.getvalue().splitlines() == ["<THROW>", "NA", "<THROW>", "NA"]
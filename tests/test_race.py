@@ -0,0 +1,93 @@
+"""The race table: its indexing, the dynamic program & the win chances."""
+
+from itertools import combinations_with_replacement
+
+import pytest
+
+import race
+from race import RaceTable, rank, is_race, LOW, STATES, TURNS, SCALE
+from state import ROLLS, FINISH, end_states
+
+
+# Only positions with all coins at or after this are built; the whole table takes a minute
+SMALL = 49
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("race") / "race_table.bin")
+    race.build(path, out=None, low=SMALL)
+    return RaceTable(path)
+
+
+def positions(low=SMALL):
+    return list(combinations_with_replacement(range(low, FINISH + 1), 4))
+
+
+def cdf(table, coins):
+    row = rank(coins) * TURNS
+    return list(table.cdf[row:row + TURNS])
+
+
+def test_rank_numbers_every_multiset_once():
+    ranks = [rank(coins) for coins in positions(LOW)]
+    assert sorted(ranks) == list(range(STATES))
+
+    # The order of the coins doesn't matter
+    assert rank((30, 57, 26, 41)) == rank((26, 30, 41, 57))
+
+
+def test_distributions(table):
+    # Once all coins are finished, the race is over in this turn
+    assert cdf(table, (FINISH,) * 4) == [SCALE] * TURNS
+
+    for coins in positions():
+        row = cdf(table, coins)
+        assert row == sorted(row), coins
+        assert row[-1] == SCALE, coins
+
+    # A coin one square short of finishing needs a 1 in this throw: 1, 6 1 or 6 6 1
+    assert cdf(table, (56,) + (FINISH,) * 3)[0] == pytest.approx(SCALE * 43 / 216, abs=1)
+
+
+def test_win_probability(table):
+    done = (FINISH,) * 4
+    for mine in positions()[::7]:
+        assert table.win_probability(done, mine) == 1.0
+
+        for theirs in positions()[::11]:
+            win = table.win_probability(mine, theirs)
+            other = table.win_probability(theirs, mine)
+            assert 0 <= win <= 1
+
+            # Either side wins if it finishes first, so both win if they finish in the
+            # same turn: win + other = 1 + P(both finish in the same turn)
+            mine_cdf, their_cdf = cdf(table, mine), cdf(table, theirs)
+            same = sum(
+                (mine_cdf[t] - (mine_cdf[t - 1] if t else 0)) *
+                (their_cdf[t] - (their_cdf[t - 1] if t else 0))
+                for t in range(TURNS)
+            ) / SCALE ** 2
+            assert win + other == pytest.approx(1 + same, abs=1e-3), (mine, theirs)
+
+
+def test_best_moves(table):
+    for coins in positions()[::5]:
+        state = coins + (50, 52, 53, 57)
+        assert is_race(state)
+
+        for _, die_rolls in ROLLS:
+            moves, win = table.best_moves(state, die_rolls)
+            ends = end_states(state, die_rolls)
+            assert 0 <= win <= 1
+
+            if ends:
+                assert tuple(moves) in ends.values(), (state, die_rolls)
+            else:
+                assert moves == []
+
+
+def test_is_race():
+    assert is_race((LOW,) * 8)
+    assert not is_race((LOW - 1,) + (LOW,) * 7)
+    assert not is_race((0,) + (FINISH,) * 7)
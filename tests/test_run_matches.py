@@ -0,0 +1,62 @@
+"""Reading the result of a match from the server's log & handing out ports."""
+
+import socket
+
+from run_matches import parse_result, allocate_port, release_port, server_ready, clients_connected
+
+
+# Made up, in the shape of the server's action records; the keys naming the winner are a guess
+LOG = """
+INFO {'action': 'THROW', 'player': 1, 'dice': [3]}
+INFO {'action': 'MOVE', 'player': 1, 'moves': 'NA'}
+INFO {'action': 'THROW', 'player': 2, 'dice': [6, 2]}
+INFO {'action': 'FINISH', 'winner': 2}
+"""
+
+
+def test_parse_result():
+    assert parse_result(LOG) == (True, 2, 2)
+
+    # The winner may be named by more than one key, as long as they agree
+    assert parse_result("{'action': 'FINISH', 'winner': '1', 'player': 1}") == (True, 1, 0)
+
+
+def test_finished_with_an_unknown_winner():
+    # Two games in one log, players that don't agree, or no player that we know of
+    assert parse_result(LOG + LOG)[:2] == (True, None)
+    assert parse_result("{'action': 'FINISH', 'winner': 1, 'player': 2}")[:2] == (True, None)
+    assert parse_result("{'action': 'FINISH', 'winner': 3}")[:2] == (True, None)
+    assert parse_result("{'action': 'FINISH', 'result': 'P1'}")[:2] == (True, None)
+
+
+def test_unfinished_matches_are_errors():
+    # The server crashed before the game ended
+    assert parse_result(LOG.replace("FINISH", "MOVE")) == (False, None, 2)
+    assert parse_result("") == (False, None, 0)
+
+
+def test_ports_are_not_handed_out_twice():
+    ports = [allocate_port() for _ in range(20)]
+    assert len(set(ports)) == len(ports)
+
+    for port in ports:
+        release_port(port)
+
+
+def test_server_ready():
+    port = allocate_port()
+    try:
+        assert not server_ready(port)
+
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.bind(("0.0.0.0", port))
+            server.listen()
+            assert server_ready(port)
+
+            with socket.create_connection(("127.0.0.1", port)):
+                conn, _ = server.accept()
+                assert clients_connected(port, 1)
+                assert not clients_connected(port, 2)
+                conn.close()
+    finally:
+        release_port(port)
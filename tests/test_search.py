@@ -0,0 +1,67 @@
+"""Star1/Star2 pruning & the transposition table must not change the values of a search."""
+
+import pytest
+
+from clock import Clock
+from search import Search, SearchTimeout, evaluate, WIN
+from state import ROLLS, swap, is_finished, earns_repeat, apply_move, end_states
+
+
+def chance(state, depth):
+    """Plain expectiminimax: the value of state before its player throws."""
+    if is_finished(swap(state)):
+        return -WIN
+    if is_finished(state):
+        return WIN
+    if depth == 0:
+        return evaluate(state)
+    return sum(prob * turn(state, die_rolls, depth) for prob, die_rolls in ROLLS)
+
+
+def turn(state, die_rolls, depth):
+    """Plain expectiminimax: the value of state once its player has thrown die_rolls."""
+    ends = end_states(state, die_rolls)
+    if not ends:
+        return -chance(swap(state), depth - 1)
+    return max(child(state, end, depth) for end in ends)
+
+
+def child(state, end, depth):
+    """Value of the turn that moved from state to end, for the player of state."""
+    if earns_repeat(state, end):
+        return chance(end, depth - 1)
+    return -chance(swap(end), depth - 1)
+
+
+def after(state, moves):
+    """The state after the moves."""
+    for move in moves:
+        state = apply_move(state, move)
+    return state
+
+
+# Plain expectiminimax takes up to a couple of seconds a state at depth 3
+@pytest.mark.parametrize("depth, count", [(1, 12), (2, 12), (3, 8)])
+def test_search_matches_expectiminimax(states, depth, count):
+    search = Search(depth)
+    for idx, state in enumerate(states[:count]):
+        die_rolls = ROLLS[idx % len(ROLLS)][1]
+        moves, value = search.best_moves(state, die_rolls)
+
+        assert value == pytest.approx(turn(state, die_rolls, depth), abs=1e-9), (state, die_rolls)
+        if moves:
+            assert child(state, after(state, moves), depth) == pytest.approx(value, abs=1e-9)
+
+
+def test_evaluate_matches_features(states):
+    features = pytest.importorskip("features")
+    assert features.score(states) == pytest.approx([evaluate(state) for state in states])
+
+
+def test_the_clock_is_polled_above_the_leaves(states):
+    # Such a node evaluates all its leaves at once, which takes milliseconds;
+    # so the clock is checked at each of them, not only every POLL_INTERVAL nodes
+    search = Search(2, clock=Clock.for_turn(0))
+    with pytest.raises(SearchTimeout):
+        search.best_moves(states[0], (6, 2))
+    assert search.nodes == 1
@@ -0,0 +1,104 @@
+"""The self play referee & the tools built on it."""
+
+import os
+import sys
+import random
+import subprocess
+
+import pytest
+
+from selfplay import Referee, IllegalMove, make_bot, throw, parse_moves, check_moves, wilson_interval
+from state import FINISH, initial_state
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A None in sys.modules makes every import of NumPy fail, installed or not
+WITHOUT_NUMPY = "import sys; sys.modules['numpy'] = None\n"
+
+
+@pytest.mark.parametrize("code", [
+    "import selfplay; selfplay.play_game('greedy', 'search:1', seed=1)",
+    "import server",
+])
+def test_runs_without_numpy(code):
+    result = subprocess.run([sys.executable, "-c", WITHOUT_NUMPY + code],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_throw():
+    rng = random.Random(1)
+    for _ in range(2000):
+        rolls = throw(rng)
+        assert rolls == [] or (rolls[-1] != 6 and all(die == 6 for die in rolls[:-1]))
+
+
+def test_parse_moves():
+    assert parse_moves("RED", ["R0_6", "R2_1"], [6, 1]) == [(0, 6), (2, 1)]
+
+    for moves in (["Y0_6"], ["R4_6"], ["R0_5"], ["R0_6", "R1_6"], ["NA"]):
+        with pytest.raises(IllegalMove):
+            parse_moves("RED", moves, [6, 1])
+
+
+def test_check_moves():
+    start = initial_state()
+    assert check_moves(start, [(0, 6), (0, 1)], [6, 1]) == (2,) + (0,) * 7
+
+    # Both rolls can be played, so both have to be
+    with pytest.raises(IllegalMove):
+        check_moves(start, [(0, 6)], [6, 1])
+
+    # A coin can't leave the jail on a 3
+    with pytest.raises(IllegalMove):
+        check_moves(start, [(0, 3)], [3])
+
+    assert check_moves(start, [], [3]) == start
+
+
+def test_games_end_with_a_winner():
+    for seed in range(3):
+        referee = Referee([make_bot("greedy", 1, 0), make_bot("search:1", 2, 0)], seed)
+        winner = referee.play()
+
+        state = referee.state[:4] if winner == 0 else referee.state[4:]
+        assert state == (FINISH,) * 4
+
+
+def test_mcts_plays_a_game():
+    # Experimental, but it has to keep to the rules
+    referee = Referee([make_bot("mcts:20", 1, 0), make_bot("greedy", 2, 0)], seed=1)
+    assert referee.play() in (0, 1)
+
+    assert referee.bots[0].mcts.max_playouts == 20
+
+
+def test_race_table_is_opt_in():
+    import race
+
+    assert make_bot("greedy", 1, 0).race is None
+    assert make_bot("search:1+race", 1, 0).race is race.load()
+
+    with pytest.raises(ValueError):
+        make_bot("greedy+mcts", 1, 0)
+
+
+def test_illegal_moves_are_caught():
+    cheat = make_bot("greedy", 1, 0)
+    referee = Referee([cheat, make_bot("greedy", 2, 0)], seed=1)
+
+    # Never moves, even when a coin can leave the jail
+    cheat.play_turn = lambda die_rolls: []
+    with pytest.raises(IllegalMove):
+        referee.play()
+
+    # It's the cheat who forfeits
+    assert referee.side == 0
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    assert high - 0.5 == pytest.approx(0.5 - low)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
@@ -0,0 +1,47 @@
+"""Games between bot processes, refereed by the local stand-in server."""
+
+import os
+import sys
+
+from server import LocalServer
+from state import FINISH
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main.py searches 3 turns ahead; the greedy rules keep a whole game within a second or two
+GREEDY = [sys.executable, "-c", """
+import sys
+sys.path.insert(0, %r)
+
+from game import LudoGame
+
+player_id, time_limit, game_mode, board = map(int, sys.stdin.readline().split())
+LudoGame(player_id, game_mode).run(no_board=True)
+""" % ROOT]
+
+# Doesn't ask for a roll when it's its turn
+RUDE = [sys.executable, "-c", "import sys; sys.stdin.readline(); print('hello', flush=True)"]
+
+
+def test_a_game_over_pipes():
+    server = LocalServer([GREEDY, GREEDY], seed=1)
+    winner = server.play()
+
+    assert server.forfeit is None
+    assert winner in (1, 2)
+
+    coins = server.state[:4] if winner == 1 else server.state[4:]
+    assert coins == (FINISH,) * 4
+
+    # Every turn, the mover asks for a roll & answers it with its moves
+    received = [line for _, direction, _, line in server.transcript if direction == "<-"]
+    assert received[::2] == ["<THROW>"] * server.turns
+    assert len(received) == 2 * server.turns
+
+
+def test_rules_are_enforced():
+    server = LocalServer([RUDE, GREEDY], seed=1)
+
+    assert server.play() == 2
+    assert "instead of <THROW>" in server.forfeit
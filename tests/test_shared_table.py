@@ -0,0 +1,55 @@
+"""The shared transposition table: entries survive the trip through shared memory, torn ones don't."""
+
+import pytest
+
+from shared_table import SharedTranspositionTable, HEADER, ENTRY
+from transposition import LOWER, UPPER
+
+
+@pytest.fixture
+def table():
+    table = SharedTranspositionTable(size=16)
+    table.new_turn()
+    table.new_search()
+    yield table
+    table.close()
+
+
+def test_entries_are_seen_by_other_processes(table):
+    table.store(7, 3, -1.25, LOWER, (57, 1, 0, 9, 0, 0, 0, 26))
+    table.store(8, 1, 0.5, UPPER)
+
+    # Attaching by name is what the workers do
+    other = SharedTranspositionTable(size=16, name=table.name)
+    other.new_search()
+
+    assert other.lookup(7) == (7, 3, -1.25, LOWER, (57, 1, 0, 9, 0, 0, 0, 26), table.generation)
+    assert other.lookup(8) == (8, 1, 0.5, UPPER, None, table.generation)
+    assert other.lookup(8 + 16) is None
+
+    other.close()
+
+
+def test_torn_entries_are_misses(table):
+    table.store(7, 3, 2.0)
+
+    # Another process has written only the score of its entry so far
+    offset = HEADER.size + 7 * ENTRY.size + 8
+    table.buf[offset:offset + 8] = (12345).to_bytes(8, "little")
+
+    assert table.lookup(7) is None
+    assert table.misses == 1
+
+
+def test_deeper_results_of_the_current_turn_survive(table):
+    table.store(3, 4, 1.0)
+    table.store(3 + 16, 2, 2.0)
+    assert table.lookup(3)[2] == 1.0
+
+    # A new turn: older entries make way
+    table.new_turn()
+    table.new_search()
+    table.store(3 + 16, 2, 2.0)
+    assert table.lookup(3) is None
+    assert table.lookup(3 + 16)[2] == 2.0
+    assert table.replaced == 1
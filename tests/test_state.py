@@ -0,0 +1,57 @@
+"""The packed states of state.py have to follow the same rules as Player objects."""
+
+from collections import Counter
+
+from state import legal_moves, apply_move, end_states, swap, ROLLS
+from tables import IS_SAFE
+
+
+def player_moves(me, die):
+    """Moves a Player allows on a die: coins that don't stack & jailed coins on a 1 or a 6."""
+    coins = [
+        coin for coin in me.coin_list
+        # Coins on the board that don't land on one of mine, unless it's a safe square
+        if 0 < coin.rel_pos <= 57 - die and (
+            IS_SAFE[coin.rel_pos + die] or coin.rel_to_abs(coin.rel_pos + die) not in me.squares
+        ) or
+        coin.rel_pos == 0 and die in (1, 6)
+    ]
+    return sorted((coin.num, die) for coin in coins)
+
+
+def test_legal_moves_match_player(states, players):
+    for state in states:
+        me, _ = players(state)
+        for die in range(1, 7):
+            assert sorted(legal_moves(state, die)) == player_moves(me, die), (state, die)
+
+
+def test_apply_move_matches_make_moves(states, players):
+    for state in states:
+        for die in range(1, 7):
+            for move in legal_moves(state, die):
+                me, opponent = players(state)
+                me.make_moves([me.move_name(move)], opponent)
+                assert me.get_state(opponent) == apply_move(state, move), (state, move)
+
+
+def test_apply_move_from_the_other_side(states, players):
+    # Kills have to work the same way for the player on the other side of the board
+    for state in states:
+        for move in legal_moves(swap(state), 5):
+            opponent, me = players(state)
+            me.make_moves([me.move_name(move)], opponent)
+            assert me.get_state(opponent) == apply_move(swap(state), move), (state, move)
+
+
+def test_end_states_are_reached_by_their_moves(states):
+    for state in states[:100]:
+        for _, die_rolls in ROLLS:
+            for end, moves in end_states(state, die_rolls).items():
+                reached = state
+                for move in moves:
+                    assert move in legal_moves(reached, move[1])
+                    reached = apply_move(reached, move)
+                assert reached == end
+                # Every move uses up one of the rolls
+                assert not Counter(move[1] for move in moves) - Counter(die_rolls)
@@ -0,0 +1,45 @@
+"""The lookup tables have to agree with the geometry of the board they replace."""
+
+from config import PLAYER_COLORS
+from tables import ABS_POS, REL_POS, OPPOSITE, IS_SAFE, ROW_SIZE, COLOR_INDEX, JAIL, HOME_COLUMN
+
+
+def rel_to_abs(color, rel_pos):
+    """The formula Coin.rel_to_abs used before the tables."""
+    if rel_pos == 0:
+        return 0
+    elif rel_pos >= 52:
+        return -1
+    return (rel_pos - 1 + 13 * PLAYER_COLORS.index(color)) % 52 + 1
+
+
+def test_abs_pos_matches_the_formula():
+    for color in PLAYER_COLORS:
+        row = COLOR_INDEX[color[0]] * ROW_SIZE
+        for rel_pos in range(ROW_SIZE):
+            assert ABS_POS[row + rel_pos] == rel_to_abs(color, rel_pos), (color, rel_pos)
+
+
+def test_rel_pos_undoes_abs_pos():
+    for color_index in range(len(PLAYER_COLORS)):
+        for rel_pos in range(HOME_COLUMN):
+            abs_pos = ABS_POS[color_index * ROW_SIZE + rel_pos]
+            assert REL_POS[color_index * 53 + abs_pos] == rel_pos
+
+
+def test_opposite_is_the_same_square():
+    # Our games are RED against YELLOW or BLUE against GREEN: opposite corners
+    for mine, theirs in (("RED", "YELLOW"), ("BLUE", "GREEN")):
+        for rel_pos in range(ROW_SIZE):
+            opp_pos = OPPOSITE[rel_pos]
+            if opp_pos == -1:
+                # Off the common track for one of us; the opponent never steps on our 26th square
+                assert rel_pos in (JAIL, 26) or rel_pos >= HOME_COLUMN, rel_pos
+            else:
+                assert rel_to_abs(theirs, opp_pos) == rel_to_abs(mine, rel_pos), (mine, rel_pos)
+                assert OPPOSITE[opp_pos] == rel_pos
+
+
+def test_safe_squares():
+    stars = [1, 9, 14, 22, 27, 35, 40, 48]
+    assert [rel_pos for rel_pos in range(58) if IS_SAFE[rel_pos]] == [0] + stars + list(range(52, 58))
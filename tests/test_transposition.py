@@ -0,0 +1,59 @@
+"""The transposition table: hashing & which entries survive in a slot."""
+
+from itertools import permutations
+
+from transposition import TranspositionTable, zobrist, roll_key, LOWER
+from state import swap
+
+
+def test_hashes(states):
+    keys = {zobrist(state) for state in states}
+    assert len(keys) == len(set(states))
+
+    # The side to move is part of the hash
+    for state in states:
+        if state != swap(state):
+            assert zobrist(state) != zobrist(swap(state))
+
+    # The order of the die rolls is not
+    for rolls in permutations((6, 6, 3)):
+        assert roll_key(rolls) == roll_key((3, 6, 6))
+    assert roll_key((6, 3)) != roll_key((6, 6, 3))
+
+
+def test_lookup():
+    table = TranspositionTable(size=16)
+    table.store(5, 2, 1.5, LOWER, "best")
+
+    assert table.lookup(5)[1:5] == (2, 1.5, LOWER, "best")
+
+    # Same slot, another key
+    assert table.lookup(5 + 16) is None
+    assert (table.hits, table.misses) == (1, 1)
+
+
+def test_deeper_results_of_the_current_search_survive():
+    table = TranspositionTable(size=16)
+    table.new_search()
+
+    table.store(3, 4, 1.0)
+    table.store(3 + 16, 2, 2.0)
+    assert table.lookup(3)[2] == 1.0
+    assert table.lookup(3 + 16) is None
+
+    # Just as deep: the newer one wins
+    table.store(3 + 16, 4, 2.0)
+    assert table.lookup(3 + 16)[2] == 2.0
+    assert table.replaced == 1
+
+
+def test_results_of_older_searches_are_replaced():
+    table = TranspositionTable(size=16)
+    table.new_search()
+    table.store(3, 4, 1.0)
+
+    table.new_search()
+    table.store(3 + 16, 1, 2.0)
+    assert table.lookup(3) is None
+    assert table.lookup(3 + 16)[2] == 2.0
+    assert len(table) == 1
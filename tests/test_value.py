@@ -0,0 +1,104 @@
+"""Self play data on disk, a value model trained on it & the moves it picks."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dataset import Dataset, ChunkWriter, generate, simulate
+from features import features
+from selfplay import play_game
+from state import FINISH, end_states, ROLLS
+from train import Trainer, train
+from value import ValueModel
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("selfplay"))
+    generate(path, 300, seed=1, chunk_size=1 << 13, batch_games=100)
+    return Dataset(path)
+
+
+@pytest.fixture(scope="module")
+def model(data):
+    return train(data, epochs=2, batch_size=256, learning_rate=0.01, out=lambda message: None)
+
+
+def test_outcomes_of_self_play():
+    states, outcomes = simulate(50, seed=2)
+
+    assert states.shape == (len(outcomes), 8)
+    assert ((0 <= states) & (states <= FINISH)).all()
+
+    # The sides take turns, so about half the positions are the winner's
+    assert set(np.unique(outcomes)) == {0, 1}
+    assert 0.4 < outcomes.mean() < 0.6
+
+
+def test_chunks_hold_everything_written(tmp_path):
+    states = np.arange(8 * 10, dtype=np.int8).reshape(10, 8)
+    outcomes = np.arange(10, dtype=np.int8) % 2
+
+    writer = ChunkWriter(str(tmp_path), chunk_size=4)
+    writer.add(states[:7], outcomes[:7])
+    writer.add(states[7:], outcomes[7:])
+    writer.close()
+
+    dataset = Dataset(str(tmp_path))
+    assert dataset.sizes == [4, 4, 2]
+
+    read = np.concatenate([dataset.chunk(idx)[0] for idx in range(3)])
+    assert (read == states).all()
+
+    # Every position comes up once per pass, with its own outcome
+    batches = list(dataset.batches(3, np.random.default_rng(1)))
+    rows = np.concatenate([batch for batch, _ in batches])
+    assert sorted(rows[:, 0]) == list(states[:, 0])
+    for batch, batch_outcomes in batches:
+        assert (batch_outcomes == (batch[:, 0] // 8) % 2).all()
+
+
+def test_normalization_is_folded_in():
+    rng = np.random.default_rng(3)
+    states, _ = simulate(5, seed=3)
+
+    mean, std = rng.normal(size=12), rng.uniform(0.5, 2, 12)
+    for hidden in (0, 4):
+        trainer = Trainer(hidden, mean, std, rng)
+        trainer.params[-1] += 0.5
+        if not hidden:
+            trainer.params[0] += rng.normal(size=12)
+
+        expected, _ = trainer.forward(trainer.inputs(states))
+        assert np.allclose(trainer.model().predict(states), expected)
+
+
+def test_model_learns_who_is_ahead(model):
+    # Games it hasn't seen; a coin toss gets half of them right
+    states, outcomes = simulate(200, seed=9)
+    assert ((model.predict(states) > 0) == (outcomes > 0)).mean() > 0.6
+
+
+def test_save_and_load(model, tmp_path, states):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = ValueModel.load(path)
+
+    assert np.allclose(loaded.predict(states), model.predict(states))
+    assert np.allclose(features(states) @ loaded.w1 + loaded.b1, model.predict(states))
+
+
+def test_best_moves_are_legal(model, states):
+    for state in states[:50]:
+        for _, die_rolls in ROLLS:
+            moves, _ = model.best_moves(state, die_rolls)
+            ends = end_states(state, die_rolls)
+            assert tuple(moves) in ends.values() if ends else moves == []
+
+
+def test_value_bot_plays_a_game(model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+
+    winner, turns, forfeit = play_game("value:" + path, "greedy", seed=1)
+    assert winner in ("A", "B") and not forfeit
@@ -0,0 +1,202 @@
+"""
+This module trains the value model of value.py on self play data.
+
+The data is a directory of chunks written by dataset.py. Batches are read
+a chunk at a time, turned into features (see features.py) & fitted to the
+outcomes with the logistic loss, by Adam:
+
+    --hidden 0      a linear model (logistic regression)
+    --hidden N      a single hidden layer of N ReLUs
+
+The last chunk is held out (if there are several) to report the loss &
+accuracy the model would have on positions it hasn't seen.
+
+Run it as: python train.py data_dir [--hidden 0] [--epochs 3] [--out value_model.npz]
+"""
+
+import time
+import argparse
+
+import numpy as np
+
+from dataset import Dataset
+from features import FEATURES, features
+from value import ValueModel, PATH
+
+
+# Rows used to compute the normalization of the features
+NORMALIZATION_ROWS = 1 << 17
+
+
+class Adam(object):
+
+    """The Adam optimizer, for a list of NumPy arrays updated in place."""
+
+    def __init__(self, params, learning_rate=1e-3, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        self.params = params
+        self.learning_rate = learning_rate
+        self.beta1, self.beta2, self.epsilon = beta1, beta2, epsilon
+
+        self.m = [np.zeros_like(p) for p in params]
+        self.v = [np.zeros_like(p) for p in params]
+        self.t = 0
+
+    def step(self, grads):
+        self.t += 1
+        correction = np.sqrt(1 - self.beta2 ** self.t) / (1 - self.beta1 ** self.t)
+
+        for p, g, m, v in zip(self.params, grads, self.m, self.v):
+            m *= self.beta1
+            m += (1 - self.beta1) * g
+            v *= self.beta2
+            v += (1 - self.beta2) * g * g
+            p -= self.learning_rate * correction * m / (np.sqrt(v) + self.epsilon)
+
+
+def normalization(dataset, chunks, rng, rows=NORMALIZATION_ROWS):
+    """Mean & standard deviation of the features, from a sample of the training chunks."""
+    samples = []
+    per_chunk = max(1, rows // len(chunks))
+    for idx in chunks:
+        states, _ = dataset.chunk(idx)
+        picked = rng.choice(len(states), size=min(per_chunk, len(states)), replace=False)
+        samples.append(features(np.asarray(states)[np.sort(picked)]))
+
+    x = np.concatenate(samples)
+    std = x.std(axis=0)
+    std[std < 1e-8] = 1
+    return x.mean(axis=0), std
+
+
+class Trainer(object):
+
+    """Parameters of a model being trained, in normalized feature space."""
+
+    def __init__(self, hidden, mean, std, rng, learning_rate=1e-3):
+        self.hidden = hidden
+        self.mean, self.std = mean, std
+
+        if hidden:
+            self.params = [
+                rng.normal(0, np.sqrt(2 / FEATURES), (FEATURES, hidden)),
+                np.zeros(hidden),
+                rng.normal(0, np.sqrt(1 / hidden), hidden),
+                np.zeros(1),
+            ]
+        else:
+            self.params = [np.zeros(FEATURES), np.zeros(1)]
+
+        self.optimizer = Adam(self.params, learning_rate)
+
+    def inputs(self, states):
+        return (features(states) - self.mean) / self.std
+
+    def forward(self, x):
+        """Log odds for the rows of x; & the hidden layer, if any."""
+        if not self.hidden:
+            w, b = self.params
+            return x @ w + b[0], None
+
+        w1, b1, w2, b2 = self.params
+        h = np.maximum(x @ w1 + b1, 0)
+        return h @ w2 + b2[0], h
+
+    def step(self, states, outcomes):
+        """One step of Adam on a batch; returns its mean loss."""
+        x = self.inputs(states)
+        y = outcomes.astype(float)
+
+        logits, h = self.forward(x)
+        p = 1 / (1 + np.exp(-logits))
+
+        # d loss / d logits, for the mean logistic loss
+        g = (p - y) / len(y)
+
+        if not self.hidden:
+            grads = [x.T @ g, np.array([g.sum()])]
+        else:
+            w1, b1, w2, b2 = self.params
+            gh = np.outer(g, w2) * (h > 0)
+            grads = [x.T @ gh, gh.sum(axis=0), h.T @ g, np.array([g.sum()])]
+
+        self.optimizer.step(grads)
+        return log_loss(logits, y)
+
+    def model(self):
+        """The trained ValueModel, with the normalization folded in."""
+        if not self.hidden:
+            w, b = self.params
+            return ValueModel(w, b[0], mean=self.mean, std=self.std)
+
+        w1, b1, w2, b2 = self.params
+        return ValueModel(w1, b1, w2, b2[0], mean=self.mean, std=self.std)
+
+
+def log_loss(logits, y):
+    """Mean logistic loss of log odds against 0 / 1 outcomes."""
+    # log(1 + exp(-z)) for y = 1 & log(1 + exp(z)) for y = 0, without overflows
+    return float(np.mean(np.logaddexp(0, np.where(y > 0, -logits, logits))))
+
+
+def evaluate(model, dataset, chunks, batch_size=1 << 14):
+    """(loss, accuracy) of a ValueModel on the positions of some chunks."""
+    loss, correct, count = 0.0, 0, 0
+    for idx in chunks:
+        states, outcomes = dataset.chunk(idx)
+        for start in range(0, len(outcomes), batch_size):
+            y = np.asarray(outcomes[start:start + batch_size], dtype=float)
+            logits = model.predict(np.asarray(states[start:start + batch_size]))
+
+            loss += log_loss(logits, y) * len(y)
+            correct += int(((logits > 0) == (y > 0)).sum())
+            count += len(y)
+
+    return loss / count, correct / count
+
+
+def train(dataset, hidden=0, epochs=3, batch_size=1024, learning_rate=1e-3, seed=1, out=print):
+    """Train a ValueModel on a Dataset; the last chunk is held out, if there are several."""
+    rng = np.random.default_rng(seed)
+
+    chunks = list(range(len(dataset.names)))
+    held_out = chunks[-1:] if len(chunks) > 1 else []
+    chunks = chunks[:len(chunks) - len(held_out)]
+
+    mean, std = normalization(dataset, chunks, rng)
+    trainer = Trainer(hidden, mean, std, rng, learning_rate)
+
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        losses = [trainer.step(states, outcomes)
+                  for states, outcomes in dataset.batches(batch_size, rng, chunks)]
+
+        message = "Epoch %d: loss %.4f" % (epoch + 1, np.mean(losses))
+        if held_out:
+            loss, accuracy = evaluate(trainer.model(), dataset, held_out)
+            message += ", held out: loss %.4f, accuracy %.3f" % (loss, accuracy)
+        out("%s (%.1fs)" % (message, time.perf_counter() - started))
+
+    return trainer.model()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a value model on self play data.")
+    parser.add_argument("path", help="directory of chunks written by dataset.py")
+    parser.add_argument("--out", default=PATH)
+    parser.add_argument("--hidden", type=int, default=0, help="hidden units; 0 for a linear model")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    dataset = Dataset(args.path)
+    print("%s: %d positions in %d chunks" % (args.path, len(dataset), len(dataset.names)))
+
+    model = train(dataset, args.hidden, args.epochs, args.batch_size, args.learning_rate, args.seed)
+    model.save(args.out)
+    print("Saved %s" % args.out)
+
+
+if __name__ == '__main__':
+    main()
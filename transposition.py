@@ -0,0 +1,123 @@
+"""
+This module remembers what the search has already found out.
+
+Different orders of the same die rolls, and different orders of moves,
+often end up on the same board. A transposition table lets the search
+evaluate each such board only once.
+
+States are hashed with Zobrist hashing: every (slot, relative position)
+pair of a state gets a random 64 bit number & the hash of a state is the
+XOR of the numbers of its 8 coins. Since a state always lists the coins of
+the player about to move first (see state.py), the side to move is
+part of the hash already.
+"""
+
+import random
+
+from tables import FINISH
+
+
+# Slots in a state & positions a coin can be at
+SLOTS = 8
+POSITIONS = FINISH + 1
+
+# Seeded, so that every process hashes states the same way
+_random = random.Random(57)
+
+# Random number for every (slot, relative position): slot * POSITIONS + rel_pos
+ZOBRIST = tuple(_random.getrandbits(64) for _ in range(SLOTS * POSITIONS))
+
+# Random number for the i-th (sorted) die roll of a throw: i * 7 + die
+DIE_KEYS = tuple(_random.getrandbits(64) for _ in range(3 * 7))
+
+# What a stored value means
+EXACT = 0  # The value itself
+LOWER = 1  # The value is at least this much
+UPPER = 2  # The value is at most this much
+
+
+def zobrist(state):
+    """64 bit Zobrist hash of a state."""
+    key = 0
+    for slot, rel_pos in enumerate(state):
+        key ^= ZOBRIST[slot * POSITIONS + rel_pos]
+    return key
+
+
+def roll_key(die_rolls):
+    """64 bit hash of a throw; the order of the rolls does not matter."""
+    key = 0
+    for idx, die in enumerate(sorted(die_rolls)):
+        key ^= DIE_KEYS[idx * 7 + die]
+    return key
+
+
+class TranspositionTable(object):
+
+    """
+    A fixed size hash table of search results.
+
+    Every slot holds one entry: (key, depth, value, flag, best, generation)
+
+    An entry is replaced by a new one when it is left over from an older
+    search (generation) or was searched to a smaller depth; so deeper,
+    more expensive results survive longer.
+    """
+
+    def __init__(self, size=1 << 16):
+        # Size must be a power of 2 for the mask to work
+        assert size & (size - 1) == 0, "Size should be a power of 2"
+
+        self.mask = size - 1
+        self.slots = [None] * size
+
+        # Incremented by new_search
+        self.generation = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+    def new_search(self):
+        """Mark entries stored till now as old; call before every search."""
+        self.generation += 1
+
+    def lookup(self, key):
+        """Returns the entry stored for a key; or None."""
+        entry = self.slots[key & self.mask]
+
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag=EXACT, best=None):
+        """Store a search result, unless a more valuable entry is in its slot."""
+        idx = key & self.mask
+        entry = self.slots[idx]
+
+        if entry is not None:
+            # Keep deeper results of the current search
+            if entry[5] == self.generation and entry[1] > depth:
+                return
+            if entry[0] != key:
+                self.replaced += 1
+
+        self.slots[idx] = (key, depth, value, flag, best, self.generation)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return "hits: %d, misses: %d (%.1f%%), stores: %d, replaced: %d" % (
+            self.hits, self.misses, 100 * self.hit_rate, self.stores, self.replaced)
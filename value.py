@@ -0,0 +1,158 @@
+"""
+This module decides moves with a learned value model.
+
+The model (trained by train.py) maps the features of a position (see
+features.py) to the log odds that the player about to move wins it:
+
+    linear:         features @ w + b
+    hidden layer:   relu(features @ w1 + b1) @ w2 + b2
+
+Features are normalized by the mean & standard deviation of the training
+data; that is folded into the first layer when the model is loaded.
+
+A decision scores every sequence of moves of a roll (see state.end_states)
+in a single batch, like the greedy rules of Player.get_move do one by one.
+The feature matrix, everything in between (see features.Scratch), the
+hidden layer & the outputs live in buffers that are allocated once &
+reused, so inference costs a fixed number of NumPy calls per decision,
+whatever the number of leaves.
+"""
+
+import os
+
+import numpy as np
+
+from features import FEATURES, Scratch, features
+from state import swap, is_finished, earns_repeat, end_states
+
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "value_model.npz")
+
+# Rows of the buffers; grown if a batch is larger
+CAPACITY = 256
+
+
+class ValueModel(object):
+
+    """A linear model or a single hidden layer, over features.features."""
+
+    def __init__(self, w1, b1, w2=None, b2=None, mean=None, std=None):
+        # Linear models only have w1 (FEATURES,) & b1 (a scalar)
+        w1 = np.asarray(w1, dtype=float)
+        b1 = np.asarray(b1, dtype=float)
+
+        # Fold the normalization into the first layer:
+        # ((x - mean) / std) @ w1 + b1 = x @ (w1 / std) + (b1 - (mean / std) @ w1)
+        if mean is not None:
+            scaled = w1 / (std if w1.ndim == 1 else std[:, None])
+            b1 = b1 - (mean / std) @ w1
+            w1 = scaled
+
+        self.w1 = np.ascontiguousarray(w1)
+        self.b1 = b1
+        self.w2 = None if w2 is None else np.asarray(w2, dtype=float)
+        self.b2 = None if b2 is None else float(b2)
+
+        self.hidden = 0 if self.w2 is None else len(self.w2)
+
+        self.capacity = 0
+        self.reserve(CAPACITY)
+
+    def reserve(self, rows):
+        """Make sure batches of rows positions fit in the buffers."""
+        if rows <= self.capacity:
+            return
+
+        self.capacity = max(rows, 2 * self.capacity)
+        self._features = np.empty((self.capacity, FEATURES))
+        self._scratch = Scratch(self.capacity)
+        self._hidden = np.empty((self.capacity, self.hidden)) if self.hidden else None
+        self._out = np.empty(self.capacity)
+        self._signs = np.empty(self.capacity)
+
+    def predict(self, states):
+        """
+        Log odds of winning for the player about to move, for a batch of states.
+
+        The result is a view of a buffer that the next call overwrites.
+        """
+        n = len(states)
+        self.reserve(n)
+
+        x = features(states, out=self._features[:n], scratch=self._scratch)
+        out = self._out[:n]
+
+        if not self.hidden:
+            np.dot(x, self.w1, out=out)
+            out += self.b1
+            return out
+
+        h = self._hidden[:n]
+        np.dot(x, self.w1, out=h)
+        h += self.b1
+        np.maximum(h, 0, out=h)
+
+        np.dot(h, self.w2, out=out)
+        out += self.b2
+        return out
+
+    def win_probability(self, states):
+        """Chance of winning for the player about to move, for a batch of states."""
+        return 1 / (1 + np.exp(-self.predict(states)))
+
+    def best_moves(self, state, die_rolls):
+        """
+        The moves after which the model likes our chances best.
+
+        Returns a tuple: (moves, log odds of winning); moves is a list of
+        state moves: [(coin index, die), ...]; empty for "NA".
+        """
+        sequences = end_states(state, die_rolls)
+        if not sequences:
+            return [], -float(self.predict([swap(state)])[0])
+
+        ends = list(sequences)
+        for end in ends:
+            if is_finished(end):
+                return list(sequences[end]), float("inf")
+
+        # After a kill or a finish I roll again, otherwise the opponent does
+        self.reserve(len(ends))
+        signs = self._signs[:len(ends)]
+        leaves = []
+        for idx, end in enumerate(ends):
+            if earns_repeat(state, end):
+                signs[idx] = 1
+                leaves.append(end)
+            else:
+                signs[idx] = -1
+                leaves.append(swap(end))
+
+        values = self.predict(leaves)
+        values *= signs
+
+        best = int(values.argmax())
+        return list(sequences[ends[best]]), float(values[best])
+
+    def save(self, path=PATH):
+        """Save the model; the normalization is already folded in."""
+        params = {"w1": self.w1, "b1": self.b1}
+        if self.hidden:
+            params.update(w2=self.w2, b2=self.b2)
+        np.savez(path, **params)
+
+    @classmethod
+    def load(cls, path=PATH):
+        with np.load(path) as params:
+            return cls(**{name: params[name] for name in params.files})
+
+
+# Models loaded so far, by path
+_models = {}
+
+
+def load(path=PATH):
+    """The model saved at path, loaded once per process."""
+    if path not in _models:
+        _models[path] = ValueModel.load(path)
+    return _models[path]